@@ -1,12 +1,25 @@
 from flask import Flask, render_template
 from app.config import Config
-from app.models.models import db, User
+from app.models.models import db, User, add_missing_columns, create_missing_indexes
 from app.controllers.auth_controller import auth_bp, init_admin_user
 from app.controllers.student_controller import student_bp
 from app.controllers.attendance_controller import attendance_bp
 from app.controllers.search_controller import search_bp
 from app.controllers.analysis_controller import analysis_bp
 from app.controllers.dashboard_controller import dashboard_bp
+from app.controllers.metrics_controller import metrics_bp
+from app.controllers.sync_controller import sync_bp
+from app.controllers.imports_controller import imports_bp
+from app.utils.instrumentation import init_instrumentation
+from app.utils.http_cache import init_compression
+from app.utils.data_version import init_data_version
+from app.utils.row_counts import init_row_counts
+from app.utils.profiles import init_profiles
+from app.utils.change_feed import init_change_feed
+from app.commands import register_commands
+from app.utils.write_queue import init_write_queue
+from app.utils.warmup import init_warmup
+from app.utils.fragment_cache import init_fragment_cache
 import os
 
 def create_app():
@@ -27,11 +40,38 @@ def create_app():
     app.register_blueprint(search_bp, url_prefix='/search')
     app.register_blueprint(analysis_bp, url_prefix='/analysis')
     app.register_blueprint(dashboard_bp)
+    app.register_blueprint(sync_bp, url_prefix='/sync')
+    app.register_blueprint(imports_bp, url_prefix='/imports')
+    
+    # Opt-in request/SQL instrumentation and Prometheus metrics endpoint
+    if app.config.get('INSTRUMENTATION_ENABLED'):
+        init_instrumentation(app)
+        app.register_blueprint(metrics_bp)
+    
+    if app.config.get('COMPRESS_ENABLED'):
+        init_compression(app)
+    
+    # {% call cache_fragment(...) %} in templates
+    init_fragment_cache(app)
+    
+    # Recompute analytics in the background after imports
+    if app.config.get('ANALYTICS_WARMUP_ENABLED'):
+        init_warmup(app)
+    
+    # Admin CLI commands (archive-term, restore-term, list-archives)
+    register_commands(app)
     
     # Create tables
     with app.app_context():
+        init_write_queue(app)  # Import writes go through one writer thread; SQLite in WAL mode
         db.create_all()
+        add_missing_columns()
+        create_missing_indexes()
         init_admin_user()  # Initialize default admin user
+        init_data_version()
+        init_row_counts()
+        init_profiles()
+        init_change_feed()
     
     # Set upload folder attribute on app instance for controllers to access
     app.upload_folder = os.path.join(app.root_path, '..', app.config['UPLOAD_FOLDER'])
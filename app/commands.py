@@ -0,0 +1,94 @@
+"""
+Administrative flask CLI commands
+
+Usage: flask --app app.app <command> --help
+"""
+import click
+from app.utils.archive import archive_term, restore_term, list_archived_terms
+from app.utils.attendance_edit import delete_attendance, replace_attendance
+from app.utils.excel_handler import process_attendance_excel
+from app.utils.profiles import rebuild_profiles
+from app.utils.row_counts import get_row_counts, recount_rows
+from app.utils.snapshot import write_snapshot
+
+
+def register_commands(app):
+    """Register the admin commands on the app's CLI"""
+
+    @app.cli.command('archive-term')
+    @click.argument('term')
+    @click.option('--period', 'periods', multiple=True, required=True,
+                  help='Attendance period (month) to archive; repeat for each period of the term')
+    def archive_term_command(term, periods):
+        """Move a closed term's attendance periods into the archive"""
+        success, message = archive_term(term, periods)
+        click.echo(message)
+        if not success:
+            raise SystemExit(1)
+
+    @app.cli.command('restore-term')
+    @click.argument('term')
+    def restore_term_command(term):
+        """Move an archived term back into the attendance table"""
+        success, message = restore_term(term)
+        click.echo(message)
+        if not success:
+            raise SystemExit(1)
+
+    @app.cli.command('list-archives')
+    def list_archives_command():
+        """List archived terms"""
+        terms = list_archived_terms()
+        if not terms:
+            click.echo('No archived terms')
+        for term in terms:
+            archived_at = term['archived_at'].strftime('%Y-%m-%d %H:%M') if term['archived_at'] else '-'
+            click.echo(f"{term['term']}: {term['total_records']} records, "
+                       f"periods {', '.join(term['periods'])} (archived {archived_at})")
+
+    @app.cli.command('recount-stats')
+    def recount_stats_command():
+        """Recompute the stored dashboard row counts with COUNT(*)"""
+        recount_rows()
+        for table, count in get_row_counts().items():
+            click.echo(f"{table}: {count}")
+
+    @app.cli.command('delete-attendance')
+    @click.option('--period', help='Period (month) to delete')
+    @click.option('--batch', help='Batch whose attendance to delete')
+    @click.option('--dry-run', is_flag=True, help='Only report what would be deleted')
+    def delete_attendance_command(period, batch, dry_run):
+        """Delete the attendance of a period and/or batch"""
+        success, message, _ = delete_attendance(period, batch, dry_run=dry_run)
+        click.echo(message)
+        if not success:
+            raise SystemExit(1)
+
+    @app.cli.command('replace-attendance')
+    @click.argument('path')
+    @click.option('--period', help='Period (month) to replace')
+    @click.option('--batch', help='Batch whose attendance to replace')
+    @click.option('--dry-run', is_flag=True, help='Only report what would be replaced')
+    def replace_attendance_command(path, period, batch, dry_run):
+        """Atomically replace the attendance of a period and/or batch with an attendance file"""
+        result = process_attendance_excel(path)
+        if not result['success']:
+            click.echo(result['message'])
+            raise SystemExit(1)
+        if result['skipped_rows']:
+            click.echo(f"{result['skipped_rows']} rows of the file were skipped by validation")
+        success, message, _ = replace_attendance(result['data'], period, batch, dry_run=dry_run)
+        click.echo(message)
+        if not success:
+            raise SystemExit(1)
+
+    @app.cli.command('rebuild-profiles')
+    def rebuild_profiles_command():
+        """Rebuild every student profile document from the student and attendance tables"""
+        rebuild_profiles()
+        click.echo('Student profiles rebuilt')
+
+    @app.cli.command('write-snapshot')
+    def write_snapshot_command():
+        """Write the memory-mapped attendance snapshot for the current data"""
+        click.echo(f"Snapshot written to {write_snapshot()}")
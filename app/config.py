@@ -9,7 +9,69 @@ class Config:
     os.makedirs(instance_path, exist_ok=True)
     db_path = os.path.join(instance_path, 'pwd_management.db')
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or f'sqlite:///{db_path.replace(os.sep, "/")}'
+    if SQLALCHEMY_DATABASE_URI.startswith('postgres://'):
+        # SQLAlchemy only accepts the postgresql:// scheme
+        SQLALCHEMY_DATABASE_URI = 'postgresql://' + SQLALCHEMY_DATABASE_URI[len('postgres://'):]
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Archived terms can be kept in a separate database (e.g. sqlite:///instance/archive.db)
+    ARCHIVE_DATABASE_URL = os.environ.get('ARCHIVE_DATABASE_URL')
+    SQLALCHEMY_BINDS = {'archive': ARCHIVE_DATABASE_URL} if ARCHIVE_DATABASE_URL else {}
     UPLOAD_FOLDER = 'uploads'
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
-    PERMANENT_SESSION_LIFETIME = timedelta(hours=1)
\ No newline at end of file
+    PERMANENT_SESSION_LIFETIME = timedelta(hours=1)
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL') or 60)  # Seconds a revoked user may stay cached
+
+    # Recompute analytics on a background thread after every import
+    ANALYTICS_WARMUP_ENABLED = os.environ.get('ANALYTICS_WARMUP_ENABLED', '1') == '1'
+    ANALYTICS_WARMUP_DELAY = 0.5  # Seconds without further commits before recomputing
+
+    # Memory-mapped columnar copy of the attendance table, rewritten by the warm-up and shared by all workers
+    ATTENDANCE_SNAPSHOT_ENABLED = os.environ.get('ATTENDANCE_SNAPSHOT_ENABLED', '1') == '1'
+    ATTENDANCE_SNAPSHOT_PATH = os.environ.get('ATTENDANCE_SNAPSHOT_PATH') or os.path.join(instance_path, 'attendance.snap')
+
+    # Cache of rendered template fragments (tables, chart data), keyed on the data version
+    FRAGMENT_CACHE_ENABLED = os.environ.get('FRAGMENT_CACHE_ENABLED', '1') == '1'
+    FRAGMENT_CACHE_MAX_BYTES = int(os.environ.get('FRAGMENT_CACHE_MAX_MB') or 32) * 1024 * 1024  # Compressed size
+    FRAGMENT_CACHE_COMPRESS_LEVEL = 1  # zlib level; fragments are repetitive HTML
+
+    # Serialized import writes
+    WRITE_BATCH_SIZE = int(os.environ.get('WRITE_BATCH_SIZE') or 1000)  # Rows per import transaction
+    WRITE_RETRIES = 5  # Attempts per transaction when the database is locked
+    WRITE_RETRY_BACKOFF = 0.1  # Seconds before the first retry, doubled on each attempt
+    WRITE_QUEUE_TIMEOUT = 300  # Seconds a request waits for its queued write
+    WRITE_LOCK_FILE = os.environ.get('WRITE_LOCK_FILE') or os.path.join(instance_path, 'write.lock')  # Shared by worker processes
+    SQLITE_WAL = os.environ.get('SQLITE_WAL', '1') == '1'  # Readers never wait for the writer
+    SQLITE_BUSY_TIMEOUT_MS = 5000
+
+    # Admission control: pool -> (concurrent requests, queued requests) per worker process for the
+    # expensive endpoints; keep the total below the threads per worker so cheap pages always get one.
+    # Upload confirmations are not limited: the write queue runs them one at a time and none is turned away
+    ADMISSION_CONTROL_ENABLED = os.environ.get('ADMISSION_CONTROL_ENABLED', '1') == '1'
+    ADMISSION_POOLS = {
+        'analytics': (int(os.environ.get('ADMISSION_ANALYTICS_LIMIT') or 2), 4),
+        'uploads': (int(os.environ.get('ADMISSION_UPLOADS_LIMIT') or 1), 2),
+        'exports': (int(os.environ.get('ADMISSION_EXPORTS_LIMIT') or 1), 2)
+    }
+    ADMISSION_QUEUE_TIMEOUT = float(os.environ.get('ADMISSION_QUEUE_TIMEOUT') or 10)  # Seconds a queued request waits
+    ADMISSION_RETRY_AFTER = 5  # Seconds, sent in the Retry-After header of 503 responses
+
+    # Response compression for large HTML/JSON bodies (brotli is used when installed)
+    COMPRESS_ENABLED = os.environ.get('COMPRESS_ENABLED', '1') == '1'
+    COMPRESS_MIN_SIZE = 1024  # Bytes; smaller responses are sent as-is
+    COMPRESS_LEVEL = 6  # gzip level
+    COMPRESS_BROTLI_QUALITY = 5
+
+    # Attendance risk scoring
+    RISK_THRESHOLD = 75.0  # Attendance % below which a period counts against the student
+    RISK_ROLLING_WINDOW = 3  # Periods in the rolling average
+    TERM_LENGTH_PERIODS = 12  # Periods in a term, used for the end-of-term projection
+
+    # Instrumentation (opt-in): per-request timing, SQL counters and /metrics
+    INSTRUMENTATION_ENABLED = os.environ.get('INSTRUMENTATION_ENABLED', '0') == '1'
+    SLOW_REQUEST_THRESHOLD_MS = int(os.environ.get('SLOW_REQUEST_THRESHOLD_MS') or 1000)
+    SLOW_REQUEST_LOG = os.environ.get('SLOW_REQUEST_LOG', '1') == '1'  # Log slow requests as JSON
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN') or None  # Bearer token for /metrics; localhost only if unset
+    PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', '0') == '1'  # Profile every request
+    PROFILING_HEADER = os.environ.get('PROFILING_HEADER') or None  # e.g. 'X-Profile'; honoured for admins only
+    PROFILER = os.environ.get('PROFILER') or 'cprofile'  # cprofile or pyinstrument
+    PROFILE_DIR = os.path.join(instance_path, 'profiles')
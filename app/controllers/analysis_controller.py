@@ -1,6 +1,13 @@
 from flask import Blueprint, request, render_template, redirect, url_for, flash, jsonify
 from app.models.models import Student, Attendance
 from app.controllers.auth_controller import login_required
+from app.utils.admission import admission_controlled
+from app.utils.http_cache import etag_cached
+from app.utils.risk_engine import get_risk_scores, risk_level_counts
+from app.utils.archive import get_archived_period_stats
+from app.utils.analytics import (COHORT_COLUMNS, DISTRIBUTION_GROUPS, MAX_HISTOGRAM_BINS, get_cohort_stats,
+                                 get_overall_stats, get_monthly_stats, get_defaulter_list, get_daily_stats,
+                                 get_distribution, category_chart_data)
 from datetime import datetime
 from collections import defaultdict
 
@@ -8,6 +15,8 @@ analysis_bp = Blueprint('analysis', __name__)
 
 @analysis_bp.route('/analysis')
 @login_required
+@etag_cached
+@admission_controlled('analytics')
 def attendance_analysis():
     """Overall attendance analysis dashboard"""
     from datetime import datetime
@@ -15,14 +24,14 @@ def attendance_analysis():
     # Get current month name
     current_month = datetime.now().strftime('%B')
     
-    # Load all data by default to show comprehensive analytics
-    all_attendance = Attendance.query.all()
-    
     # Check if current month data exists
     current_month_exists = Attendance.query.filter(Attendance.month == current_month).first() is not None
     showing_current_month = False  # Default to showing all data
     
-    if not all_attendance:
+    # Overall statistics and category counts are aggregated in SQL
+    overall = get_overall_stats()
+    
+    if not overall['total_records']:
         flash('No attendance data available for analysis', 'info')
         return render_template('analysis.html', 
                               overall_stats=None, 
@@ -35,103 +44,57 @@ def attendance_analysis():
                               showing_current_month=showing_current_month,
                               current_month_exists=current_month_exists)
     
-    # Calculate overall statistics
-    total_records = len(all_attendance)
-    total_students = len(set([att.ticket_no for att in all_attendance]))
-    
-    # Calculate average attendance percentage
-    total_percentage = sum([att.attendance_percentage for att in all_attendance])
-    avg_attendance = total_percentage / total_records if total_records > 0 else 0
-    
-    # Calculate attendance categories
-    excellent_count = len([att for att in all_attendance if att.attendance_percentage >= 90])
-    good_count = len([att for att in all_attendance if 75 <= att.attendance_percentage < 90])
-    defaulter_count = len([att for att in all_attendance if att.attendance_percentage < 75])
-    
-    # Get all unique months
-    all_months = list(set([att.month for att in Attendance.query.all()]))  # Get all months from all records
-    all_months.sort()  # Sort months alphabetically for now
-    
-    # Calculate monthly statistics
-    monthly_stats = {}
-    for month in all_months:
-        month_attendance = [att for att in all_attendance if att.month == month]
-        if month_attendance:
-            month_avg = sum([att.attendance_percentage for att in month_attendance]) / len(month_attendance)
-            monthly_stats[month] = {
-                'avg_attendance': round(month_avg, 2),
-                'total_records': len(month_attendance),
-                'defaulter_count': len([att for att in month_attendance if att.attendance_percentage < 75])
-            }
-    
-    # Get defaulter list (students with attendance < 75%)
-    defaulter_tickets = set([att.ticket_no for att in all_attendance if att.attendance_percentage < 75])
-    defaulter_students = []
-    
-    for ticket_no in defaulter_tickets:
-        student = Student.query.filter_by(ticket_no=ticket_no).first()
-        if student:
-            # Get all attendance records for this defaulter
-            student_attendance = Attendance.query.filter_by(ticket_no=ticket_no).all()
-            avg_attendance = sum([att.attendance_percentage for att in student_attendance]) / len(student_attendance) if student_attendance else 0
-            
-            defaulter_students.append({
-                'student': student,
-                'avg_attendance': round(avg_attendance, 2),
-                'attendance_records': student_attendance
-            })
+    # Monthly statistics, defaulters and daily averages are cached per data version
+    # and precomputed after every import
+    monthly_stats = get_monthly_stats()
+    all_months = list(monthly_stats)
+    defaulter_students = get_defaulter_list()
     
     # Prepare data for charts (defined once)
-    attendance_categories = {
-        'labels': ['Excellent (90%+)', 'Good (75-89%)', 'Defaulter (<75%)'],
-        'data': [excellent_count, good_count, defaulter_count],
-        'colors': ['#198754', '#ffc107', '#dc3545']  # Bootstrap colors: success, warning, danger
-    }
+    attendance_categories = category_chart_data(overall)
+    distribution = get_distribution()
     
     # Prepare monthly attendance data for chart
-    monthly_attendance_data = []
-    monthly_defaulter_data = []
-    for month in all_months:
-        if month in monthly_stats:
-            monthly_attendance_data.append(monthly_stats[month]['avg_attendance'])
-            monthly_defaulter_data.append(monthly_stats[month]['defaulter_count'])
+    monthly_attendance_data = [monthly_stats[month]['avg_attendance'] for month in all_months]
+    monthly_defaulter_data = [monthly_stats[month]['defaulter_count'] for month in all_months]
+    
+    # Archived terms come first in the monthly chart, from their pre-aggregated summaries
+    archived_periods = get_archived_period_stats()
+    monthly_labels = [f"{p['period']} ({p['term']})" for p in archived_periods] + all_months
+    monthly_attendance_data = [p['avg_attendance'] for p in archived_periods] + monthly_attendance_data
+    monthly_defaulter_data = [p['defaulter_count'] for p in archived_periods] + monthly_defaulter_data
     
     chart_data = {
         'attendance_categories': attendance_categories,
-        'monthly_labels': all_months,
+        'monthly_labels': monthly_labels,
         'monthly_attendance': monthly_attendance_data,
-        'monthly_defaulter': monthly_defaulter_data
+        'monthly_defaulter': monthly_defaulter_data,
+        'histogram': {
+            'labels': distribution['labels'],
+            'data': distribution['overall']['histogram'],
+            'percentiles': distribution['overall']['percentiles']
+        }
     }
     
-    # Prepare daily attendance statistics
-    # Since we don't have actual daily records, we'll create a representation based on recent monthly data
-    # Use the created_at field to represent when records were entered
-    from collections import defaultdict
-    daily_stats = defaultdict(list)
-    
-    # Group all attendance records by date of entry (created_at)
-    for att in all_attendance:
-        if att.created_at:
-            date_key = att.created_at.strftime('%Y-%m-%d')
-            daily_stats[date_key].append(att.attendance_percentage)
-    
-    # Calculate daily averages
-    daily_averages = {}
-    for date, percentages in daily_stats.items():
-        daily_averages[date] = sum(percentages) / len(percentages) if percentages else 0
-    
-    # Sort by date, get most recent 15 days
-    sorted_daily_averages = dict(sorted(daily_averages.items(), key=lambda x: x[0], reverse=True)[:15])
+    # Average attendance of the records entered on each of the 15 most recent days
+    sorted_daily_averages = get_daily_stats()
     
     overall_stats = {
-        'total_records': total_records,
-        'total_students': total_students,
-        'avg_attendance': round(avg_attendance, 2),
-        'excellent_count': excellent_count,
-        'good_count': good_count,
-        'defaulter_count': defaulter_count
+        'total_records': overall['total_records'],
+        'total_students': overall['total_students'],
+        'avg_attendance': overall['avg_attendance'],
+        'excellent_count': overall['excellent_count'],
+        'good_count': overall['good_count'],
+        'defaulter_count': overall['defaulter_count']
     }
     
+    # Students most at risk by trend and projected end-of-term attendance
+    risk_counts = risk_level_counts()
+    at_risk_scores = get_risk_scores(level='High', limit=50)
+    at_risk_names = dict(Student.query.with_entities(Student.ticket_no, Student.name)
+                         .filter(Student.ticket_no.in_([score.ticket_no for score in at_risk_scores])).all())
+    at_risk_students = [{'score': score, 'name': at_risk_names.get(score.ticket_no)} for score in at_risk_scores]
+    
     return render_template('analysis.html', 
                           overall_stats=overall_stats, 
                           monthly_stats=monthly_stats, 
@@ -139,12 +102,16 @@ def attendance_analysis():
                           months=all_months,
                           chart_data=chart_data,
                           daily_stats=sorted_daily_averages,
+                          risk_counts=risk_counts,
+                          at_risk_students=at_risk_students,
                           current_month=current_month,
                           showing_current_month=showing_current_month,
                           current_month_exists=current_month_exists)
 
 @analysis_bp.route('/analysis/month/<month>')
 @login_required
+@etag_cached
+@admission_controlled('analytics')
 def monthly_analysis(month):
     """Monthly attendance analysis"""
     attendance_records = Attendance.query.filter_by(month=month).all()
@@ -197,60 +164,129 @@ def monthly_analysis(month):
 
 @analysis_bp.route('/api/analysis/stats')
 @login_required
+@etag_cached
+@admission_controlled('analytics')
 def analysis_api():
     """API endpoint for attendance statistics"""
-    all_attendance = Attendance.query.all()
+    # Overall statistics and category counts are aggregated in SQL
+    overall = get_overall_stats()
     
-    if not all_attendance:
+    if not overall['total_records']:
         return jsonify({'success': False, 'message': 'No attendance data available'})
     
-    # Calculate overall statistics
-    total_records = len(all_attendance)
-    total_students = len(set([att.ticket_no for att in all_attendance]))
-    
-    # Calculate average attendance percentage
-    total_percentage = sum([att.attendance_percentage for att in all_attendance])
-    avg_attendance = total_percentage / total_records if total_records > 0 else 0
-    
-    # Calculate attendance categories
-    excellent_count = len([att for att in all_attendance if att.attendance_percentage >= 90])
-    good_count = len([att for att in all_attendance if 75 <= att.attendance_percentage < 90])
-    defaulter_count = len([att for att in all_attendance if att.attendance_percentage < 75])
-    
-    # Get all unique months
-    months = list(set([att.month for att in all_attendance]))
-    months.sort()
-    
-    # Calculate monthly statistics
-    monthly_stats = {}
-    for month in months:
-        month_attendance = [att for att in all_attendance if att.month == month]
-        if month_attendance:
-            month_avg = sum([att.attendance_percentage for att in month_attendance]) / len(month_attendance)
-            monthly_stats[month] = {
-                'avg_attendance': round(month_avg, 2),
-                'total_records': len(month_attendance),
-                'defaulter_count': len([att for att in month_attendance if att.attendance_percentage < 75])
-            }
+    monthly_stats = get_monthly_stats()
+    months = list(monthly_stats)
     
     # Get defaulter count by month
-    defaulter_by_month = {}
-    for month in months:
-        month_attendance = [att for att in all_attendance if att.month == month and att.attendance_percentage < 75]
-        defaulter_by_month[month] = len(month_attendance)
+    defaulter_by_month = {month: stats['defaulter_count'] for month, stats in monthly_stats.items()}
     
     stats_data = {
         'overall': {
-            'total_records': total_records,
-            'total_students': total_students,
-            'avg_attendance': round(avg_attendance, 2),
-            'excellent_count': excellent_count,
-            'good_count': good_count,
-            'defaulter_count': defaulter_count
+            'total_records': overall['total_records'],
+            'total_students': overall['total_students'],
+            'avg_attendance': overall['avg_attendance'],
+            'excellent_count': overall['excellent_count'],
+            'good_count': overall['good_count'],
+            'defaulter_count': overall['defaulter_count']
         },
         'monthly': monthly_stats,
         'defaulter_by_month': defaulter_by_month,
-        'months': months
+        'months': months,
+        'archived_periods': get_archived_period_stats()
     }
     
-    return jsonify({'success': True, 'stats': stats_data})
\ No newline at end of file
+    return jsonify({'success': True, 'stats': stats_data})
+
+@analysis_bp.route('/api/analysis/history')
+@login_required
+@etag_cached
+@admission_controlled('analytics')
+def history_api():
+    """API endpoint for pre-aggregated statistics of archived terms"""
+    batch = request.args.get('batch') or None
+    
+    return jsonify({'success': True, 'periods': get_archived_period_stats(batch)})
+
+@analysis_bp.route('/api/analysis/risk')
+@login_required
+@etag_cached
+@admission_controlled('analytics')
+def risk_api():
+    """API endpoint for per-student trend and risk scores"""
+    level = request.args.get('level')
+    limit = request.args.get('limit', type=int)
+    if limit is not None and limit < 1:
+        return jsonify({'success': False, 'message': 'limit must be a positive number'}), 400
+    
+    scores = get_risk_scores(level=level, limit=limit)
+    
+    return jsonify({
+        'success': True,
+        'counts': risk_level_counts(),
+        'students': [
+            {
+                'ticket_no': score.ticket_no,
+                'risk_level': score.risk_level,
+                'periods_observed': score.periods_observed,
+                'latest_period': score.latest_period,
+                'latest_percentage': score.latest_percentage,
+                'overall_avg': score.overall_avg,
+                'rolling_avg': score.rolling_avg,
+                'trend_slope': score.trend_slope,
+                'consecutive_below': score.consecutive_below,
+                'projected_percentage': score.projected_percentage
+            } for score in scores
+        ]
+    })
+
+@analysis_bp.route('/analysis/cohorts')
+@login_required
+@etag_cached
+@admission_controlled('analytics')
+def cohort_analysis():
+    """Attendance comparison across batches, colleges or trades"""
+    group_by = request.args.get('group_by', 'batch')
+    if group_by not in COHORT_COLUMNS:
+        group_by = 'batch'
+    
+    cohort_stats = get_cohort_stats(group_by)
+    
+    return render_template('cohort_analysis.html',
+                          cohort_stats=cohort_stats,
+                          group_by=group_by,
+                          group_options=list(COHORT_COLUMNS))
+
+@analysis_bp.route('/api/analysis/cohorts')
+@login_required
+@etag_cached
+@admission_controlled('analytics')
+def cohort_api():
+    """API endpoint for per-cohort, per-period attendance statistics"""
+    group_by = request.args.get('group_by', 'batch')
+    if group_by not in COHORT_COLUMNS:
+        return jsonify({'success': False, 'message': f"group_by must be one of: {', '.join(COHORT_COLUMNS)}"}), 400
+    
+    return jsonify({'success': True, 'stats': get_cohort_stats(group_by)})
+
+@analysis_bp.route('/api/analysis/distribution')
+@login_required
+@etag_cached
+@admission_controlled('analytics')
+def distribution_api():
+    """API endpoint for attendance percentage histograms and percentiles"""
+    bin_width = request.args.get('bin_width', 10, type=float)
+    group_by = request.args.get('group_by') or None
+    
+    # Widths are rounded to one decimal so near-identical requests share a cache entry
+    bin_width = round(bin_width, 1) if bin_width else 0
+    if not 0 < bin_width <= 100 or 100 / bin_width > MAX_HISTOGRAM_BINS:
+        return jsonify({'success': False,
+                        'message': f'bin_width must be between {100 / MAX_HISTOGRAM_BINS:g} and 100'}), 400
+    if group_by and group_by not in DISTRIBUTION_GROUPS:
+        return jsonify({'success': False, 'message': f"group_by must be one of: {', '.join(DISTRIBUTION_GROUPS)}"}), 400
+    
+    # Whole-number widths keep the cache key and the labels tidy
+    if bin_width == int(bin_width):
+        bin_width = int(bin_width)
+    
+    return jsonify({'success': True, 'distribution': get_distribution(bin_width, group_by)})
\ No newline at end of file
@@ -1,13 +1,20 @@
 import os
-from flask import Blueprint, request, render_template, redirect, url_for, flash, jsonify
+from flask import Blueprint, request, render_template, redirect, url_for, flash, jsonify, abort, session
 from werkzeug.utils import secure_filename
-from app.models.models import Attendance, Student, db
+from app.models.models import Attendance, db
+from app.controllers.auth_controller import login_required, role_required
+from app.utils.attendance_edit import delete_attendance, replace_attendance, scope_choices
 from app.utils.excel_handler import process_attendance_excel, save_attendance_to_db
 from flask import current_app as app
+from app.utils.admission import admission_controlled
+from app.utils.http_cache import etag_cached
+from app.utils.profiles import get_profile
+from app.utils.schema import ATTENDANCE_SCHEMA
+from app.utils.validation_report import csv_response
 
 attendance_bp = Blueprint('attendance', __name__)
 
-ALLOWED_EXTENSIONS = {'xlsx', 'xls'}
+ALLOWED_EXTENSIONS = {'xlsx', 'xls', 'csv', 'parquet'}
 
 UPLOAD_FOLDER = 'uploads'  # Default upload folder, will be configured in the main app
 
@@ -16,6 +23,7 @@ def allowed_file(filename):
            filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 @attendance_bp.route('/upload-attendance', methods=['GET', 'POST'])
+@admission_controlled('uploads', methods=['POST'])
 def upload_attendance():
     if request.method == 'POST':
         # Check if the post request has the file part
@@ -38,24 +46,46 @@ def upload_attendance():
             file_path = os.path.join(actual_upload_folder, filename)
             file.save(file_path)
             
-            # Process the Excel file
-            result = process_attendance_excel(file_path)
+            # Process the Excel file (recorded in the import history)
+            result = process_attendance_excel(file_path, record_run=True)
             
             if result['success']:
+                # The confirmation completes this run; kept in the signed session so a link cannot name another run
+                session['attendance_import_run'] = result['run_id']
                 # Show preview of data before saving
                 return render_template('attendance_upload_preview.html', 
                                      data=result['data'], 
-                                     errors=result.get('errors', []),
-                                     total_records=len(result['data']))
+                                     errors=result['errors'],
+                                     total_records=len(result['data']),
+                                     total_rows=result['total_rows'],
+                                     skipped_rows=result['skipped_rows'],
+                                     filename=filename)
             else:
                 flash(result['message'], 'error')
                 return redirect(url_for('attendance.upload_attendance'))
         else:
-            flash('Invalid file type. Please upload Excel files only (.xlsx, .xls)', 'error')
+            flash('Invalid file type. Please upload Excel, CSV or Parquet files only (.xlsx, .xls, .csv, .parquet)', 'error')
             return redirect(url_for('attendance.upload_attendance'))
     
     return render_template('upload_attendance.html')
 
+@attendance_bp.route('/upload-attendance/<filename>/issues.csv')
+@login_required
+@admission_controlled('exports')
+def download_upload_issues(filename):
+    # Per-row detail of the preview's validation summary, recomputed from the uploaded file
+    from flask import current_app
+    file_path = os.path.join(getattr(current_app, 'upload_folder', UPLOAD_FOLDER), secure_filename(filename))
+    if not os.path.isfile(file_path):
+        abort(404)
+    
+    result = process_attendance_excel(file_path)
+    if not result['success']:
+        flash(result['message'], 'error')
+        return redirect(url_for('attendance.upload_attendance'))
+    
+    return csv_response(result['report'], f"{os.path.splitext(secure_filename(filename))[0]}_issues.csv")
+
 @attendance_bp.route('/confirm-attendance-upload', methods=['POST'])
 def confirm_attendance_upload():
     # Get the data from the form
@@ -64,21 +94,80 @@ def confirm_attendance_upload():
     if not attendance_data:
         return jsonify({'success': False, 'message': 'No data to save'})
     
-    # Save to database
-    success, message = save_attendance_to_db(attendance_data)
+    # Posted JSON is untyped; convert each column in one pass
+    success, message = save_attendance_to_db(ATTENDANCE_SCHEMA.coerce_records(attendance_data),
+                                             run_id=session.pop('attendance_import_run', None))
     
     if success:
         return jsonify({'success': True, 'message': message})
     else:
         return jsonify({'success': False, 'message': message})
 
+@attendance_bp.route('/manage-attendance', methods=['GET', 'POST'])
+@role_required(['admin'])
+@admission_controlled('uploads', methods=['POST'])
+def manage_attendance():
+    """Delete or replace the attendance of one period and/or batch, previewed with a dry run first"""
+    periods, batches = scope_choices()
+    if request.method == 'GET':
+        return render_template('manage_attendance.html', periods=periods, batches=batches, preview=None)
+    
+    action = request.form.get('action')
+    period = request.form.get('period') or None
+    batch = request.form.get('batch') or None
+    dry_run = request.form.get('dry_run') == '1'
+    filename = None
+    
+    if action == 'delete':
+        success, message, counts = delete_attendance(period, batch, dry_run=dry_run)
+    elif action == 'replace':
+        from flask import current_app
+        upload_folder = getattr(current_app, 'upload_folder', UPLOAD_FOLDER)
+        file = request.files.get('file')
+        if file and file.filename:
+            if not allowed_file(file.filename):
+                flash('Invalid file type. Please upload Excel, CSV or Parquet files only (.xlsx, .xls, .csv, .parquet)', 'error')
+                return redirect(url_for('attendance.manage_attendance'))
+            filename = secure_filename(file.filename)
+            file.save(os.path.join(upload_folder, filename))
+        else:
+            # Confirming a previewed replacement: the file was saved by the dry run
+            filename = secure_filename(request.form.get('filename', ''))
+        file_path = os.path.join(upload_folder, filename)
+        if not filename or not os.path.isfile(file_path):
+            flash('Please select the file with the replacement attendance', 'error')
+            return redirect(url_for('attendance.manage_attendance'))
+        
+        result = process_attendance_excel(file_path)
+        if not result['success']:
+            flash(result['message'], 'error')
+            return redirect(url_for('attendance.manage_attendance'))
+        success, message, counts = replace_attendance(result['data'], period, batch, dry_run=dry_run)
+    else:
+        flash('Unknown action', 'error')
+        return redirect(url_for('attendance.manage_attendance'))
+    
+    if dry_run and success:
+        preview = {'action': action, 'period': period, 'batch': batch, 'filename': filename,
+                   'message': message, 'counts': counts}
+        return render_template('manage_attendance.html', periods=periods, batches=batches, preview=preview)
+    
+    flash(message, 'success' if success else 'error')
+    return redirect(url_for('attendance.manage_attendance'))
+
 @attendance_bp.route('/attendance')
+@etag_cached
 def list_attendance():
-    attendance_records = Attendance.query.all()
-    return render_template('attendance_list.html', attendance_records=attendance_records)
+    # The table is a cached fragment; the query only runs when it has to be rendered
+    attendance_records = Attendance.query
+    return render_template('attendance_list.html', attendance_records=attendance_records,
+                           record_count=attendance_records.count())
 
 @attendance_bp.route('/attendance/student/<ticket_no>')
+@etag_cached
 def get_student_attendance(ticket_no):
-    student = Student.query.filter_by(ticket_no=ticket_no).first_or_404()
-    attendance_records = Attendance.query.filter_by(ticket_no=ticket_no).all()
-    return render_template('student_attendance.html', student=student, attendance_records=attendance_records)
\ No newline at end of file
+    student = get_profile(ticket_no)
+    if student is None:
+        abort(404)
+    return render_template('student_attendance.html', student=student,
+                           attendance_records=student['attendance_records'])
\ No newline at end of file
@@ -1,15 +1,47 @@
-from flask import Blueprint, request, render_template, redirect, url_for, flash, session, jsonify
+from flask import Blueprint, request, render_template, redirect, url_for, flash, session, jsonify, current_app
+from sqlalchemy import event
 from app.models.models import User, db
+from app.utils.cache import TTLCache
 from functools import wraps
 
 auth_bp = Blueprint('auth', __name__)
 
+# Per-process cache of user id -> {'id', 'username', 'role'} (or None for unknown users)
+# so authenticated requests don't query the users table every time
+user_cache = TTLCache(maxsize=1024, ttl=60)
+_NOT_CACHED = object()
+
+def get_cached_user(user_id):
+    """Return a snapshot of the user for the session, querying only on a cache miss"""
+    user_data = user_cache.get(user_id, _NOT_CACHED)
+    if user_data is _NOT_CACHED:
+        user = db.session.get(User, user_id)
+        user_data = {'id': user.id, 'username': user.username, 'role': user.role} if user else None
+        user_cache.set(user_id, user_data, ttl=current_app.config.get('USER_CACHE_TTL'))
+    return user_data
+
+def invalidate_cached_user(user_id):
+    """Forget a cached user so the next request re-reads it"""
+    user_cache.invalidate(user_id)
+
+@event.listens_for(User, 'after_insert')
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _invalidate_user_on_change(mapper, connection, target):
+    invalidate_cached_user(target.id)
+
 def login_required(f):
     """Decorator to require login for routes"""
     @wraps(f)
     def decorated_function(*args, **kwargs):
         if 'user_id' not in session:
             return redirect(url_for('auth.login'))
+        
+        # Users removed since login are caught once their cache entry expires
+        if get_cached_user(session['user_id']) is None:
+            session.clear()
+            return redirect(url_for('auth.login'))
+        
         return f(*args, **kwargs)
     return decorated_function
 
@@ -21,8 +53,8 @@ def role_required(allowed_roles):
             if 'user_id' not in session:
                 return redirect(url_for('auth.login'))
             
-            user = User.query.get(session['user_id'])
-            if not user or user.role not in allowed_roles:
+            user = get_cached_user(session['user_id'])
+            if not user or user['role'] not in allowed_roles:
                 flash('Access denied. Insufficient permissions.', 'error')
                 return redirect(url_for('auth.login'))
             
@@ -42,6 +74,8 @@ def login():
             session['user_id'] = user.id
             session['username'] = user.username
             session['role'] = user.role
+            user_cache.set(user.id, {'id': user.id, 'username': user.username, 'role': user.role},
+                           ttl=current_app.config.get('USER_CACHE_TTL'))
             flash('Login successful!', 'success')
             return redirect(url_for('dashboard.index'))
         else:
@@ -75,6 +109,7 @@ def register():
         
         db.session.add(user)
         db.session.commit()
+        invalidate_cached_user(user.id)
         
         flash('User registered successfully!', 'success')
         return redirect(url_for('auth.register'))
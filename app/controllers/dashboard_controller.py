@@ -1,8 +1,11 @@
 import os
 import glob
 from flask import Blueprint, render_template, flash, redirect, url_for
-from app.models.models import Student, Attendance, db
+from app.models.models import Student, Attendance, StudentProfile, db
 from app.controllers.auth_controller import login_required
+from app.utils.change_feed import record_deletions
+from app.utils.data_version import bump_data_version
+from app.utils.row_counts import get_row_counts, reset_row_count
 
 dashboard_bp = Blueprint('dashboard', __name__)
 
@@ -10,10 +13,12 @@ dashboard_bp = Blueprint('dashboard', __name__)
 @login_required
 def index():
     """Main dashboard showing system overview"""
-    total_students = Student.query.count()
-    total_attendance_records = Attendance.query.count()
+    # Totals come from counters maintained by the write paths instead of COUNT(*) scans
+    row_counts = get_row_counts()
+    total_students = row_counts[Student.__tablename__]
+    total_attendance_records = row_counts[Attendance.__tablename__]
     
-    # Get recent attendance records
+    # Get recent attendance records (created_at is indexed)
     recent_attendance = Attendance.query.order_by(Attendance.created_at.desc()).limit(5).all()
     
     # Get recent students
@@ -34,11 +39,20 @@ def index():
 def clear_data():
     """Clear all student and attendance data from the database"""
     try:
+        # Downstream systems following the change feed see every row deleted
+        record_deletions(Attendance)
+        record_deletions(Student)
+        
         # Delete all attendance records first (due to foreign key constraint)
         Attendance.query.delete()
         
         # Delete all student records
         Student.query.delete()
+        StudentProfile.query.delete()
+        
+        reset_row_count(Attendance)
+        reset_row_count(Student)
+        bump_data_version()
         
         # Commit the changes to the database
         db.session.commit()
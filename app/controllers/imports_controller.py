@@ -0,0 +1,22 @@
+from flask import Blueprint, render_template, request, jsonify
+from app.controllers.auth_controller import role_required
+from app.utils.import_runs import HISTORY_LIMIT, STAGES, recent_runs
+
+imports_bp = Blueprint('imports', __name__)
+
+@imports_bp.route('/history')
+@role_required(['admin'])
+def import_history():
+    """Recent student and attendance imports with their stage timings and throughput"""
+    kind = request.args.get('kind') or None
+    return render_template('import_history.html', runs=recent_runs(kind), stages=STAGES, kind=kind)
+
+@imports_bp.route('/api/runs')
+@role_required(['admin'])
+def import_runs_api():
+    """The latest ?limit= import runs (of ?kind=students or attendance), oldest first"""
+    kind = request.args.get('kind') or None
+    if kind not in (None, 'students', 'attendance'):
+        return jsonify({'success': False, 'message': 'kind must be students or attendance'}), 400
+    limit = min(max(request.args.get('limit', HISTORY_LIMIT, type=int), 1), 1000)
+    return jsonify({'success': True, 'runs': recent_runs(kind, limit)})
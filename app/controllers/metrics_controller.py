@@ -0,0 +1,22 @@
+import hmac
+from flask import Blueprint, Response, current_app, request
+from app.utils.instrumentation import metrics
+
+metrics_bp = Blueprint('metrics', __name__)
+
+# Clients allowed to read the metrics when no METRICS_TOKEN is configured
+LOCAL_ADDRESSES = ('127.0.0.1', '::1')
+
+def _authorized():
+    token = current_app.config.get('METRICS_TOKEN')
+    if token:
+        supplied = request.headers.get('Authorization', '')
+        return hmac.compare_digest(supplied.encode(), f'Bearer {token}'.encode())
+    return request.remote_addr in LOCAL_ADDRESSES
+
+@metrics_bp.route('/metrics')
+def metrics_endpoint():
+    """Expose collected metrics in Prometheus text format (bearer token, or localhost only without one)"""
+    if not _authorized():
+        return Response('Forbidden\n', status=403, mimetype='text/plain')
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
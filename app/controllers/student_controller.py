@@ -1,13 +1,19 @@
 import os
-from flask import Blueprint, request, render_template, redirect, url_for, flash, jsonify
+from flask import Blueprint, request, render_template, redirect, url_for, flash, jsonify, abort, session
 from werkzeug.utils import secure_filename
 from app.models.models import Student, db
+from app.controllers.auth_controller import login_required
 from app.utils.excel_handler import process_student_excel, save_students_to_db
 from flask import current_app as app
+from app.utils.admission import admission_controlled
+from app.utils.http_cache import etag_cached
+from app.utils.profiles import get_profile
+from app.utils.schema import STUDENT_SCHEMA
+from app.utils.validation_report import csv_response
 
 student_bp = Blueprint('student', __name__)
 
-ALLOWED_EXTENSIONS = {'xlsx', 'xls'}
+ALLOWED_EXTENSIONS = {'xlsx', 'xls', 'csv', 'parquet'}
 
 UPLOAD_FOLDER = 'uploads'  # Default upload folder, will be configured in the main app
 
@@ -16,6 +22,7 @@ def allowed_file(filename):
            filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 @student_bp.route('/upload-student-master', methods=['GET', 'POST'])
+@admission_controlled('uploads', methods=['POST'])
 def upload_student_master():
     if request.method == 'POST':
         # Check if the post request has the file part
@@ -38,24 +45,46 @@ def upload_student_master():
             file_path = os.path.join(actual_upload_folder, filename)
             file.save(file_path)
             
-            # Process the Excel file
-            result = process_student_excel(file_path)
+            # Process the Excel file (recorded in the import history)
+            result = process_student_excel(file_path, record_run=True)
             
             if result['success']:
+                # The confirmation completes this run; kept in the signed session so a link cannot name another run
+                session['student_import_run'] = result['run_id']
                 # Show preview of data before saving
                 return render_template('student_upload_preview.html', 
                                      data=result['data'], 
-                                     errors=result.get('errors', []),
-                                     total_records=len(result['data']))
+                                     errors=result['errors'],
+                                     total_records=len(result['data']),
+                                     total_rows=result['total_rows'],
+                                     skipped_rows=result['skipped_rows'],
+                                     filename=filename)
             else:
                 flash(result['message'], 'error')
                 return redirect(url_for('student.upload_student_master'))
         else:
-            flash('Invalid file type. Please upload Excel files only (.xlsx, .xls)', 'error')
+            flash('Invalid file type. Please upload Excel, CSV or Parquet files only (.xlsx, .xls, .csv, .parquet)', 'error')
             return redirect(url_for('student.upload_student_master'))
     
     return render_template('upload_student_master.html')
 
+@student_bp.route('/upload-student-master/<filename>/issues.csv')
+@login_required
+@admission_controlled('exports')
+def download_upload_issues(filename):
+    # Per-row detail of the preview's validation summary, recomputed from the uploaded file
+    from flask import current_app
+    file_path = os.path.join(getattr(current_app, 'upload_folder', UPLOAD_FOLDER), secure_filename(filename))
+    if not os.path.isfile(file_path):
+        abort(404)
+    
+    result = process_student_excel(file_path)
+    if not result['success']:
+        flash(result['message'], 'error')
+        return redirect(url_for('student.upload_student_master'))
+    
+    return csv_response(result['report'], f"{os.path.splitext(secure_filename(filename))[0]}_issues.csv")
+
 @student_bp.route('/confirm-student-upload', methods=['POST'])
 def confirm_student_upload():
     # Get the data from the form
@@ -64,8 +93,9 @@ def confirm_student_upload():
     if not students_data:
         return jsonify({'success': False, 'message': 'No data to save'})
     
-    # Save to database
-    success, message = save_students_to_db(students_data)
+    # Posted JSON is untyped (dates arrive as strings); convert each column in one pass
+    success, message = save_students_to_db(STUDENT_SCHEMA.coerce_records(students_data),
+                                           run_id=session.pop('student_import_run', None))
     
     if success:
         return jsonify({'success': True, 'message': message})
@@ -73,11 +103,16 @@ def confirm_student_upload():
         return jsonify({'success': False, 'message': message})
 
 @student_bp.route('/students')
+@etag_cached
 def list_students():
-    students = Student.query.all()
-    return render_template('students_list.html', students=students)
+    # The table is a cached fragment; the query only runs when it has to be rendered
+    students = Student.query
+    return render_template('students_list.html', students=students, student_count=students.count())
 
 @student_bp.route('/student/<ticket_no>')
+@etag_cached
 def get_student(ticket_no):
-    student = Student.query.filter_by(ticket_no=ticket_no).first_or_404()
+    student = get_profile(ticket_no)
+    if student is None:
+        abort(404)
     return render_template('student_detail.html', student=student)
\ No newline at end of file
@@ -0,0 +1,23 @@
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from app.controllers.auth_controller import login_required
+from app.utils.admission import admission_controlled
+from app.utils.change_feed import get_change_cursor, iter_ndjson
+
+sync_bp = Blueprint('sync', __name__)
+
+@sync_bp.route('/api/changes')
+@login_required
+@admission_controlled('exports')
+def changes():
+    """Stream every student and attendance change after the ?since= cursor as NDJSON"""
+    since = request.args.get('since', 0, type=int)
+    if since < 0:
+        return jsonify({'success': False, 'message': 'since must be a sequence number (0 for a full sync)'}), 400
+    
+    # Changes committed while streaming are left for the next request, which starts at X-Change-Cursor
+    until = get_change_cursor()
+    if since > until:
+        return jsonify({'success': False,
+                        'message': 'Cursor is ahead of the change feed (database replaced?); sync again from 0'}), 409
+    return Response(stream_with_context(iter_ndjson(since, until)), mimetype='application/x-ndjson',
+                    headers={'X-Change-Cursor': str(until)})
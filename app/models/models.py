@@ -1,5 +1,7 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import inspect, text
 from datetime import datetime
+from app.config import Config
 import hashlib
 
 db = SQLAlchemy()
@@ -53,7 +55,8 @@ class Student(db.Model):
     email_id = db.Column(db.String(100))
     blood_group = db.Column(db.String(5))
     current_address_route = db.Column(db.String(200))
-    batch = db.Column(db.String(50))  # Batch/Class information
+    batch = db.Column(db.String(50), index=True)  # Batch/Class information
+    change_seq = db.Column(db.Integer, index=True)  # Position in the change feed, set by every write
     
     # Relationship with attendance records
     attendances = db.relationship('Attendance', backref='student', lazy=True, cascade='all, delete-orphan')
@@ -67,18 +70,217 @@ class Attendance(db.Model):
     Attendance model based on the SRS requirements
     """
     __tablename__ = 'attendance'
+    __table_args__ = (
+        # One record per student per period; also the conflict target for bulk upserts
+        db.Index('uq_attendance_ticket_month', 'ticket_no', 'month', unique=True),
+    )
     
     attendance_id = db.Column(db.Integer, primary_key=True)
     ticket_no = db.Column(db.String(50), db.ForeignKey('students.ticket_no'), nullable=False)
     
     # Attendance fields as per SRS
-    month = db.Column(db.String(20), nullable=False)  # Month name (e.g., January, February)
+    month = db.Column(db.String(20), nullable=False, index=True)  # Month name (e.g., January, February)
     total_days = db.Column(db.Integer, nullable=False)  # Total Working Days
     present_days = db.Column(db.Integer, nullable=False)  # Present Days
     absent_days = db.Column(db.Integer, nullable=False)  # Absent Days
     attendance_percentage = db.Column(db.Float, nullable=False)  # Attendance Percentage
     
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)  # Indexed for "recent" lists
+    change_seq = db.Column(db.Integer, index=True)  # Position in the change feed, set by every write
+    
+    def __repr__(self):
+        return f'<Attendance {self.ticket_no} - {self.month}>'
+
+
+class ChangeTombstone(db.Model):
+    """
+    A deleted student or attendance row, kept so the change feed can report the deletion
+    """
+    __tablename__ = 'change_tombstones'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    change_seq = db.Column(db.Integer, nullable=False, unique=True)
+    table_name = db.Column(db.String(50), nullable=False)  # students or attendance
+    ticket_no = db.Column(db.String(50), nullable=False)
+    month = db.Column(db.String(20))  # Attendance rows only
+    deleted_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<ChangeTombstone {self.change_seq} {self.table_name} {self.ticket_no} {self.month or ""}>'
+
+class StatsCounter(db.Model):
+    """
+    Named integer counters maintained alongside the data (e.g. the data version)
+    """
+    __tablename__ = 'stats_counters'
+    
+    name = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<StatsCounter {self.name}={self.value}>'
+
+
+class StudentRiskScore(db.Model):
+    """
+    Cached per-student trend and risk scores computed from attendance history
+    """
+    __tablename__ = 'student_risk_scores'
+    
+    ticket_no = db.Column(db.String(50), primary_key=True)
+    periods_observed = db.Column(db.Integer, nullable=False)
+    latest_period = db.Column(db.String(20))
+    latest_percentage = db.Column(db.Float)
+    overall_avg = db.Column(db.Float)  # Mean over all observed periods
+    rolling_avg = db.Column(db.Float)  # Mean over the most recent periods
+    trend_slope = db.Column(db.Float)  # Percentage points per period (least squares)
+    consecutive_below = db.Column(db.Integer, nullable=False, default=0)  # Trailing periods under threshold
+    projected_percentage = db.Column(db.Float)  # Projected end-of-term average
+    risk_level = db.Column(db.String(10), nullable=False, index=True)  # High, Medium or Low
+    
+    def __repr__(self):
+        return f'<StudentRiskScore {self.ticket_no} - {self.risk_level}>'
+
+
+class StudentProfile(db.Model):
+    """
+    Denormalized per-student document (details plus chronological attendance history) as JSON
+    """
+    __tablename__ = 'student_profiles'
+    
+    ticket_no = db.Column(db.String(50), primary_key=True)
+    document = db.Column(db.Text, nullable=False)
+    
+    def __repr__(self):
+        return f'<StudentProfile {self.ticket_no}>'
+
+
+class ImportRun(db.Model):
+    """
+    One student or attendance import: its file, row counts and the wall-clock and CPU seconds per stage
+    """
+    __tablename__ = 'import_runs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(20), nullable=False, index=True)  # students or attendance
+    status = db.Column(db.String(20), nullable=False)  # previewed, rejected, completed or failed
+    message = db.Column(db.Text)
+    filename = db.Column(db.String(255))
+    file_hash = db.Column(db.String(64))  # SHA-256 of the uploaded file
+    file_size = db.Column(db.Integer)  # Bytes
+    total_rows = db.Column(db.Integer)  # Rows in the file
+    valid_rows = db.Column(db.Integer)  # Rows that passed validation
+    inserted = db.Column(db.Integer)
+    updated = db.Column(db.Integer)
+    unchanged = db.Column(db.Integer)  # Re-imported rows equal to the stored ones
+    errored = db.Column(db.Integer)  # Rows skipped by validation or lost to a failed write
+    read_seconds = db.Column(db.Float)  # Read workbook
+    read_cpu_seconds = db.Column(db.Float)
+    detect_seconds = db.Column(db.Float)  # Detect columns
+    detect_cpu_seconds = db.Column(db.Float)
+    validate_seconds = db.Column(db.Float)  # Validate and convert
+    validate_cpu_seconds = db.Column(db.Float)
+    write_seconds = db.Column(db.Float)  # Database write
+    write_cpu_seconds = db.Column(db.Float)
+    refresh_seconds = db.Column(db.Float)  # Profile document refresh
+    refresh_cpu_seconds = db.Column(db.Float)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    completed_at = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f'<ImportRun {self.id} {self.kind} - {self.status}>'
+
+
+# Archive tables live in a separate database when ARCHIVE_DATABASE_URL is set
+ARCHIVE_BIND_KEY = 'archive' if Config.ARCHIVE_DATABASE_URL else None
+
+
+class AttendanceArchive(db.Model):
+    """
+    Attendance records of archived (closed) terms, moved out of the attendance table
+    """
+    __tablename__ = 'attendance_archive'
+    __bind_key__ = ARCHIVE_BIND_KEY
+    __table_args__ = (
+        db.Index('uq_attendance_archive_term_ticket_month', 'term', 'ticket_no', 'month', unique=True),
+    )
+    
+    archive_id = db.Column(db.Integer, primary_key=True)
+    term = db.Column(db.String(50), nullable=False, index=True)
+    attendance_id = db.Column(db.Integer)  # Id the record had in the attendance table
+    ticket_no = db.Column(db.String(50), nullable=False)
+    month = db.Column(db.String(20), nullable=False)
+    total_days = db.Column(db.Integer, nullable=False)
+    present_days = db.Column(db.Integer, nullable=False)
+    absent_days = db.Column(db.Integer, nullable=False)
+    attendance_percentage = db.Column(db.Float, nullable=False)
+    created_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     def __repr__(self):
-        return f'<Attendance {self.ticket_no} - {self.month}>'
\ No newline at end of file
+        return f'<AttendanceArchive {self.term} {self.ticket_no} - {self.month}>'
+
+
+class ArchivedPeriodSummary(db.Model):
+    """
+    Pre-aggregated statistics of an archived period, overall (batch is NULL) and per batch
+    """
+    __tablename__ = 'archived_period_summaries'
+    __bind_key__ = ARCHIVE_BIND_KEY
+    
+    id = db.Column(db.Integer, primary_key=True)
+    term = db.Column(db.String(50), nullable=False, index=True)
+    period = db.Column(db.String(20), nullable=False)
+    batch = db.Column(db.String(50))
+    total_records = db.Column(db.Integer, nullable=False)
+    total_students = db.Column(db.Integer, nullable=False)
+    avg_attendance = db.Column(db.Float)
+    excellent_count = db.Column(db.Integer, nullable=False, default=0)
+    good_count = db.Column(db.Integer, nullable=False, default=0)
+    defaulter_count = db.Column(db.Integer, nullable=False, default=0)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<ArchivedPeriodSummary {self.term} {self.period} {self.batch or "all"}>'
+
+
+def _bound_tables():
+    """(table, engine) of every bind; tables of a bind key (e.g. the archive) have their own metadata"""
+    for bind_key, metadata in db.metadatas.items():
+        for table in metadata.sorted_tables:
+            yield table, db.engines[bind_key]
+
+
+def add_missing_columns():
+    """
+    Add columns declared on the models that an existing table lacks
+
+    db.create_all() only creates whole tables. New columns must be nullable
+    (or have a server default), as existing rows get NULL.
+    """
+    for table, engine in _bound_tables():
+        inspector = inspect(engine)
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            column_type = column.type.compile(dialect=engine.dialect)
+            with engine.begin() as connection:
+                connection.execute(text(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}'))
+
+
+def create_missing_indexes():
+    """
+    Create indexes declared on the models that an existing database lacks
+
+    db.create_all() only creates indexes together with new tables.
+    """
+    for table, engine in _bound_tables():
+        for index in table.indexes:
+            try:
+                index.create(bind=engine, checkfirst=True)
+            except Exception as e:
+                # e.g. a unique index over rows that already contain duplicates
+                print(f"Could not create index {index.name}: {str(e)}")
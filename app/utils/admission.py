@@ -0,0 +1,135 @@
+"""
+Admission control for expensive endpoints
+
+Analytics, uploads and exports each draw from their own pool of
+ADMISSION_POOLS slots in every worker process. A request finding its
+pool busy waits in a bounded queue for up to ADMISSION_QUEUE_TIMEOUT seconds;
+when the queue is full or the wait times out it is answered at once with 503
+Service Unavailable and a Retry-After header instead of tying up a worker
+thread. Cheap endpoints (login, dashboard, search) are never queued, so they
+keep the remaining threads however many heavy requests arrive. Upload
+confirmations are not limited either: the write queue already runs them one
+at a time, and a confirmed upload must never be dropped.
+
+Per-pool in-flight requests, queue depth, waits and rejections are reported
+in the metrics registry (see /metrics).
+"""
+import threading
+import time
+from functools import wraps
+from flask import current_app, jsonify, make_response, render_template, request
+from app.utils.instrumentation import metrics
+
+metrics.gauge('admission_in_flight', 'Requests holding an admission slot by pool')
+metrics.gauge('admission_queue_depth', 'Requests waiting for an admission slot by pool')
+metrics.counter('admission_admitted_total', 'Requests admitted by pool')
+metrics.counter('admission_rejections_total', 'Requests answered with 503 by pool and reason (queue_full or timeout)')
+metrics.histogram('admission_wait_seconds', 'Time admitted requests waited for a slot by pool')
+
+
+class AdmissionPool:
+    """
+    At most limit concurrent holders and queue_size waiters; further requests are turned away
+    """
+
+    def __init__(self, name, limit, queue_size, timeout):
+        self.name = name
+        self.limit = limit
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(limit)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.waiting = 0
+
+    def _report(self):
+        metrics.set('admission_in_flight', self.in_flight, pool=self.name)
+        metrics.set('admission_queue_depth', self.waiting, pool=self.name)
+
+    def acquire(self):
+        """Take a slot, waiting in the queue if there is room; returns None or the rejection reason"""
+        start = time.perf_counter()
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                if self.waiting >= self.queue_size:
+                    metrics.inc('admission_rejections_total', pool=self.name, reason='queue_full')
+                    return 'queue_full'
+                self.waiting += 1
+                self._report()
+            try:
+                acquired = self._slots.acquire(timeout=self.timeout)
+            finally:
+                with self._lock:
+                    self.waiting -= 1
+                    self._report()
+            if not acquired:
+                metrics.inc('admission_rejections_total', pool=self.name, reason='timeout')
+                return 'timeout'
+        with self._lock:
+            self.in_flight += 1
+            self._report()
+        metrics.inc('admission_admitted_total', pool=self.name)
+        metrics.observe('admission_wait_seconds', time.perf_counter() - start, pool=self.name)
+        return None
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+            self._report()
+        self._slots.release()
+
+
+_pools_lock = threading.Lock()
+
+
+def get_pool(name):
+    """The app's pool of the given name, created from ADMISSION_POOLS on first use"""
+    with _pools_lock:
+        pools = current_app.extensions.setdefault('admission_pools', {})
+        if name not in pools:
+            limit, queue_size = current_app.config['ADMISSION_POOLS'][name]
+            pools[name] = AdmissionPool(name, limit, queue_size, current_app.config['ADMISSION_QUEUE_TIMEOUT'])
+        return pools[name]
+
+
+def _overloaded_response():
+    retry_after = str(current_app.config['ADMISSION_RETRY_AFTER'])
+    message = 'The server is busy with other requests of this kind; please try again shortly'
+    if request.is_json or request.accept_mimetypes.best == 'application/json' or '/api/' in request.path:
+        response = make_response(jsonify({'success': False, 'message': message}), 503)
+    else:
+        response = make_response(render_template('503.html', message=message, retry_after=retry_after), 503)
+    response.headers['Retry-After'] = retry_after
+    return response
+
+
+def admission_controlled(pool_name, methods=None):
+    """
+    Decorator limiting the concurrent requests of a view to the slots of a pool
+
+    Only requests with one of methods (all if None) are limited, e.g. the POST
+    of an upload form but not its GET. A streamed response keeps its slot until
+    it has been sent.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if not current_app.config.get('ADMISSION_CONTROL_ENABLED') or \
+                    (methods is not None and request.method not in methods):
+                return f(*args, **kwargs)
+
+            pool = get_pool(pool_name)
+            if pool.acquire() is not None:
+                return _overloaded_response()
+            try:
+                response = make_response(f(*args, **kwargs))
+            except BaseException:
+                pool.release()
+                raise
+            if response.is_streamed:
+                response.call_on_close(pool.release)
+            else:
+                pool.release()
+            return response
+        return decorated_function
+    return decorator
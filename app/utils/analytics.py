@@ -0,0 +1,362 @@
+"""
+Attendance analytics computed with SQL aggregation or over fetched column arrays,
+never by loading model instances
+
+Overall, monthly, defaulter and distribution statistics are computed from the
+memory-mapped attendance snapshot when it is current (see snapshot.py).
+"""
+import math
+from types import SimpleNamespace
+import numpy as np
+import pandas as pd
+from sqlalchemy import case, func, select
+from app.models.models import Attendance, Student, db
+from app.utils.analytics_cache import cached_analytics
+from app.utils.periods import sort_periods
+from app.utils.row_counts import KEY_CHUNK_SIZE
+from app.utils.snapshot import current_snapshot
+
+DEFAULTER_THRESHOLD = 75
+EXCELLENT_THRESHOLD = 90
+
+PERCENTILES = (10, 25, 50, 75, 90)
+
+# Student columns attendance can be grouped by
+COHORT_COLUMNS = {
+    'batch': Student.batch,
+    'college_name': Student.college_name,
+    'qualification_trade': Student.qualification_trade
+}
+
+
+def _round_average(value):
+    """
+    An average to 2 places, independent of the order its values were summed in
+
+    Rounding to 6 places first removes summation noise, so exact half-cent ties
+    round the same way in SQL and over the snapshot.
+    """
+    return round(round(float(value), 6), 2)
+
+
+def _category_columns():
+    percentage = Attendance.attendance_percentage
+    return [
+        func.count().label('total_records'),
+        func.count(func.distinct(Attendance.ticket_no)).label('total_students'),
+        func.avg(percentage).label('avg_attendance'),
+        func.sum(case((percentage >= EXCELLENT_THRESHOLD, 1), else_=0)).label('excellent_count'),
+        func.sum(case(((percentage >= DEFAULTER_THRESHOLD) & (percentage < EXCELLENT_THRESHOLD), 1),
+                      else_=0)).label('good_count'),
+        func.sum(case((percentage < DEFAULTER_THRESHOLD, 1), else_=0)).label('defaulter_count')
+    ]
+
+
+def _summarize(row):
+    total = row.total_records or 0
+    defaulters = int(row.defaulter_count or 0)
+    return {
+        'total_records': total,
+        'total_students': row.total_students or 0,
+        'avg_attendance': _round_average(row.avg_attendance) if row.avg_attendance is not None else None,
+        'defaulter_rate': round(defaulters / total * 100, 2) if total else None,
+        'excellent_count': int(row.excellent_count or 0),
+        'good_count': int(row.good_count or 0),
+        'defaulter_count': defaulters
+    }
+
+
+def compute_cohort_stats(group_by='batch'):
+    """
+    Attendance statistics per cohort and per cohort per period
+
+    Joins attendance to students and groups in SQL by the chosen student
+    column. Returns {'group_by', 'periods', 'cohorts': [...]} where each
+    cohort has overall stats plus a 'periods' mapping of period -> stats.
+    """
+    cohort_column = COHORT_COLUMNS[group_by]
+    joined = lambda query: query.select_from(Attendance).join(Student, Student.ticket_no == Attendance.ticket_no)
+
+    totals = db.session.execute(
+        joined(select(cohort_column.label('cohort'), *_category_columns()))
+        .group_by(cohort_column)).all()
+    per_period = db.session.execute(
+        joined(select(cohort_column.label('cohort'), Attendance.month.label('period'), *_category_columns()))
+        .group_by(cohort_column, Attendance.month)).all()
+
+    periods_by_cohort = {}
+    all_periods = set()
+    for row in per_period:
+        periods_by_cohort.setdefault(row.cohort, {})[row.period] = _summarize(row)
+        all_periods.add(row.period)
+    periods = sort_periods(all_periods)
+
+    cohorts = []
+    for row in totals:
+        cohort_periods = periods_by_cohort.get(row.cohort, {})
+        cohort = _summarize(row)
+        cohort['cohort'] = row.cohort if row.cohort is not None else 'Unassigned'
+        cohort['periods'] = {period: cohort_periods[period] for period in periods if period in cohort_periods}
+        cohorts.append(cohort)
+    cohorts.sort(key=lambda c: c['cohort'])
+
+    return {'group_by': group_by, 'periods': periods, 'cohorts': cohorts}
+
+
+def get_cohort_stats(group_by='batch'):
+    """Cohort statistics from the analytics cache"""
+    return cached_analytics('cohort_stats', lambda: compute_cohort_stats(group_by), group_by)
+
+
+def _snapshot_categories(snapshot):
+    """The _category_columns() aggregates over the snapshot's arrays"""
+    percentage = snapshot.percentage
+    return SimpleNamespace(
+        total_records=snapshot.rows,
+        total_students=len(snapshot.tickets),  # Every listed ticket has at least one row
+        avg_attendance=float(percentage.mean(dtype=np.float64)) if snapshot.rows else None,
+        excellent_count=int(np.count_nonzero(percentage >= EXCELLENT_THRESHOLD)),
+        good_count=int(np.count_nonzero((percentage >= DEFAULTER_THRESHOLD) & (percentage < EXCELLENT_THRESHOLD))),
+        defaulter_count=int(np.count_nonzero(percentage < DEFAULTER_THRESHOLD)))
+
+
+def compute_overall_stats():
+    """Overall record counts, average and category counts in a single aggregate query"""
+    snapshot = current_snapshot()
+    if snapshot is not None:
+        return _summarize(_snapshot_categories(snapshot))
+    row = db.session.execute(select(*_category_columns())).one()
+    return _summarize(row)
+
+
+def get_overall_stats():
+    """Overall statistics from the analytics cache"""
+    return cached_analytics('overall_stats', compute_overall_stats)
+
+
+def _snapshot_monthly_stats(snapshot):
+    n_periods = len(snapshot.periods)
+    counts = np.bincount(snapshot.period, minlength=n_periods)
+    sums = np.bincount(snapshot.period, weights=snapshot.percentage, minlength=n_periods)
+    defaulters = np.bincount(snapshot.period[snapshot.percentage < DEFAULTER_THRESHOLD], minlength=n_periods)
+    return {
+        period: {
+            'avg_attendance': _round_average(sums[i] / counts[i]),
+            'total_records': int(counts[i]),
+            'defaulter_count': int(defaulters[i])
+        }
+        for i, period in enumerate(snapshot.periods) if counts[i]
+    }
+
+
+def compute_monthly_stats():
+    """Average, record count and defaulter count per period, in chronological order"""
+    snapshot = current_snapshot()
+    if snapshot is not None:
+        return _snapshot_monthly_stats(snapshot)
+    percentage = Attendance.attendance_percentage
+    rows = db.session.execute(
+        select(Attendance.month,
+               func.avg(percentage).label('avg_attendance'),
+               func.count().label('total_records'),
+               func.sum(case((percentage < DEFAULTER_THRESHOLD, 1), else_=0)).label('defaulter_count'))
+        .group_by(Attendance.month)).all()
+    by_month = {row.month: row for row in rows}
+    return {
+        month: {
+            'avg_attendance': _round_average(by_month[month].avg_attendance),
+            'total_records': by_month[month].total_records,
+            'defaulter_count': int(by_month[month].defaulter_count or 0)
+        }
+        for month in sort_periods(by_month)
+    }
+
+
+def get_monthly_stats():
+    """Monthly statistics from the analytics cache"""
+    return cached_analytics('monthly_stats', compute_monthly_stats)
+
+
+def _snapshot_defaulter_list(snapshot):
+    n_tickets = len(snapshot.tickets)
+    counts = np.bincount(snapshot.ticket, minlength=n_tickets)
+    sums = np.bincount(snapshot.ticket, weights=snapshot.percentage, minlength=n_tickets)
+    codes = np.flatnonzero(np.bincount(snapshot.ticket[snapshot.percentage < DEFAULTER_THRESHOLD],
+                                       minlength=n_tickets))
+
+    # Periods of every defaulter: their rows ordered by ticket, then chronologically
+    rows = np.flatnonzero(np.isin(snapshot.ticket, codes))
+    rows = rows[np.lexsort((snapshot.period[rows], snapshot.ticket[rows]))]
+    bounds = np.searchsorted(snapshot.ticket[rows], codes, side='right')
+
+    tickets = [snapshot.tickets[code] for code in codes]
+    students = {}
+    for start in range(0, len(tickets), KEY_CHUNK_SIZE):
+        for row in db.session.execute(
+                select(Student.ticket_no, Student.name, Student.qualification_trade)
+                .where(Student.ticket_no.in_(tickets[start:start + KEY_CHUNK_SIZE]))):
+            students[row.ticket_no] = row
+
+    defaulter_list = []
+    start = 0
+    for code, ticket_no, end in zip(codes, tickets, bounds):
+        student = students.get(ticket_no)
+        if student is not None:  # Rows of unknown students are not listed, as with the SQL join
+            defaulter_list.append({
+                'student': {'ticket_no': ticket_no, 'name': student.name,
+                            'qualification_trade': student.qualification_trade},
+                'avg_attendance': _round_average(sums[code] / counts[code]),
+                'attendance_records': [{'month': snapshot.periods[period]}
+                                       for period in snapshot.period[rows[start:end]]]
+            })
+        start = end
+    defaulter_list.sort(key=lambda d: (d['avg_attendance'], d['student']['ticket_no']))
+    return defaulter_list
+
+
+def compute_defaulter_list():
+    """
+    Students with at least one period below the defaulter threshold, lowest average first
+
+    Each entry holds the student's ticket_no, name and trade, their average over all
+    periods and the periods they have records for, as plain data safe to cache.
+    """
+    snapshot = current_snapshot()
+    if snapshot is not None:
+        return _snapshot_defaulter_list(snapshot)
+    defaulters = select(Attendance.ticket_no).where(
+        Attendance.attendance_percentage < DEFAULTER_THRESHOLD).distinct().scalar_subquery()
+    averages = db.session.execute(
+        select(Student.ticket_no, Student.name, Student.qualification_trade,
+               func.avg(Attendance.attendance_percentage).label('avg_attendance'))
+        .join(Attendance, Attendance.ticket_no == Student.ticket_no)
+        .where(Student.ticket_no.in_(defaulters))
+        .group_by(Student.ticket_no, Student.name, Student.qualification_trade)).all()
+    periods = {}
+    for ticket_no, month in db.session.execute(
+            select(Attendance.ticket_no, Attendance.month).where(Attendance.ticket_no.in_(defaulters))):
+        periods.setdefault(ticket_no, []).append(month)
+
+    defaulter_list = [{
+        'student': {'ticket_no': row.ticket_no, 'name': row.name, 'qualification_trade': row.qualification_trade},
+        'avg_attendance': _round_average(row.avg_attendance),
+        'attendance_records': [{'month': month} for month in sort_periods(periods.get(row.ticket_no, []))]
+    } for row in averages]
+    defaulter_list.sort(key=lambda d: (d['avg_attendance'], d['student']['ticket_no']))
+    return defaulter_list
+
+
+def get_defaulter_list():
+    """Defaulter list from the analytics cache"""
+    return cached_analytics('defaulter_list', compute_defaulter_list)
+
+
+def compute_daily_stats(days=15):
+    """Average attendance of the records entered on each of the most recent days"""
+    entry_date = func.date(Attendance.created_at)
+    rows = db.session.execute(
+        select(entry_date.label('entry_date'), func.avg(Attendance.attendance_percentage).label('avg_attendance'))
+        .where(Attendance.created_at.isnot(None))
+        .group_by(entry_date).order_by(entry_date.desc()).limit(days)).all()
+    return {str(row.entry_date): float(row.avg_attendance) for row in rows}
+
+
+def get_daily_stats(days=15):
+    """Daily statistics from the analytics cache"""
+    return cached_analytics('daily_stats', lambda: compute_daily_stats(days), days)
+
+
+def category_chart_data(overall_stats):
+    """The three-bucket chart structure used by the analysis page"""
+    return {
+        'labels': ['Excellent (90%+)', 'Good (75-89%)', 'Defaulter (<75%)'],
+        'data': [overall_stats['excellent_count'], overall_stats['good_count'], overall_stats['defaulter_count']],
+        'colors': ['#198754', '#ffc107', '#dc3545']  # Bootstrap colors: success, warning, danger
+    }
+
+
+# Columns a distribution can be broken down by
+DISTRIBUTION_GROUPS = dict(COHORT_COLUMNS, month=Attendance.month)
+
+# Most bins a distribution may have, i.e. the narrowest bin width is 100 / MAX_HISTOGRAM_BINS
+MAX_HISTOGRAM_BINS = 200
+
+
+def histogram_labels(bin_width):
+    """Labels of the histogram bins covering 0-100% in steps of bin_width"""
+    n_bins = int(math.ceil(100 / bin_width))
+    edges = [min(i * bin_width, 100) for i in range(n_bins + 1)]
+    return [f"{edges[i]:g}-{edges[i + 1]:g}" for i in range(n_bins)]
+
+
+def _describe(values, histogram):
+    if not len(values):
+        return {'count': 0, 'mean': None, 'histogram': histogram.tolist(),
+                'percentiles': {f"p{p}": None for p in PERCENTILES}}
+    quantiles = np.percentile(values, PERCENTILES)
+    return {
+        'count': int(len(values)),
+        'mean': _round_average(values.mean()),
+        'histogram': histogram.tolist(),
+        'percentiles': {f"p{p}": round(float(q), 2) for p, q in zip(PERCENTILES, quantiles)}
+    }
+
+
+def compute_distribution(bin_width=10, group_by=None):
+    """
+    Histogram and percentiles of attendance_percentage, overall and per group
+
+    Reads the percentage column (and the group key) from the snapshot, or
+    fetches them as plain tuples in one query, and bins every group at once
+    with a single np.bincount.
+    """
+    labels = histogram_labels(bin_width)
+    n_bins = len(labels)
+    percentage = Attendance.attendance_percentage
+
+    # Cohort columns live in the students table, which the snapshot does not hold
+    snapshot = current_snapshot() if group_by in (None, 'month') else None
+    if snapshot is not None:
+        values = snapshot.percentage.astype(np.float64)
+        if group_by:
+            codes, groups = snapshot.period.astype(np.int64), snapshot.periods
+    elif group_by:
+        group_column = DISTRIBUTION_GROUPS[group_by]
+        query = select(group_column, percentage).select_from(Attendance)
+        if group_by in COHORT_COLUMNS:
+            query = query.outerjoin(Student, Student.ticket_no == Attendance.ticket_no)
+        rows = db.session.execute(query).all()
+        keys = [row[0] if row[0] is not None else 'Unassigned' for row in rows]
+        values = np.fromiter((row[1] for row in rows), dtype=np.float64, count=len(rows))
+        codes, groups = pd.factorize(np.asarray(keys, dtype=object))
+    else:
+        values = np.fromiter(db.session.execute(select(percentage)).scalars(), dtype=np.float64)
+
+    bins = np.clip((values // bin_width).astype(np.int64), 0, n_bins - 1)
+    result = {
+        'bin_width': bin_width,
+        'labels': labels,
+        'group_by': group_by,
+        'overall': _describe(values, np.bincount(bins, minlength=n_bins))
+    }
+
+    if group_by:
+        n_groups = len(groups)
+        histograms = np.bincount(codes * n_bins + bins, minlength=n_groups * n_bins).reshape(n_groups, n_bins)
+        # Sort values by group once so each group's values are a contiguous slice
+        order = np.argsort(codes, kind='stable')
+        sorted_values = values[order]
+        bounds = np.concatenate(([0], np.cumsum(np.bincount(codes, minlength=n_groups))))
+        described = {
+            groups[g]: _describe(sorted_values[bounds[g]:bounds[g + 1]], histograms[g])
+            for g in range(n_groups)
+        }
+        ordered_groups = sort_periods(described) if group_by == 'month' else sorted(described)
+        result['groups'] = {group: described[group] for group in ordered_groups}
+
+    return result
+
+
+def get_distribution(bin_width=10, group_by=None):
+    """Distribution from the analytics cache"""
+    return cached_analytics('distribution', lambda: compute_distribution(bin_width, group_by), bin_width, group_by)
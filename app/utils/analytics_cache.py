@@ -0,0 +1,51 @@
+"""
+In-process cache for computed analytics
+
+Entries are keyed on the data version, so an import or clear makes every
+cached result unreachable without explicit invalidation. Concurrent misses on
+the same key wait for the single in-flight computation instead of each
+recomputing it.
+"""
+import threading
+from concurrent.futures import Future
+from app.utils.cache import TTLCache
+from app.utils.data_version import get_data_version
+
+_MISSING = object()
+
+analytics_cache = TTLCache(maxsize=256, ttl=3600)
+
+_in_flight = {}
+_in_flight_lock = threading.Lock()
+
+
+def cached_analytics(name, compute, *params):
+    """Return compute() for the current data version, computing it at most once per version"""
+    key = (name, get_data_version()) + tuple(params)
+    value = analytics_cache.get(key, _MISSING)
+    if value is not _MISSING:
+        return value
+
+    with _in_flight_lock:
+        value = analytics_cache.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        future = _in_flight.get(key)
+        computing = future is None
+        if computing:
+            future = _in_flight[key] = Future()
+
+    if not computing:
+        return future.result()
+
+    try:
+        value = compute()
+        analytics_cache.set(key, value)
+        future.set_result(value)
+        return value
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _in_flight_lock:
+            _in_flight.pop(key, None)
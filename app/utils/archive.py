@@ -0,0 +1,203 @@
+"""
+Archival of closed terms
+
+Archiving moves a term's attendance periods out of the attendance table into
+attendance_archive and stores pre-aggregated per-period summaries, so the hot
+table (and every query over it) only holds the active terms while historical
+charts are served from the summaries. Restoring moves the rows back.
+"""
+from sqlalchemy import delete, func, select
+from app.models.models import (db, Attendance, Student, AttendanceArchive, ArchivedPeriodSummary,
+                               ARCHIVE_BIND_KEY)
+from app.utils.analytics import _category_columns, _summarize
+from app.utils.bulk_loader import bulk_upsert
+from app.utils.change_feed import record_deletions, stamp_rows
+from app.utils.data_version import bump_data_version
+from app.utils.profiles import refresh_profiles
+from app.utils.row_counts import adjust_row_count
+from app.utils.periods import period_sort_key
+from app.utils.write_queue import write_queue
+
+RECORD_COLUMNS = ['ticket_no', 'month', 'total_days', 'present_days', 'absent_days',
+                  'attendance_percentage', 'created_at']
+
+# Batch of the per-batch summaries of students without one; None marks the overall summary
+UNASSIGNED_BATCH = 'Unassigned'
+
+
+def _period_summaries(term, periods):
+    """Summary rows for the given periods, overall (batch None) and per batch (UNASSIGNED_BATCH for none)"""
+    period_filter = Attendance.month.in_(periods)
+    overall = db.session.execute(
+        select(Attendance.month.label('period'), *_category_columns())
+        .where(period_filter).group_by(Attendance.month)).all()
+    batch = func.coalesce(Student.batch, UNASSIGNED_BATCH)
+    per_batch = db.session.execute(
+        select(Attendance.month.label('period'), batch.label('batch'), *_category_columns())
+        .select_from(Attendance).join(Student, Student.ticket_no == Attendance.ticket_no)
+        .where(period_filter).group_by(Attendance.month, batch)).all()
+
+    summaries = []
+    for row, batch in [(row, None) for row in overall] + [(row, row.batch) for row in per_batch]:
+        stats = _summarize(row)
+        summaries.append(ArchivedPeriodSummary(
+            term=term,
+            period=row.period,
+            batch=batch,
+            total_records=stats['total_records'],
+            total_students=stats['total_students'],
+            avg_attendance=stats['avg_attendance'],
+            excellent_count=stats['excellent_count'],
+            good_count=stats['good_count'],
+            defaulter_count=stats['defaulter_count']
+        ))
+    return summaries
+
+
+def _archive_term(term, periods):
+    try:
+        records = db.session.execute(
+            select(Attendance.attendance_id, *[getattr(Attendance, c) for c in RECORD_COLUMNS])
+            .where(Attendance.month.in_(periods))).mappings().all()
+        if not records:
+            return False, f"No attendance records found for: {', '.join(periods)}"
+
+        found_periods = sorted({record['month'] for record in records}, key=period_sort_key)
+        summaries = _period_summaries(term, found_periods)
+
+        bulk_upsert(AttendanceArchive, [dict(record, term=term) for record in records],
+                    key_columns=['term', 'ticket_no', 'month'], exclude_from_update=['archived_at'])
+        db.session.execute(delete(ArchivedPeriodSummary).where(
+            ArchivedPeriodSummary.term == term, ArchivedPeriodSummary.period.in_(found_periods)))
+        db.session.add_all(summaries)
+
+        if ARCHIVE_BIND_KEY:
+            # Separate archive database: make the copy durable before removing the hot rows,
+            # so a failure below leaves the records in both places rather than in neither
+            db.session.commit()
+
+        record_deletions(Attendance, Attendance.month.in_(found_periods))
+        db.session.execute(delete(Attendance).where(Attendance.month.in_(found_periods)))
+        adjust_row_count(Attendance, -len(records))
+        refresh_profiles(record['ticket_no'] for record in records)
+        bump_data_version()
+        db.session.commit()
+        return True, f"Archived {len(records)} attendance records ({', '.join(found_periods)}) as term {term}"
+    except Exception as e:
+        db.session.rollback()
+        return False, f"Database error: {str(e)}"
+
+
+def _restore_term(term):
+    try:
+        records = db.session.execute(
+            select(*[getattr(AttendanceArchive, c) for c in RECORD_COLUMNS])
+            .where(AttendanceArchive.term == term)).mappings().all()
+        if not records:
+            return False, f"No archived records found for term {term}"
+
+        periods = sorted({record['month'] for record in records}, key=period_sort_key)
+        live_periods = db.session.execute(
+            select(Attendance.month).where(Attendance.month.in_(periods)).distinct()).scalars().all()
+        if live_periods:
+            return False, f"Attendance for {', '.join(live_periods)} already exists; delete it before restoring"
+
+        tickets = {record['ticket_no'] for record in records}
+        known_tickets = set(db.session.execute(
+            select(Student.ticket_no).where(Student.ticket_no.in_(tickets))).scalars())
+        restorable = [dict(record) for record in records if record['ticket_no'] in known_tickets]
+
+        bulk_upsert(Attendance, stamp_rows(Attendance, restorable), key_columns=['ticket_no', 'month'])
+        adjust_row_count(Attendance, len(restorable))
+        refresh_profiles(record['ticket_no'] for record in restorable)
+        bump_data_version()
+
+        if ARCHIVE_BIND_KEY:
+            db.session.commit()
+
+        restored = delete(AttendanceArchive).where(AttendanceArchive.term == term)
+        if len(restorable) < len(records):
+            restored = restored.where(AttendanceArchive.ticket_no.in_(known_tickets))
+        db.session.execute(restored)
+        # The periods are live again, so their summaries would count them twice in history charts
+        db.session.execute(delete(ArchivedPeriodSummary).where(ArchivedPeriodSummary.term == term))
+        db.session.commit()
+
+        message = f"Restored {len(restorable)} attendance records of term {term}"
+        if len(restorable) < len(records):
+            message += f"; {len(records) - len(restorable)} records of deleted students were kept in the archive"
+        return True, message
+    except Exception as e:
+        db.session.rollback()
+        return False, f"Database error: {str(e)}"
+
+
+def archive_term(term, periods):
+    """
+    Move the attendance records of the given periods into the archive under a term name
+
+    Runs on the writer thread, so it never overlaps an import. Returns
+    (success, message) like the import helpers.
+    """
+    periods = list(dict.fromkeys(p for p in periods if p))
+    if not term or not periods:
+        return False, "A term name and at least one period are required"
+    try:
+        return write_queue.run(_archive_term, term, periods)
+    except Exception as e:
+        return False, f"Database error: {str(e)}"
+
+
+def restore_term(term):
+    """
+    Move an archived term's records back into the attendance table
+
+    Refuses when any of the term's periods already has live attendance records.
+    Records of students that no longer exist stay in the archive. Runs on the
+    writer thread like archive_term.
+    """
+    try:
+        return write_queue.run(_restore_term, term)
+    except Exception as e:
+        return False, f"Database error: {str(e)}"
+
+
+def list_archived_terms():
+    """Archived terms with their periods, record counts and archive time"""
+    rows = ArchivedPeriodSummary.query.filter(ArchivedPeriodSummary.batch.is_(None)).all()
+    terms = {}
+    for row in rows:
+        term = terms.setdefault(row.term, {'term': row.term, 'periods': [], 'total_records': 0,
+                                           'archived_at': row.archived_at})
+        term['periods'].append(row.period)
+        term['total_records'] += row.total_records
+        if row.archived_at and (term['archived_at'] is None or row.archived_at > term['archived_at']):
+            term['archived_at'] = row.archived_at
+    for term in terms.values():
+        term['periods'].sort(key=period_sort_key)
+    return sorted(terms.values(), key=lambda t: t['term'])
+
+
+def get_archived_period_stats(batch=None):
+    """
+    Pre-aggregated statistics of archived periods, oldest term first
+
+    batch=None returns the overall summaries; otherwise those of one batch.
+    """
+    query = ArchivedPeriodSummary.query
+    if batch is None:
+        query = query.filter(ArchivedPeriodSummary.batch.is_(None))
+    else:
+        query = query.filter(ArchivedPeriodSummary.batch == batch)
+    rows = sorted(query.all(), key=lambda row: (row.term, period_sort_key(row.period)))
+    return [{
+        'term': row.term,
+        'period': row.period,
+        'batch': row.batch,
+        'total_records': row.total_records,
+        'total_students': row.total_students,
+        'avg_attendance': row.avg_attendance,
+        'excellent_count': row.excellent_count,
+        'good_count': row.good_count,
+        'defaulter_count': row.defaulter_count
+    } for row in rows]
@@ -0,0 +1,142 @@
+"""
+Targeted deletion and replacement of attendance by period and/or batch
+
+A scope is a period, a batch or both. Deleting removes the scope's rows with
+one set-based DELETE (by the month index, and the batch index through a
+ticket_no subquery); replacing deletes them and bulk-inserts the new rows in
+the same transaction, so readers see either the old or the new data. Both run
+on the import writer thread and keep the row counts, profile documents, change
+feed and data version (and with it every cache) in step. A dry run reports the
+affected counts without writing anything.
+"""
+from sqlalchemy import delete, func, select
+from app.models.models import Attendance, Student, db
+from app.utils.bulk_loader import bulk_upsert
+from app.utils.change_feed import record_deletions, stamp_rows
+from app.utils.data_version import bump_data_version
+from app.utils.periods import sort_periods
+from app.utils.profiles import refresh_profiles
+from app.utils.row_counts import KEY_CHUNK_SIZE, adjust_row_count
+from app.utils.write_queue import run_with_retry, write_queue
+
+
+def scope_conditions(period=None, batch=None):
+    """WHERE conditions selecting the attendance rows of a period and/or batch"""
+    conditions = []
+    if period:
+        conditions.append(Attendance.month == period)
+    if batch:
+        conditions.append(Attendance.ticket_no.in_(select(Student.ticket_no).where(Student.batch == batch)))
+    return conditions
+
+
+def describe_scope(period=None, batch=None):
+    return ' and '.join(part for part in [f"period {period}" if period else None,
+                                           f"batch {batch}" if batch else None] if part)
+
+
+def scope_counts(period=None, batch=None):
+    """Records, students and periods currently in the scope, in one aggregate query"""
+    row = db.session.execute(
+        select(func.count(), func.count(func.distinct(Attendance.ticket_no)),
+               func.count(func.distinct(Attendance.month)))
+        .where(*scope_conditions(period, batch))).one()
+    return {'records': row[0], 'students': row[1], 'periods': row[2]}
+
+
+def rows_outside_scope(rows, period=None, batch=None):
+    """Number of replacement rows that do not belong to the scope (another period or batch)"""
+    outside = {i for i, row in enumerate(rows) if period and row['month'] != period}
+    if batch:
+        tickets = list({row['ticket_no'] for row in rows})
+        in_batch = set()
+        for start in range(0, len(tickets), KEY_CHUNK_SIZE):
+            in_batch.update(db.session.execute(
+                select(Student.ticket_no).where(Student.ticket_no.in_(tickets[start:start + KEY_CHUNK_SIZE]),
+                                                Student.batch == batch)).scalars())
+        outside.update(i for i, row in enumerate(rows) if row['ticket_no'] not in in_batch)
+    return len(outside)
+
+
+def _replace_scope(period, batch, rows):
+    """Delete the scope's rows and insert rows in one transaction; returns (deleted, inserted)"""
+    config = write_queue.app.config if write_queue.app else {}
+    conditions = scope_conditions(period, batch)
+
+    def transaction():
+        touched = set(db.session.execute(
+            select(Attendance.ticket_no).where(*conditions).distinct()).scalars())
+        deleted = record_deletions(Attendance, *conditions)
+        db.session.execute(delete(Attendance).where(*conditions), execution_options={'synchronize_session': False})
+        if rows:
+            bulk_upsert(Attendance, stamp_rows(Attendance, rows), key_columns=['ticket_no', 'month'])
+            touched.update(row['ticket_no'] for row in rows)
+        adjust_row_count(Attendance, len(rows) - deleted)
+        refresh_profiles(touched)
+        bump_data_version()
+        db.session.commit()
+        return deleted
+
+    try:
+        deleted = run_with_retry(transaction, config.get('WRITE_RETRIES') or 1,
+                                 config.get('WRITE_RETRY_BACKOFF') or 0.1)
+    except Exception:
+        db.session.rollback()
+        raise
+    return deleted, len(rows)
+
+
+def delete_attendance(period=None, batch=None, dry_run=False):
+    """
+    Delete every attendance record of a period and/or batch
+
+    Returns (success, message, counts) where counts are the scope's records,
+    students and periods before the deletion.
+    """
+    if not period and not batch:
+        return False, "Choose a period and/or a batch (use Clear Data to remove everything)", None
+    scope = describe_scope(period, batch)
+    counts = scope_counts(period, batch)
+    if dry_run:
+        return True, (f"Dry run: would delete {counts['records']} attendance records of "
+                      f"{counts['students']} students for {scope}"), counts
+    if not counts['records']:
+        return False, f"No attendance records found for {scope}", counts
+    try:
+        deleted, _ = write_queue.run(_replace_scope, period, batch, [])
+    except Exception as e:
+        return False, f"Database error: {str(e)}", counts
+    return True, f"Deleted {deleted} attendance records for {scope}", counts
+
+
+def replace_attendance(rows, period=None, batch=None, dry_run=False):
+    """
+    Atomically replace the attendance of a period and/or batch with rows (typed, e.g. from
+    process_attendance_excel)
+
+    Every row must belong to the scope. Returns (success, message, counts) where
+    counts also hold the number of records to insert.
+    """
+    if not period and not batch:
+        return False, "Choose a period and/or a batch to replace", None
+    scope = describe_scope(period, batch)
+    counts = scope_counts(period, batch)
+    counts['inserted'] = len(rows)
+    outside = rows_outside_scope(rows, period, batch)
+    if outside:
+        return False, f"{outside} rows of the file are not in {scope}; nothing was changed", counts
+    if dry_run:
+        return True, (f"Dry run: would replace {counts['records']} attendance records for {scope} "
+                      f"with {len(rows)} records"), counts
+    try:
+        deleted, inserted = write_queue.run(_replace_scope, period, batch, rows)
+    except Exception as e:
+        return False, f"Database error: {str(e)}", counts
+    return True, f"Replaced {deleted} attendance records for {scope} with {inserted} records", counts
+
+
+def scope_choices():
+    """Periods (chronological) and batches that can be chosen as a scope"""
+    periods = sort_periods(db.session.execute(select(Attendance.month).distinct()).scalars().all())
+    batches = sorted(b for b in db.session.execute(select(Student.batch).distinct()).scalars() if b)
+    return periods, batches
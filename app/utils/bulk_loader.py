@@ -0,0 +1,195 @@
+"""
+Dialect-aware bulk upserts for the import paths
+
+PostgreSQL: rows are streamed with COPY FROM STDIN into a temporary table and
+merged with a single INSERT ... ON CONFLICT DO UPDATE.
+SQLite: one executemany INSERT ... ON CONFLICT DO UPDATE.
+Other databases fall back to a row-by-row ORM merge.
+
+Callers own the transaction; nothing here commits.
+"""
+import io
+from datetime import date, datetime
+from sqlalchemy import insert, or_
+from sqlalchemy.dialects import sqlite
+from app.models.models import db
+
+
+def _dialect_name(model):
+    return db.session.get_bind(mapper=model).dialect.name
+
+
+def _row_columns(table, rows):
+    """Columns present in the rows, in table order, restricted to real table columns"""
+    present = set()
+    for row in rows:
+        present.update(row)
+    return [column.name for column in table.columns if column.name in present]
+
+
+def _apply_python_defaults(table, rows, columns):
+    """
+    Fill scalar/callable column defaults (e.g. created_at) for columns missing from the rows
+
+    COPY bypasses SQLAlchemy's default handling, so the values are supplied explicitly.
+    """
+    extra = []
+    for column in table.columns:
+        if column.name in columns or column.default is None or column.primary_key:
+            continue
+        if column.default.is_callable:
+            value = column.default.arg(None)
+        elif column.default.is_scalar:
+            value = column.default.arg
+        else:
+            continue
+        extra.append((column.name, value))
+    if not extra:
+        return rows, columns
+    rows = [dict(row, **{name: value for name, value in extra}) for row in rows]
+    return rows, columns + [name for name, _ in extra]
+
+
+# NULL in the COPY data; every value is quoted, so neither '' nor a literal \N can be read as NULL
+COPY_NULL = r'\N'
+
+
+def _copy_field(value):
+    if value is None:
+        return COPY_NULL
+    if isinstance(value, (datetime, date)):
+        value = value.isoformat()
+    return '"' + str(value).replace('"', '""') + '"'
+
+
+def _copy_data(rows, columns):
+    """CSV text for COPY: every value quoted, None as an unquoted COPY_NULL"""
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write(','.join(_copy_field(row.get(c)) for c in columns))
+        buffer.write('\n')
+    buffer.seek(0)
+    return buffer
+
+
+def _copy_upsert(model, rows, columns, key_columns, update_columns, compare_columns):
+    """PostgreSQL: COPY into a temp table, then INSERT ... ON CONFLICT from it"""
+    table = model.__table__
+    staging = f"_staging_{table.name}"
+    column_list = ', '.join(f'"{c}"' for c in columns)
+    buffer = _copy_data(rows, columns)
+
+    cursor = db.session.connection(bind_arguments={'mapper': model}).connection.cursor()
+    try:
+        cursor.execute(f'CREATE TEMP TABLE IF NOT EXISTS "{staging}" AS '
+                       f'SELECT {column_list} FROM "{table.name}" WITH NO DATA')
+        cursor.execute(f'TRUNCATE "{staging}"')
+        copy_sql = f'COPY "{staging}" ({column_list}) FROM STDIN WITH (FORMAT csv, NULL \'{COPY_NULL}\')'
+        if hasattr(cursor, 'copy_expert'):  # psycopg2
+            cursor.copy_expert(copy_sql, buffer)
+        else:  # psycopg 3
+            with cursor.copy(copy_sql) as copy:
+                copy.write(buffer.getvalue())
+
+        conflict = ', '.join(f'"{c}"' for c in key_columns)
+        if update_columns:
+            action = 'DO UPDATE SET ' + ', '.join(f'"{c}" = EXCLUDED."{c}"' for c in update_columns)
+            if compare_columns:
+                action += ' WHERE ' + ' OR '.join(f'"{table.name}"."{c}" IS DISTINCT FROM EXCLUDED."{c}"'
+                                                  for c in compare_columns)
+        else:
+            action = 'DO NOTHING'
+        cursor.execute(f'INSERT INTO "{table.name}" ({column_list}) SELECT {column_list} FROM "{staging}" '
+                       f'ON CONFLICT ({conflict}) {action}')
+        cursor.execute(f'TRUNCATE "{staging}"')
+    finally:
+        cursor.close()
+
+
+def _executemany_upsert(insert, model, rows, columns, key_columns, update_columns, compare_columns):
+    """A single executemany INSERT ... ON CONFLICT DO UPDATE"""
+    table = model.__table__
+    statement = insert(table)
+    if update_columns:
+        where = None
+        if compare_columns:
+            where = or_(*[table.c[c].is_distinct_from(statement.excluded[c]) for c in compare_columns])
+        statement = statement.on_conflict_do_update(
+            index_elements=key_columns,
+            set_={c: statement.excluded[c] for c in update_columns},
+            where=where)
+    else:
+        statement = statement.on_conflict_do_nothing(index_elements=key_columns)
+    db.session.execute(statement, [{c: row.get(c) for c in columns} for row in rows],
+                       bind_arguments={'mapper': model})
+
+
+def _orm_upsert(model, rows, columns, key_columns, update_columns, compare_columns):
+    """Portable fallback: look each row up by its key and update or insert it"""
+    for row in rows:
+        existing = model.query.filter_by(**{c: row.get(c) for c in key_columns}).first()
+        if existing and compare_columns and all(getattr(existing, c) == row.get(c) for c in compare_columns):
+            continue
+        if existing:
+            for c in update_columns:
+                setattr(existing, c, row.get(c))
+        else:
+            db.session.add(model(**{c: row.get(c) for c in columns}))
+    db.session.flush()
+
+
+def bulk_insert_frame(model, frame):
+    """
+    Insert the rows of a DataFrame whose columns are named after the model's table columns
+
+    Missing values (NaN, None, NA) are stored as NULL. On SQLite the rows go to
+    the driver as plain tuples in one executemany, skipping a dict and
+    SQLAlchemy's parameter processing per row; other databases get a Core
+    executemany.
+    """
+    if frame.empty:
+        return 0
+    table = model.__table__
+    columns = list(frame.columns)
+    rows = list(frame.astype(object).where(frame.notna(), None).itertuples(index=False, name=None))
+    connection = db.session.connection(bind_arguments={'mapper': model})
+    if connection.dialect.name == 'sqlite':
+        column_list = ', '.join(f'"{c}"' for c in columns)
+        placeholders = ', '.join('?' for _ in columns)
+        cursor = connection.connection.cursor()
+        try:
+            cursor.executemany(f'INSERT INTO "{table.name}" ({column_list}) VALUES ({placeholders})', rows)
+        finally:
+            cursor.close()
+    else:
+        connection.execute(insert(table), [dict(zip(columns, row)) for row in rows])
+    return len(rows)
+
+
+def bulk_upsert(model, rows, key_columns, exclude_from_update=(), touch_columns=()):
+    """
+    Insert rows into the model's table, updating rows whose key already exists
+
+    key_columns must be covered by a primary key or unique index. Columns in
+    exclude_from_update (e.g. created_at) keep their stored value on conflict.
+    Columns in touch_columns (e.g. a change sequence) are only updated along
+    with a real change: a stored row whose other columns all equal the new
+    values is left as it is.
+    """
+    if not rows:
+        return 0
+    table = model.__table__
+    columns = _row_columns(table, rows)
+    update_columns = [c for c in columns if c not in key_columns and c not in exclude_from_update]
+    compare_columns = [c for c in update_columns if c not in touch_columns] if touch_columns else []
+    dialect = _dialect_name(model)
+
+    if dialect == 'postgresql':
+        rows, columns = _apply_python_defaults(table, rows, columns)
+        _copy_upsert(model, rows, columns, key_columns, update_columns, compare_columns)
+    elif dialect == 'sqlite':
+        _executemany_upsert(sqlite.insert, model, rows, columns, key_columns, update_columns, compare_columns)
+    else:
+        _orm_upsert(model, rows, columns, key_columns, update_columns, compare_columns)
+    return len(rows)
+
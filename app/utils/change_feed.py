@@ -0,0 +1,183 @@
+"""
+Change feed of the students and attendance tables for downstream systems
+
+Every write stamps the rows it changes with change_seq values drawn from one
+counter in stats_counters, and every delete leaves a tombstone with its own
+sequence value. The counter is incremented inside the writing transaction, so
+sequence values become visible in commit order. A consumer keeps the last
+sequence it processed and asks for everything after it:
+
+    GET /sync/api/changes?since=<cursor>
+
+Only the latest state of a row is reported: a row changed twice since the
+cursor appears once, and a deleted row only as its tombstone. Re-importing
+unchanged rows does not move them in the feed.
+"""
+import heapq
+import json
+from datetime import date
+from sqlalchemy import func, literal, select, update, bindparam
+from app.models.models import Attendance, ChangeTombstone, StatsCounter, Student, db
+
+CHANGE_SEQ = 'change_seq'
+
+# Rows fetched per table and query while streaming
+FEED_PAGE_SIZE = 1000
+
+# Rows stamped per UPDATE when backfilling an upgraded database
+BACKFILL_CHUNK_SIZE = 1000
+
+# Table name -> (model, key columns) of the tables in the feed
+FEED_TABLES = {
+    Student.__tablename__: (Student, ['ticket_no']),
+    Attendance.__tablename__: (Attendance, ['ticket_no', 'month'])
+}
+
+
+def allocate_change_seqs(count):
+    """
+    Reserve count sequence values in the current transaction and return the first
+
+    The counter row stays locked until the caller commits, so concurrent writers
+    are serialized and commit their values in order.
+    """
+    if count <= 0:
+        return None
+    updated = StatsCounter.query.filter(StatsCounter.name == CHANGE_SEQ).update(
+        {StatsCounter.value: StatsCounter.value + count}, synchronize_session=False)
+    if not updated:
+        db.session.add(StatsCounter(name=CHANGE_SEQ, value=count))
+        db.session.flush()
+    last = db.session.execute(select(StatsCounter.value).where(StatsCounter.name == CHANGE_SEQ)).scalar()
+    return last - count + 1
+
+
+def get_change_cursor():
+    """The latest committed sequence value"""
+    value = db.session.execute(select(StatsCounter.value).where(StatsCounter.name == CHANGE_SEQ)).scalar()
+    return value or 0
+
+
+def stamp_rows(model, rows):
+    """Rows about to be written to the model's table, with consecutive change_seq values"""
+    if model.__tablename__ not in FEED_TABLES or not rows:
+        return rows
+    first = allocate_change_seqs(len(rows))
+    return [dict(row, change_seq=first + i) for i, row in enumerate(rows)]
+
+
+def count_changed(model, rows):
+    """
+    Number of rows returned by stamp_rows whose write inserted or changed a row (call before committing)
+
+    A row left as it was by the upsert keeps its older sequence value.
+    """
+    if model.__tablename__ not in FEED_TABLES or not rows:
+        return len(rows)
+    return db.session.execute(select(func.count()).select_from(model).where(
+        model.change_seq >= rows[0]['change_seq'])).scalar()
+
+
+def record_deletions(model, *conditions):
+    """
+    Leave a tombstone for every row of the model matching conditions (call before deleting them)
+
+    Runs as one INSERT ... SELECT in the current transaction; returns the number of tombstones.
+    """
+    count = db.session.execute(select(func.count()).select_from(model).where(*conditions)).scalar()
+    if not count:
+        return 0
+    first = allocate_change_seqs(count)
+    month = Attendance.month if model is Attendance else literal(None)
+    db.session.execute(ChangeTombstone.__table__.insert().from_select(
+        ['change_seq', 'table_name', 'ticket_no', 'month'],
+        select((first - 1 + func.row_number().over(order_by=model.ticket_no)).label('change_seq'),
+               literal(model.__tablename__), model.ticket_no, month).where(*conditions)))
+    return count
+
+
+def init_change_feed():
+    """Give rows written before the feed existed (upgraded database) a sequence value"""
+    for model, _ in FEED_TABLES.values():
+        key = model.__mapper__.primary_key[0]
+        keys = db.session.execute(select(key).where(model.change_seq.is_(None))).scalars().all()
+        if not keys:
+            continue
+        first = allocate_change_seqs(len(keys))
+        statement = update(model.__table__).where(key == bindparam('row_key')).values(
+            change_seq=bindparam('row_seq'))
+        for start in range(0, len(keys), BACKFILL_CHUNK_SIZE):
+            db.session.execute(statement, [{'row_key': k, 'row_seq': first + start + i}
+                                           for i, k in enumerate(keys[start:start + BACKFILL_CHUNK_SIZE])],
+                               execution_options={'synchronize_session': False})
+        db.session.commit()
+
+
+def _json_default(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _upserts(table_name, since, until):
+    """(seq, change) of the table's rows changed after since, up to until, one page"""
+    model, key_columns = FEED_TABLES[table_name]
+    rows = db.session.execute(
+        select(model.__table__).where(model.change_seq > since, model.change_seq <= until)
+        .order_by(model.change_seq).limit(FEED_PAGE_SIZE)).mappings().all()
+    return [(row['change_seq'], {
+        'seq': row['change_seq'],
+        'table': table_name,
+        'op': 'upsert',
+        'key': {c: row[c] for c in key_columns},
+        'data': {c: v for c, v in row.items() if c != 'change_seq'}
+    }) for row in rows]
+
+
+def _tombstones(since, until):
+    rows = db.session.execute(
+        select(ChangeTombstone).where(ChangeTombstone.change_seq > since, ChangeTombstone.change_seq <= until)
+        .order_by(ChangeTombstone.change_seq).limit(FEED_PAGE_SIZE)).scalars().all()
+    changes = []
+    for tombstone in rows:
+        _, key_columns = FEED_TABLES[tombstone.table_name]
+        changes.append((tombstone.change_seq, {
+            'seq': tombstone.change_seq,
+            'table': tombstone.table_name,
+            'op': 'delete',
+            'key': {c: getattr(tombstone, c) for c in key_columns},
+            'deleted_at': tombstone.deleted_at
+        }))
+    return changes
+
+
+def iter_changes(since, until):
+    """
+    Every change with since < seq <= until, in sequence order, as dicts
+
+    Each table is read a page at a time by its change_seq index. A page can only
+    be merged up to the lowest last sequence among the pages that came back full,
+    since a full page may have more rows right after it.
+    """
+    cursor = since
+    while cursor < until:
+        pages = [_upserts(table_name, cursor, until) for table_name in FEED_TABLES]
+        pages.append(_tombstones(cursor, until))
+        bound = min((page[-1][0] for page in pages if len(page) == FEED_PAGE_SIZE), default=until)
+        for seq, change in heapq.merge(*pages, key=lambda item: item[0]):
+            if seq > bound:
+                break
+            yield change
+        cursor = bound
+
+
+def iter_ndjson(since, until):
+    """The changes as newline-delimited JSON, one change per line, in chunks of FEED_PAGE_SIZE lines"""
+    lines = []
+    for change in iter_changes(since, until):
+        lines.append(json.dumps(change, default=_json_default, separators=(',', ':')) + '\n')
+        if len(lines) >= FEED_PAGE_SIZE:
+            yield ''.join(lines)
+            lines = []
+    if lines:
+        yield ''.join(lines)
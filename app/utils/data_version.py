@@ -0,0 +1,58 @@
+"""
+Data version counter
+
+A single integer in the stats_counters table that every write to students or
+attendance bumps inside its own transaction. Caches and ETags key on it, so they
+stay valid exactly until the data changes, across all worker processes.
+"""
+import random
+from app.models.models import StatsCounter, db
+
+DATA_VERSION = 'data_version'
+
+# Random number fixed when the database is created, telling apart databases
+# whose data versions happen to be equal (e.g. for files shared between them)
+DATABASE_ID = 'database_id'
+
+# Set in session.info by bump_data_version so after-commit hooks know the data changed
+DATA_CHANGED = 'data_changed'
+
+
+def get_data_version():
+    """Return the current data version (0 before the first write)"""
+    value = db.session.query(StatsCounter.value).filter(StatsCounter.name == DATA_VERSION).scalar()
+    return value or 0
+
+
+def get_data_identity():
+    """Return (database id, data version) in a single query"""
+    values = dict(db.session.query(StatsCounter.name, StatsCounter.value)
+                  .filter(StatsCounter.name.in_([DATABASE_ID, DATA_VERSION])).all())
+    return values.get(DATABASE_ID, 0), values.get(DATA_VERSION, 0)
+
+
+def bump_data_version():
+    """
+    Increment the data version in the current transaction
+
+    The caller commits; the increment is a single UPDATE so concurrent writers
+    never lose a bump.
+    """
+    updated = StatsCounter.query.filter(StatsCounter.name == DATA_VERSION).update(
+        {StatsCounter.value: StatsCounter.value + 1}, synchronize_session=False)
+    if not updated:
+        db.session.add(StatsCounter(name=DATA_VERSION, value=1))
+    db.session.info[DATA_CHANGED] = True
+
+
+def init_data_version():
+    """Create the data version and database id rows if they do not exist yet"""
+    created = False
+    if db.session.get(StatsCounter, DATA_VERSION) is None:
+        db.session.add(StatsCounter(name=DATA_VERSION, value=0))
+        created = True
+    if db.session.get(StatsCounter, DATABASE_ID) is None:
+        db.session.add(StatsCounter(name=DATABASE_ID, value=random.randint(1, 2 ** 31 - 1)))
+        created = True
+    if created:
+        db.session.commit()
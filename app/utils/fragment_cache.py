@@ -0,0 +1,96 @@
+"""
+Rendered-fragment cache for expensive template blocks
+
+Templates wrap a block in a call to cache_fragment:
+
+    {% call cache_fragment('defaulter_table', param) %}
+        ... expensive markup ...
+    {% endcall %}
+
+The rendered HTML is stored zlib-compressed, keyed on the fragment name, the
+data version read at the start of the request and the given parameters, in an
+LRU bounded by total compressed size. Fragments must not contain per-user content.
+"""
+import threading
+import zlib
+from collections import OrderedDict
+from flask import current_app, g, request
+from markupsafe import Markup
+from app.utils.data_version import get_data_version
+
+
+class FragmentCache:
+    """
+    Thread-safe LRU of compressed strings bounded by their total size in bytes
+    """
+
+    def __init__(self, max_bytes=32 * 1024 * 1024, level=1):
+        self.max_bytes = max_bytes
+        self.level = level
+        self.size = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached string for key, or None"""
+        with self._lock:
+            compressed = self._data.get(key)
+            if compressed is None:
+                return None
+            self._data.move_to_end(key)
+        return zlib.decompress(compressed).decode('utf-8')
+
+    def set(self, key, text):
+        """Store text under key, evicting least recently used fragments beyond max_bytes"""
+        compressed = zlib.compress(text.encode('utf-8'), self.level)
+        if len(compressed) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._data.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous)
+            self._data[key] = compressed
+            self.size += len(compressed)
+            while self.size > self.max_bytes:
+                _, evicted = self._data.popitem(last=False)
+                self.size -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.size = 0
+
+    def __len__(self):
+        return len(self._data)
+
+
+fragment_cache = FragmentCache()
+
+
+def _capture_data_version():
+    # Read when the request starts, before the view loads any data, so a fragment
+    # is never stored under a version newer than the data it was rendered from
+    if current_app.config.get('FRAGMENT_CACHE_ENABLED') and request.endpoint != 'static':
+        g.fragment_data_version = get_data_version()
+
+
+def cache_fragment(name, *params, caller):
+    """Jinja call-block helper: render caller() once per data version and parameters"""
+    # Rendered outside a request there is no start-of-request version to key on
+    data_version = g.get('fragment_data_version')
+    if not current_app.config.get('FRAGMENT_CACHE_ENABLED') or data_version is None:
+        return caller()
+    key = (name, data_version) + params
+    html = fragment_cache.get(key)
+    if html is None:
+        html = str(caller())
+        fragment_cache.set(key, html)
+    return Markup(html)
+
+
+def init_fragment_cache(app):
+    """Size the cache from the config, read the data version per request and expose cache_fragment to templates"""
+    fragment_cache.max_bytes = app.config.get('FRAGMENT_CACHE_MAX_BYTES', fragment_cache.max_bytes)
+    fragment_cache.level = app.config.get('FRAGMENT_CACHE_COMPRESS_LEVEL', fragment_cache.level)
+    app.before_request(_capture_data_version)
+    app.jinja_env.globals['cache_fragment'] = cache_fragment
@@ -0,0 +1,88 @@
+"""
+HTTP caching helpers: data-version ETags and response compression
+"""
+import gzip
+import hashlib
+from functools import wraps
+from flask import current_app, make_response, request, session
+from app.utils.data_version import get_data_version
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional; gzip is always available
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {
+    'text/html', 'text/plain', 'text/css', 'text/csv',
+    'application/json', 'application/javascript'
+}
+
+
+def _make_etag(data_version):
+    # The same URL renders differently per user (navbar, role), so the user is part of the key
+    key = f"{data_version}|{session.get('user_id')}|{request.full_path}"
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+def etag_cached(f):
+    """
+    Decorator for GET views whose output depends only on the stored data
+
+    Tags responses with an ETag derived from the data version and answers a
+    matching If-None-Match with 304 Not Modified without calling the view.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        # Pending flash messages would be lost on a 304, so always render then
+        if request.method != 'GET' or session.get('_flashes'):
+            return f(*args, **kwargs)
+
+        etag = _make_etag(get_data_version())
+        if request.if_none_match.contains_weak(etag):
+            response = current_app.response_class(status=304)
+        else:
+            response = make_response(f(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+        response.set_etag(etag, weak=True)
+        # Clients may store the response but must revalidate it on every use
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+    return decorated_function
+
+
+def _choose_encoding(accept_encoding):
+    if brotli is not None and 'br' in accept_encoding:
+        return 'br'
+    if 'gzip' in accept_encoding:
+        return 'gzip'
+    return None
+
+
+def init_compression(app):
+    """
+    Compress large text responses with brotli (when installed) or gzip
+    """
+    @app.after_request
+    def _compress_response(response):
+        if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        data = response.get_data()
+        if len(data) < app.config.get('COMPRESS_MIN_SIZE', 1024):
+            return response
+
+        encoding = _choose_encoding(request.accept_encodings)
+        if encoding == 'br':
+            compressed = brotli.compress(data, quality=app.config.get('COMPRESS_BROTLI_QUALITY', 5))
+        elif encoding == 'gzip':
+            compressed = gzip.compress(data, compresslevel=app.config.get('COMPRESS_LEVEL', 6))
+        else:
+            return response
+
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+        return response
@@ -0,0 +1,155 @@
+"""
+Import run history
+
+Every student and attendance import is recorded in the import_runs table: the
+uploaded file's SHA-256 and size, its row counts and the wall-clock and CPU
+seconds of each stage. Processing an upload (read, detect, validate) creates
+the run and the confirmation that saves its rows (write, refresh) completes it,
+so a slow import can be traced to the stage that made it slow. The history page
+and its JSON endpoint show throughput over time.
+"""
+import hashlib
+import os
+from datetime import datetime
+from sqlalchemy import select
+from app.models.models import ImportRun, db
+from app.utils.write_queue import write_queue
+
+# Stage -> label, in the order an import goes through them
+STAGES = {
+    'read': 'Read workbook',
+    'detect': 'Detect columns',
+    'validate': 'Validate and convert',
+    'write': 'Database write',
+    'refresh': 'Cache refresh'
+}
+
+# Runs shown by the history page and returned by default by its endpoint
+HISTORY_LIMIT = 100
+
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def file_digest(file_path):
+    """(SHA-256 hex digest, size in bytes) of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as handle:
+        for chunk in iter(lambda: handle.read(_HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest(), os.path.getsize(file_path)
+
+
+def _stage_values(timings):
+    """Column values of the stages in timings ({stage: [wall, CPU]}), rounded to microseconds"""
+    values = {}
+    for stage, (wall, cpu) in timings.items():
+        values[f'{stage}_seconds'] = round(wall, 6)
+        values[f'{stage}_cpu_seconds'] = round(cpu, 6)
+    return values
+
+
+def _insert_run(values):
+    run = ImportRun(**values)
+    db.session.add(run)
+    db.session.commit()
+    return run.id
+
+
+def _complete_run(run_id, values, lost):
+    """Complete the previewed run with values; lost rows were not saved by a failed write"""
+    run = db.session.get(ImportRun, run_id) if run_id is not None else None
+    if run is not None and run.kind != values['kind']:
+        run = None
+    if run is None or run.status != 'previewed':
+        # Saved without a preview, or saved again (e.g. a repeated confirmation): a run of its own
+        if run is not None:
+            values = dict({c: getattr(run, c) for c in ('filename', 'file_hash', 'file_size', 'total_rows')},
+                          **values)
+        return _insert_run(dict(values, errored=lost))
+    for name, value in values.items():
+        setattr(run, name, value)
+    run.errored = (run.errored or 0) + lost
+    db.session.commit()
+    return run.id
+
+
+def start_import_run(kind, file_path, result, timings):
+    """
+    Record the processing of an uploaded file (result of process_*_excel) and return the run's id
+
+    A file that could not be processed is recorded as rejected.
+    """
+    file_hash, file_size = file_digest(file_path)
+    values = dict(_stage_values(timings), kind=kind, filename=os.path.basename(file_path),
+                  file_hash=file_hash, file_size=file_size, total_rows=result.get('total_rows'))
+    if result['success']:
+        values.update(status='previewed', valid_rows=len(result['data']), errored=result['skipped_rows'])
+    else:
+        values.update(status='rejected', message=result['message'], completed_at=datetime.utcnow())
+    try:
+        return write_queue.run(_insert_run, values)
+    except Exception as e:
+        db.session.rollback()
+        print(f"Could not record the {kind} import run: {e}")
+        return None
+
+
+def finish_import_run(kind, run_id, rows, saved, stats, message, success):
+    """
+    Record the saving of rows (by save_*_to_db) in the run created when they were processed
+
+    Without a run id (rows not coming from an upload preview) a run without file details is created.
+    """
+    counts = stats.get('counts', {})
+    values = dict(_stage_values(stats.get('timings', {})), kind=kind, valid_rows=rows,
+                  status='completed' if success else 'failed', message=message,
+                  inserted=counts.get('inserted', 0), updated=counts.get('updated', 0),
+                  unchanged=counts.get('unchanged', 0), completed_at=datetime.utcnow())
+    try:
+        write_queue.run(_complete_run, run_id, values, rows - saved)
+    except Exception as e:
+        db.session.rollback()
+        print(f"Could not record the {kind} import run: {e}")
+
+
+def run_summary(run):
+    """JSON-ready view of a run with its stage timings and throughput"""
+    stages = {}
+    for stage in STAGES:
+        wall = getattr(run, f'{stage}_seconds')
+        if wall is not None:
+            stages[stage] = {'seconds': wall, 'cpu_seconds': getattr(run, f'{stage}_cpu_seconds')}
+    total_seconds = sum(timing['seconds'] for timing in stages.values())
+    written = None if run.inserted is None else run.inserted + run.updated + run.unchanged
+    write_seconds = sum(stages[s]['seconds'] for s in ('write', 'refresh') if s in stages)
+    rows = run.total_rows or run.valid_rows
+    return {
+        'id': run.id,
+        'kind': run.kind,
+        'status': run.status,
+        'message': run.message,
+        'filename': run.filename,
+        'file_hash': run.file_hash,
+        'file_size': run.file_size,
+        'total_rows': run.total_rows,
+        'valid_rows': run.valid_rows,
+        'inserted': run.inserted,
+        'updated': run.updated,
+        'unchanged': run.unchanged,
+        'errored': run.errored,
+        'stages': stages,
+        'total_seconds': round(total_seconds, 6),
+        # Rows through every recorded stage per second, and rows committed per second of writing
+        'rows_per_second': round(rows / total_seconds, 1) if rows and total_seconds else None,
+        'write_rows_per_second': round(written / write_seconds, 1) if written and write_seconds else None,
+        'created_at': run.created_at.isoformat() if run.created_at else None,
+        'completed_at': run.completed_at.isoformat() if run.completed_at else None
+    }
+
+
+def recent_runs(kind=None, limit=HISTORY_LIMIT):
+    """Summaries of the latest runs (of one kind if given), oldest first"""
+    query = select(ImportRun).order_by(ImportRun.id.desc()).limit(limit)
+    if kind:
+        query = query.where(ImportRun.kind == kind)
+    return [run_summary(run) for run in reversed(db.session.execute(query).scalars().all())]
@@ -0,0 +1,354 @@
+"""
+Opt-in request and SQL instrumentation
+
+Records per-request timing and SQL query counts per blueprint/endpoint, keeps
+them in an in-process metrics registry rendered in Prometheus text format, logs
+slow requests as structured JSON and optionally profiles requests with cProfile
+or pyinstrument.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from flask import g, request, session
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# Default histogram buckets
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+
+class MetricsRegistry:
+    """
+    Thread-safe registry of counters, gauges and histograms
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def _define(self, name, metric_type, help_text, buckets=None):
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = {
+                    'type': metric_type,
+                    'help': help_text,
+                    'buckets': buckets,
+                    'samples': {}
+                }
+
+    def counter(self, name, help_text):
+        self._define(name, 'counter', help_text)
+
+    def gauge(self, name, help_text):
+        self._define(name, 'gauge', help_text)
+
+    def histogram(self, name, help_text, buckets=DURATION_BUCKETS):
+        self._define(name, 'histogram', help_text, tuple(buckets))
+
+    def inc(self, name, value=1, **labels):
+        """Increment a counter or gauge"""
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            samples = self._metrics[name]['samples']
+            samples[key] = samples.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        """Set a gauge to an absolute value"""
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._metrics[name]['samples'][key] = value
+
+    def observe(self, name, value, **labels):
+        """Record one observation in a histogram"""
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            metric = self._metrics[name]
+            sample = metric['samples'].get(key)
+            if sample is None:
+                sample = {'buckets': [0] * len(metric['buckets']), 'sum': 0.0, 'count': 0}
+                metric['samples'][key] = sample
+            for i, bound in enumerate(metric['buckets']):
+                if value <= bound:
+                    sample['buckets'][i] += 1
+            sample['sum'] += value
+            sample['count'] += 1
+
+    def get(self, name, **labels):
+        """Return the current value of a counter or gauge sample (0 if unset)"""
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                return 0
+            return metric['samples'].get(key, 0)
+
+    def reset(self):
+        """Drop all recorded samples, keeping metric definitions"""
+        with self._lock:
+            for metric in self._metrics.values():
+                metric['samples'] = {}
+
+    def render(self):
+        """Render all metrics in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            for name in sorted(self._metrics):
+                metric = self._metrics[name]
+                lines.append(f"# HELP {name} {metric['help']}")
+                lines.append(f"# TYPE {name} {metric['type']}")
+                for key, sample in sorted(metric['samples'].items()):
+                    if metric['type'] == 'histogram':
+                        for bound, bucket_count in zip(metric['buckets'], sample['buckets']):
+                            lines.append(f"{name}_bucket{_format_labels(key + (('le', _format_value(bound)),))} {bucket_count}")
+                        lines.append(f"{name}_bucket{_format_labels(key + (('le', '+Inf'),))} {sample['count']}")
+                        lines.append(f"{name}_sum{_format_labels(key)} {_format_value(sample['sum'])}")
+                        lines.append(f"{name}_count{_format_labels(key)} {sample['count']}")
+                    else:
+                        lines.append(f"{name}{_format_labels(key)} {_format_value(sample)}")
+        return '\n'.join(lines) + '\n'
+
+
+def _format_labels(key):
+    if not key:
+        return ''
+    parts = []
+    for label, value in key:
+        escaped = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{label}="{escaped}"')
+    return '{' + ','.join(parts) + '}'
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+# Process-wide registry shared by every instrumented component
+metrics = MetricsRegistry()
+metrics.counter('http_requests_total', 'Total HTTP requests by endpoint and status')
+metrics.histogram('http_request_duration_seconds', 'HTTP request latency by endpoint')
+metrics.counter('db_queries_total', 'SQL statements executed by endpoint')
+metrics.counter('db_query_duration_seconds_total', 'Time spent executing SQL by endpoint')
+metrics.histogram('http_request_db_queries', 'SQL statements per request by endpoint', QUERY_COUNT_BUCKETS)
+
+
+class QueryCounter:
+    """
+    Accumulates the number of SQL statements and their execution time
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+
+class StageTimer:
+    """
+    Wall-clock and CPU seconds per stage of a job, measured as laps
+
+    lap(stage) charges the time since the previous lap (or since the timer was
+    created) to stage; a stage lapped several times accumulates. CPU time is the
+    calling thread's, so each thread needs a timer of its own.
+    """
+
+    def __init__(self):
+        self.timings = {}  # Stage -> [wall seconds, CPU seconds]
+        self._wall = time.perf_counter()
+        self._cpu = time.thread_time()
+
+    def lap(self, stage):
+        wall, cpu = time.perf_counter(), time.thread_time()
+        spent = self.timings.setdefault(stage, [0.0, 0.0])
+        spent[0] += wall - self._wall
+        spent[1] += cpu - self._cpu
+        self._wall, self._cpu = wall, cpu
+
+
+_local = threading.local()
+
+
+def _active_counters():
+    if not hasattr(_local, 'counters'):
+        _local.counters = []
+    return _local.counters
+
+
+@contextmanager
+def count_queries():
+    """
+    Count SQL statements executed by the current thread inside the block
+
+    Usage:
+        with count_queries() as counter:
+            ...
+        print(counter.count, counter.duration)
+    """
+    install_sql_hooks()
+    counter = QueryCounter()
+    counters = _active_counters()
+    counters.append(counter)
+    try:
+        yield counter
+    finally:
+        counters.remove(counter)
+
+
+def active_query_counters():
+    """The current thread's query counters, to hand to work done on another thread"""
+    return list(_active_counters())
+
+
+@contextmanager
+def counting_into(counters):
+    """Count the block's SQL statements into counters taken from another thread"""
+    active = _active_counters()
+    active.extend(counters)
+    try:
+        yield
+    finally:
+        for counter in counters:
+            active.remove(counter)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start_time', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start_times = conn.info.get('query_start_time')
+    if not start_times:
+        return
+    elapsed = time.perf_counter() - start_times.pop()
+    for counter in _active_counters():
+        counter.count += 1
+        counter.duration += elapsed
+
+
+def install_sql_hooks():
+    """Attach the cursor execute listeners to every SQLAlchemy engine (idempotent)"""
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+
+
+def _should_profile(app):
+    if app.config.get('PROFILING_ENABLED'):
+        return True
+    header = app.config.get('PROFILING_HEADER')
+    if not header or request.headers.get(header, '').lower() not in ('1', 'true', 'yes'):
+        return False
+    # Profiles cost CPU and disk space, so only a logged-in admin may ask for one
+    from app.controllers.auth_controller import get_cached_user
+    user = get_cached_user(session['user_id']) if 'user_id' in session else None
+    return user is not None and user['role'] == 'admin'
+
+
+def _start_profiler(app):
+    if app.config.get('PROFILER') == 'pyinstrument':
+        try:
+            from pyinstrument import Profiler
+            profiler = Profiler()
+            profiler.start()
+            return 'pyinstrument', profiler
+        except ImportError:
+            logger.warning("pyinstrument is not installed, falling back to cProfile")
+    import cProfile
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return 'cprofile', profiler
+
+
+def _stop_profiler(app, kind, profiler, endpoint):
+    """Stop the profiler and write its report to PROFILE_DIR, returning the file name"""
+    profile_dir = app.config.get('PROFILE_DIR')
+    os.makedirs(profile_dir, exist_ok=True)
+    stamp = datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+    safe_endpoint = (endpoint or 'unknown').replace('.', '_')
+    if kind == 'pyinstrument':
+        profiler.stop()
+        filename = f"{stamp}-{safe_endpoint}.html"
+        with open(os.path.join(profile_dir, filename), 'w', encoding='utf-8') as f:
+            f.write(profiler.output_html())
+    else:
+        profiler.disable()
+        filename = f"{stamp}-{safe_endpoint}.prof"
+        profiler.dump_stats(os.path.join(profile_dir, filename))
+    return filename
+
+
+def init_instrumentation(app):
+    """
+    Register the request hooks that feed the metrics registry
+    """
+    install_sql_hooks()
+
+    @app.before_request
+    def _start_request_timer():
+        g._instrumentation_start = time.perf_counter()
+        counter = QueryCounter()
+        _active_counters().append(counter)
+        g._instrumentation_queries = counter
+        if _should_profile(app):
+            g._instrumentation_profiler = _start_profiler(app)
+
+    @app.after_request
+    def _record_request(response):
+        start = g.pop('_instrumentation_start', None)
+        if start is None:
+            return response
+        duration = time.perf_counter() - start
+        counter = g.pop('_instrumentation_queries', None) or QueryCounter()
+        if counter in _active_counters():
+            _active_counters().remove(counter)
+        endpoint = request.endpoint or 'unmatched'
+        blueprint = request.blueprint or ''
+
+        metrics.inc('http_requests_total', blueprint=blueprint, endpoint=endpoint,
+                    method=request.method, status=str(response.status_code))
+        metrics.observe('http_request_duration_seconds', duration, blueprint=blueprint, endpoint=endpoint)
+        metrics.inc('db_queries_total', counter.count, blueprint=blueprint, endpoint=endpoint)
+        metrics.inc('db_query_duration_seconds_total', counter.duration, blueprint=blueprint, endpoint=endpoint)
+        metrics.observe('http_request_db_queries', counter.count, blueprint=blueprint, endpoint=endpoint)
+
+        profiler = g.pop('_instrumentation_profiler', None)
+        if profiler is not None:
+            try:
+                response.headers['X-Profile-File'] = _stop_profiler(app, profiler[0], profiler[1], endpoint)
+            except Exception as e:
+                logger.warning(f"Could not write profile for {endpoint}: {str(e)}")
+
+        duration_ms = duration * 1000
+        if app.config.get('SLOW_REQUEST_LOG') and duration_ms >= app.config.get('SLOW_REQUEST_THRESHOLD_MS', 1000):
+            logger.warning(json.dumps({
+                'event': 'slow_request',
+                'method': request.method,
+                'path': request.path,
+                'blueprint': blueprint,
+                'endpoint': endpoint,
+                'status': response.status_code,
+                'duration_ms': round(duration_ms, 2),
+                'db_queries': counter.count,
+                'db_time_ms': round(counter.duration * 1000, 2)
+            }))
+        return response
+
+    @app.teardown_request
+    def _release_query_counter(exc):
+        # after_request is skipped on unhandled exceptions, so detach the counter here
+        counter = g.pop('_instrumentation_queries', None)
+        if counter is not None and counter in _active_counters():
+            _active_counters().remove(counter)
+        profiler = g.pop('_instrumentation_profiler', None)
+        if profiler is not None:
+            if profiler[0] == 'pyinstrument':
+                profiler[1].stop()
+            else:
+                profiler[1].disable()
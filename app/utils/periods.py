@@ -0,0 +1,55 @@
+"""
+Helpers for ordering attendance periods
+
+Attendance rows store the period as free text, usually a month name
+('January') and sometimes with a year ('January 2024', '2024-01', 'Jan-24').
+"""
+import calendar
+import re
+
+_MONTH_LOOKUP = {}
+for _index in range(1, 13):
+    _MONTH_LOOKUP[calendar.month_name[_index].lower()] = _index
+    _MONTH_LOOKUP[calendar.month_abbr[_index].lower()] = _index
+_MONTH_LOOKUP['sept'] = 9
+
+
+def parse_period(period):
+    """
+    Return (year, month) for a period label, or None if it cannot be parsed
+
+    A month without a year gets year 0 so it sorts by calendar order.
+    """
+    if period is None:
+        return None
+    text = str(period).strip().lower()
+
+    # '2024-01' or '2024/1'
+    match = re.fullmatch(r'(\d{4})[-/](\d{1,2})', text)
+    if match and 1 <= int(match.group(2)) <= 12:
+        return int(match.group(1)), int(match.group(2))
+
+    # 'January', 'Jan 2024', 'January-2024', 'Jan-24'
+    match = re.fullmatch(r'([a-z]+)[\s\-/,]*(\d{2}|\d{4})?', text)
+    if match and match.group(1) in _MONTH_LOOKUP:
+        year = match.group(2)
+        if year is None:
+            year = 0
+        elif len(year) == 2:
+            year = 2000 + int(year)
+        return int(year), _MONTH_LOOKUP[match.group(1)]
+
+    return None
+
+
+def period_sort_key(period):
+    """Sort key placing periods in chronological order, unparseable labels last"""
+    parsed = parse_period(period)
+    if parsed is None:
+        return (1, 0, 0, str(period))
+    return (0, parsed[0], parsed[1], str(period))
+
+
+def sort_periods(periods):
+    """Return the given period labels in chronological order"""
+    return sorted(periods, key=period_sort_key)
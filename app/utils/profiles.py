@@ -0,0 +1,132 @@
+"""
+Precomputed student profile documents
+
+Every student has one row in student_profiles holding their details and
+attendance history (in chronological order) serialized as JSON. The write paths
+rebuild the documents of the tickets they touch inside their own transaction,
+so the search, student and attendance views render a student from a single
+primary key read instead of joining and hand-building the same data per request.
+"""
+import json
+from datetime import date
+from sqlalchemy import delete, insert, select
+from app.models.models import Attendance, Student, StudentProfile, db
+from app.utils.periods import period_sort_key
+from app.utils.row_counts import KEY_CHUNK_SIZE
+
+# Fields returned by the search API (identity numbers stay on the detail page)
+SEARCH_FIELDS = ['ticket_no', 'pno', 'name', 'father_name', 'dob', 'gender', 'mobile', 'address',
+                 'qualification_trade', 'passing_year', 'college_name', 'ssc_percentage', 'hsc_percentage',
+                 'email_id', 'blood_group', 'current_address_route']
+
+# Student columns stored in a document (bookkeeping such as the change sequence is left out)
+STUDENT_COLUMNS = [column for column in Student.__table__.columns if column.name != 'change_seq']
+
+HISTORY_FIELDS = ['month', 'total_days', 'present_days', 'absent_days', 'attendance_percentage']
+
+# Tables whose rows are part of a profile (both keyed by ticket_no)
+PROFILE_SOURCES = (Student.__tablename__, Attendance.__tablename__)
+
+
+def _json_default(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def build_documents(ticket_nos):
+    """ticket_no -> serialized profile for the given tickets that are in the student master"""
+    ticket_nos = list(ticket_nos)
+    students = {}
+    histories = {}
+    for start in range(0, len(ticket_nos), KEY_CHUNK_SIZE):
+        chunk = ticket_nos[start:start + KEY_CHUNK_SIZE]
+        for row in db.session.execute(select(*STUDENT_COLUMNS).where(Student.ticket_no.in_(chunk))).mappings():
+            students[row['ticket_no']] = dict(row)
+        for ticket_no, *values in db.session.execute(
+                select(Attendance.ticket_no, *[getattr(Attendance, f) for f in HISTORY_FIELDS])
+                .where(Attendance.ticket_no.in_(chunk))):
+            histories.setdefault(ticket_no, []).append(dict(zip(HISTORY_FIELDS, values)))
+
+    sort_keys = {}  # Period -> sort key, parsed once per distinct period
+    documents = {}
+    for ticket_no, student in students.items():
+        history = histories.get(ticket_no, [])
+        for record in history:
+            if record['month'] not in sort_keys:
+                sort_keys[record['month']] = period_sort_key(record['month'])
+        history.sort(key=lambda record: sort_keys[record['month']])
+        documents[ticket_no] = json.dumps(dict(student, attendance_records=history), default=_json_default,
+                                          separators=(',', ':'))
+    return documents
+
+
+def refresh_profiles(ticket_nos):
+    """Rebuild the documents of the given tickets in the current transaction (the caller commits)"""
+    ticket_nos = list(set(ticket_nos))
+    for start in range(0, len(ticket_nos), KEY_CHUNK_SIZE):
+        chunk = ticket_nos[start:start + KEY_CHUNK_SIZE]
+        documents = build_documents(chunk)
+        db.session.execute(delete(StudentProfile).where(StudentProfile.ticket_no.in_(chunk)))
+        if documents:
+            db.session.execute(insert(StudentProfile), [{'ticket_no': ticket_no, 'document': document}
+                                                        for ticket_no, document in documents.items()])
+
+
+def tickets_by_last_batch(model, rows, batch_size):
+    """
+    For rows written to the model's table in batches: the tickets whose last row is in each batch
+
+    Refreshing these with each batch rebuilds every touched document once, in
+    the transaction that writes its final row, however the rows are ordered.
+    """
+    batches = [[] for _ in range(0, len(rows), batch_size)]
+    if model.__tablename__ in PROFILE_SOURCES:
+        last_row = {row['ticket_no']: i for i, row in enumerate(rows)}
+        for ticket_no, i in last_row.items():
+            batches[i // batch_size].append(ticket_no)
+    return batches
+
+
+def rebuild_profiles():
+    """Rebuild every document and commit"""
+    db.session.execute(delete(StudentProfile))
+    refresh_profiles(db.session.execute(select(Student.ticket_no)).scalars().all())
+    db.session.commit()
+
+
+def init_profiles():
+    """Build the documents once if students exist without any (new or upgraded database)"""
+    if db.session.execute(select(StudentProfile.ticket_no).limit(1)).first() is None and \
+            db.session.execute(select(Student.ticket_no).limit(1)).first() is not None:
+        rebuild_profiles()
+
+
+def get_profile_document(ticket_no):
+    """
+    The student's profile as stored (dates as ISO strings), or None if there is no such student
+
+    A single primary key read; a student without a document yet is built on the fly.
+    """
+    document = db.session.execute(
+        select(StudentProfile.document).where(StudentProfile.ticket_no == ticket_no)).scalar()
+    if document is None:
+        document = build_documents([ticket_no]).get(ticket_no)
+        if document is None:
+            return None
+    return json.loads(document)
+
+
+def get_profile(ticket_no):
+    """The student's profile for templates (dob as a date), or None if there is no such student"""
+    profile = get_profile_document(ticket_no)
+    if profile is not None and profile['dob']:
+        profile['dob'] = date.fromisoformat(profile['dob'])
+    return profile
+
+
+def search_result(profile):
+    """The search API's view of a stored profile document"""
+    result = {field: profile[field] for field in SEARCH_FIELDS}
+    result['attendance_records'] = profile['attendance_records']
+    return result
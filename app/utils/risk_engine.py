@@ -0,0 +1,225 @@
+"""
+Vectorized attendance trend and risk scoring
+
+All attendance is pivoted once into a students x periods matrix (NaN where a
+student has no record) and every score is computed with whole-matrix NumPy
+operations, so the cost is a handful of passes over the matrix regardless of
+the number of students.
+"""
+import numpy as np
+import pandas as pd
+from flask import current_app
+from sqlalchemy import select
+from app.models.models import Attendance, StatsCounter, StudentRiskScore, db
+from app.utils.bulk_loader import bulk_insert_frame
+from app.utils.data_version import get_data_version
+from app.utils.periods import sort_periods
+from app.utils.schema import to_records
+from app.utils.snapshot import current_snapshot
+from app.utils.write_queue import write_queue
+
+RISK_VERSION = 'risk_version'
+
+
+def build_attendance_matrix(ticket_nos, periods, percentages):
+    """
+    Pivot parallel arrays of (ticket_no, period, percentage) into a matrix
+
+    Returns (tickets, period_labels, matrix) where matrix[i, j] is the
+    percentage of tickets[i] in period_labels[j], NaN if missing. Periods are
+    ordered chronologically.
+    """
+    ticket_codes, tickets = pd.factorize(np.asarray(ticket_nos, dtype=object))
+    period_codes, period_labels = pd.factorize(np.asarray(periods, dtype=object))
+
+    # Re-map period codes so columns run in chronological order
+    ordered = sort_periods(list(period_labels))
+    position = {label: i for i, label in enumerate(ordered)}
+    remap = np.array([position[label] for label in period_labels], dtype=np.int64)
+
+    matrix = np.full((len(tickets), len(ordered)), np.nan, dtype=np.float64)
+    if len(ticket_codes):
+        matrix[ticket_codes, remap[period_codes]] = np.asarray(percentages, dtype=np.float64)
+    return np.asarray(tickets, dtype=object), ordered, matrix
+
+
+def score_matrix(matrix, threshold=75.0, window=3, term_length=12):
+    """
+    Compute per-row trend and risk scores for a students x periods matrix
+
+    Returns a dict of 1-D arrays, one entry per student.
+    """
+    n_students, n_periods = matrix.shape
+    observed = ~np.isnan(matrix)
+    n_observed = observed.sum(axis=1)
+    values = np.where(observed, matrix, 0.0)
+    x = np.arange(n_periods, dtype=np.float64)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        overall_avg = values.sum(axis=1) / n_observed
+
+        # Rolling average over the last `window` observed periods: rank observed
+        # cells from the right and keep those whose rank is within the window
+        rank_from_right = np.cumsum(observed[:, ::-1], axis=1)[:, ::-1]
+        in_window = observed & (rank_from_right <= window)
+        rolling_avg = np.where(in_window, matrix, 0.0).sum(axis=1) / in_window.sum(axis=1)
+
+        # Least-squares slope over observed periods (percentage points per period)
+        sum_x = (observed * x).sum(axis=1)
+        sum_y = values.sum(axis=1)
+        sum_xx = (observed * x * x).sum(axis=1)
+        sum_xy = (values * x).sum(axis=1)
+        denominator = n_observed * sum_xx - sum_x * sum_x
+        slope = np.where(denominator > 0, (n_observed * sum_xy - sum_x * sum_y) / denominator, 0.0)
+        intercept = np.where(n_observed > 0, (sum_y - slope * sum_x) / n_observed, np.nan)
+
+    # Trailing run of periods under the threshold; periods without a record
+    # neither extend nor break the run
+    below = observed & (matrix < threshold)
+    run = np.zeros(n_students, dtype=np.int64)
+    for j in range(n_periods):
+        run = np.where(below[:, j], run + 1, np.where(observed[:, j], 0, run))
+
+    # Project the remaining periods of the term along the fitted trend
+    remaining = max(term_length - n_periods, 0)
+    projected_total = sum_y.copy()
+    for k in range(1, remaining + 1):
+        projected_total += np.clip(intercept + slope * (n_periods - 1 + k), 0.0, 100.0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        projected = projected_total / (n_observed + remaining)
+
+    risk_level = np.full(n_students, 'Low', dtype=object)
+    medium = (projected < threshold + 5) | (slope < -2.0) | (run >= 1)
+    high = (projected < threshold) | (run >= 2)
+    risk_level[medium] = 'Medium'
+    risk_level[high] = 'High'
+
+    # Index of the latest observed period per row (-1 if none)
+    latest_index = np.where(observed.any(axis=1), n_periods - 1 - np.argmax(observed[:, ::-1], axis=1), -1)
+
+    return {
+        'periods_observed': n_observed,
+        'latest_index': latest_index,
+        'overall_avg': overall_avg,
+        'rolling_avg': rolling_avg,
+        'trend_slope': slope,
+        'consecutive_below': run,
+        'projected_percentage': projected,
+        'risk_level': risk_level
+    }
+
+
+def load_attendance_matrix():
+    """
+    (tickets, period_labels, matrix) of every attendance record, as build_attendance_matrix returns
+
+    Taken from the attendance snapshot when it matches the data (the warm-up
+    writes it just before rebuilding the scores), else read with one query.
+    """
+    snapshot = current_snapshot()
+    if snapshot is not None:
+        matrix = np.full((len(snapshot.tickets), len(snapshot.periods)), np.nan, dtype=np.float64)
+        matrix[snapshot.ticket, snapshot.period] = snapshot.percentage
+        return np.asarray(snapshot.tickets, dtype=object), list(snapshot.periods), matrix
+
+    result = db.session.connection().execute(
+        select(Attendance.ticket_no, Attendance.month, Attendance.attendance_percentage))
+    # Plain DBAPI tuples: building a Row for each record would double the time of the fetch
+    rows = pd.DataFrame(result.cursor.fetchall(), columns=['ticket_no', 'period', 'percentage'])
+    result.close()
+    return build_attendance_matrix(rows['ticket_no'].to_numpy(), rows['period'].to_numpy(),
+                                   rows['percentage'].to_numpy(dtype=np.float64))
+
+
+def compute_risk_frame():
+    """Score every student from the attendance table; one row per student, columns as in student_risk_scores"""
+    tickets, period_labels, matrix = load_attendance_matrix()
+    if not matrix.size:
+        return pd.DataFrame(columns=[c.name for c in StudentRiskScore.__table__.columns])
+    config = current_app.config
+    scores = score_matrix(matrix,
+                          threshold=config.get('RISK_THRESHOLD', 75.0),
+                          window=config.get('RISK_ROLLING_WINDOW', 3),
+                          term_length=config.get('TERM_LENGTH_PERIODS', 12))
+
+    latest_index = scores['latest_index']
+    observed = latest_index >= 0
+    latest_period = np.full(len(tickets), None, dtype=object)
+    latest_period[observed] = np.asarray(period_labels, dtype=object)[latest_index[observed]]
+    latest_percentage = matrix[np.arange(len(tickets)), np.maximum(latest_index, 0)]
+    return pd.DataFrame({
+        'ticket_no': tickets,
+        'periods_observed': scores['periods_observed'].astype(np.int64),
+        'latest_period': latest_period,
+        'latest_percentage': np.round(latest_percentage, 2),
+        'overall_avg': np.round(scores['overall_avg'], 2),
+        'rolling_avg': np.round(scores['rolling_avg'], 2),
+        'trend_slope': np.round(scores['trend_slope'], 3),
+        'consecutive_below': scores['consecutive_below'].astype(np.int64),
+        'projected_percentage': np.round(scores['projected_percentage'], 2),
+        'risk_level': scores['risk_level']
+    })
+
+
+def compute_risk_scores():
+    """Score every student from the attendance table; returns a list of row dicts (None for missing values)"""
+    return to_records(compute_risk_frame())
+
+
+def refresh_risk_scores(force=False):
+    """
+    Recompute the student_risk_scores table if the data changed since the last run
+
+    Returns True when the table was rebuilt.
+    """
+    data_version = get_data_version()
+    stored = db.session.get(StatsCounter, RISK_VERSION)
+    if not force and stored is not None and stored.value == data_version:
+        return False
+
+    scores = compute_risk_frame()
+    try:
+        StudentRiskScore.query.delete()
+        bulk_insert_frame(StudentRiskScore, scores)
+        if stored is None:
+            db.session.add(StatsCounter(name=RISK_VERSION, value=data_version))
+        else:
+            stored.value = data_version
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return True
+
+
+def _ensure_current():
+    """
+    Have the writer rebuild the table if it is older than the data
+
+    The post-import warm-up normally rebuilds it first; readers only query the
+    table and never write to it themselves.
+    """
+    stored = db.session.get(StatsCounter, RISK_VERSION)
+    if stored is None or stored.value != get_data_version():
+        write_queue.run(refresh_risk_scores)
+
+
+def get_risk_scores(level=None, limit=None):
+    """Return stored risk scores (most at risk first), rebuilt by the writer if stale"""
+    _ensure_current()
+    query = StudentRiskScore.query
+    if level:
+        query = query.filter(StudentRiskScore.risk_level == level)
+    query = query.order_by(StudentRiskScore.projected_percentage.asc(), StudentRiskScore.ticket_no)
+    if limit:
+        query = query.limit(limit)
+    return query.all()
+
+
+def risk_level_counts():
+    """Number of students per risk level"""
+    _ensure_current()
+    rows = db.session.query(StudentRiskScore.risk_level, db.func.count()).group_by(StudentRiskScore.risk_level).all()
+    counts = {'High': 0, 'Medium': 0, 'Low': 0}
+    counts.update({level: count for level, count in rows})
+    return counts
@@ -0,0 +1,75 @@
+"""
+Row counts kept in the stats_counters table
+
+COUNT(*) is a full table scan in SQLite, so the dashboard totals are stored as
+counters that every write path adjusts inside its own transaction, next to the
+data version bump.
+"""
+from sqlalchemy import func, tuple_
+from app.models.models import Attendance, StatsCounter, Student, db
+
+# Table name -> counter name
+ROW_COUNTERS = {
+    Student.__tablename__: 'students_total',
+    Attendance.__tablename__: 'attendance_total'
+}
+
+# Keys per IN (...) lookup, well under SQLite's bound parameter limit
+KEY_CHUNK_SIZE = 400
+
+
+def count_new_keys(model, rows, key_columns):
+    """Number of distinct keys among rows that are not in the model's table yet"""
+    keys = list({tuple(row.get(c) for c in key_columns) for row in rows})
+    columns = [getattr(model, c) for c in key_columns]
+    existing = 0
+    for start in range(0, len(keys), KEY_CHUNK_SIZE):
+        chunk = keys[start:start + KEY_CHUNK_SIZE]
+        if len(columns) == 1:
+            condition = columns[0].in_([key[0] for key in chunk])
+        else:
+            condition = tuple_(*columns).in_(chunk)
+        existing += db.session.query(func.count()).select_from(model).filter(condition).scalar()
+    return len(keys) - existing
+
+
+def adjust_row_count(model, delta):
+    """Add delta to the model's row counter in the current transaction (the caller commits)"""
+    name = ROW_COUNTERS.get(model.__tablename__)
+    if name is None or not delta:
+        return
+    updated = StatsCounter.query.filter(StatsCounter.name == name).update(
+        {StatsCounter.value: StatsCounter.value + delta}, synchronize_session=False)
+    if not updated:
+        db.session.add(StatsCounter(name=name, value=model.query.count()))
+
+
+def reset_row_count(model, value=0):
+    """Set the model's row counter, e.g. after deleting every row (the caller commits)"""
+    name = ROW_COUNTERS[model.__tablename__]
+    updated = StatsCounter.query.filter(StatsCounter.name == name).update(
+        {StatsCounter.value: value}, synchronize_session=False)
+    if not updated:
+        db.session.add(StatsCounter(name=name, value=value))
+
+
+def get_row_counts():
+    """Stored row counts keyed by table name, in a single primary key lookup"""
+    values = dict(db.session.query(StatsCounter.name, StatsCounter.value)
+                  .filter(StatsCounter.name.in_(ROW_COUNTERS.values())).all())
+    return {table: values.get(name, 0) for table, name in ROW_COUNTERS.items()}
+
+
+def recount_rows():
+    """Recompute every row counter with COUNT(*) and commit"""
+    for model in (Student, Attendance):
+        reset_row_count(model, model.query.count())
+    db.session.commit()
+
+
+def init_row_counts():
+    """Count the rows once if the counters do not exist yet (new or upgraded database)"""
+    existing = db.session.query(func.count()).select_from(StatsCounter).filter(
+        StatsCounter.name.in_(ROW_COUNTERS.values())).scalar()
+    if existing < len(ROW_COUNTERS):
+        recount_rows()
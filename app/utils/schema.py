@@ -0,0 +1,257 @@
+"""
+Typed field schemas for uploaded student and attendance data
+
+Each upload column is declared once as a Field: the model attribute it fills,
+its type, the header names it may appear under and whether a value is
+required. A Schema compiles its fields into one vectorized converter each, so
+a whole column is coerced in a single pass instead of value by value:
+
+- text: stripped strings (whole numbers lose the ".0" spreadsheets add)
+- int / float: finite numbers, with blanks and junk as None
+- percent: a float that may carry a trailing '%'
+- date: the column's format is inferred from a sample, then applied to all of it
+
+The rows a schema produces hold Python str/int/float/date values and are
+written to the database as they are.
+"""
+import numpy as np
+import pandas as pd
+
+# Candidate date formats, most preferred first (wins ties when inferring). The
+# last one is how Flask's JSON encoder writes dates, e.g. in preview data
+# posted back on confirmation.
+DATE_FORMATS = ['%Y-%m-%d', '%d-%m-%Y', '%m/%d/%Y', '%d/%m/%Y', '%d-%b-%Y', '%d/%m/%y',
+                '%Y-%m-%d %H:%M:%S', '%a, %d %b %Y %H:%M:%S GMT']
+
+# Placeholders treated as an empty cell rather than an invalid value
+BLANK_VALUES = ['', '-', '--', 'na', 'n/a', 'nan', 'none', 'null', 'nil']
+
+# Non-blank values examined to infer a date column's format
+DATE_SAMPLE_SIZE = 200
+
+
+class Field:
+    """
+    One upload column: model attribute, type, accepted header names, required flag
+    """
+
+    def __init__(self, name, kind, aliases, required=False):
+        if kind not in CONVERTERS:
+            raise ValueError(f"Unknown field type '{kind}'")
+        self.name = name
+        self.kind = kind
+        self.aliases = aliases
+        self.required = required
+
+
+def _strings(series):
+    """Values as stripped strings (None stays None)"""
+    if pd.api.types.is_float_dtype(series):
+        text = series.astype(str)
+        whole = series.notna() & (series % 1 == 0)
+        text[whole] = series[whole].astype('int64').astype(str)
+    else:
+        text = series.astype(str)
+    return text.str.strip().where(series.notna(), None)
+
+
+def _to_text(series):
+    # Empty cells are None whichever reader produced them (pyarrow's CSV reader yields '')
+    text = _strings(series)
+    return text.where(text != '', None).astype(object)
+
+
+def _to_float(series, strip_percent=False):
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        values = series.astype(float)
+    else:
+        text = _strings(series)
+        if strip_percent:
+            text = text.str.rstrip('%')
+        values = pd.to_numeric(text, errors='coerce').astype(float)
+    # 'inf' or an overflowing '1e400' is no usable number: reported as invalid like other junk
+    return values.where(np.isfinite(values))
+
+
+def _to_percent(series):
+    return _to_float(series, strip_percent=True)
+
+
+def _to_int(series):
+    values = np.trunc(_to_float(series))
+    # Beyond int64 (like inf) the cast would raise for the whole column; such a cell is invalid instead
+    return values.where(values.abs() < 2.0 ** 63).astype('Int64')
+
+
+def infer_date_format(text):
+    """The candidate format that parses most of a sample of non-blank strings"""
+    sample = text.dropna()
+    if len(sample) > DATE_SAMPLE_SIZE:
+        sample = sample.iloc[::len(sample) // DATE_SAMPLE_SIZE][:DATE_SAMPLE_SIZE]
+    best, best_count = None, 0
+    for fmt in DATE_FORMATS:
+        count = pd.to_datetime(sample, format=fmt, errors='coerce').notna().sum()
+        if count > best_count:
+            best, best_count = fmt, count
+    return best
+
+
+def _to_date(series):
+    if pd.api.types.is_datetime64_any_dtype(series):
+        parsed = series
+    else:
+        text = _strings(series)
+        text = text.where(text != '', None)
+        parsed = pd.Series(pd.NaT, index=series.index, dtype='datetime64[ns]')
+        best = infer_date_format(text)
+        if best is not None:
+            # The inferred format first, then the others for whatever it left unparsed
+            for fmt in [best] + [f for f in DATE_FORMATS if f != best]:
+                remaining = parsed.isna() & text.notna()
+                if not remaining.any():
+                    break
+                parsed[remaining] = pd.to_datetime(text[remaining], format=fmt, errors='coerce')
+    return parsed.dt.date.where(parsed.notna(), None)
+
+
+# How each type is named in validation messages
+KIND_LABELS = {
+    'text': 'text',
+    'int': 'whole number',
+    'float': 'number',
+    'percent': 'percentage',
+    'date': 'date'
+}
+
+CONVERTERS = {
+    'text': _to_text,
+    'int': _to_int,
+    'float': _to_float,
+    'percent': _to_percent,
+    'date': _to_date
+}
+
+
+class Schema:
+    """
+    Ordered fields of one upload type, compiled into per-column converters
+    """
+
+    def __init__(self, fields, required_columns=None):
+        self.fields = fields
+        self.required = [f.name for f in fields if f.required]
+        self.required_columns = required_columns or self.required
+        self.kinds = {f.name: f.kind for f in fields}
+        # Compiled once: field name -> vectorized converter
+        self.converters = {f.name: CONVERTERS[f.kind] for f in fields}
+
+    def identify_columns(self, df):
+        """
+        Map field names to the DataFrame's columns by exact, then partial, header match
+        """
+        # Normalized header -> original column name
+        normalized_cols = {}
+        for col in df.columns:
+            normalized_cols[str(col).lower().strip().replace('_', ' ')] = col
+
+        identified_cols = {}
+        for field in self.fields:
+            for alias in field.aliases:
+                alias = alias.lower().strip()
+                if alias in normalized_cols:
+                    identified_cols[field.name] = normalized_cols[alias]
+                    break
+                for norm_col, orig_col in normalized_cols.items():
+                    if alias in norm_col or norm_col in alias:
+                        identified_cols[field.name] = orig_col
+                        break
+                if field.name in identified_cols:
+                    break
+        return identified_cols
+
+    def missing_columns(self, identified_cols):
+        """Required columns that were not identified"""
+        return [name for name in self.required_columns if name not in identified_cols]
+
+    def convert(self, df, identified_cols):
+        """Typed DataFrame with one column per identified field, in schema order"""
+        return pd.DataFrame({name: converter(df[identified_cols[name]])
+                             for name, converter in self.converters.items() if name in identified_cols},
+                            index=df.index)
+
+    def missing_masks(self, typed):
+        """Required field name -> boolean Series of rows lacking a value"""
+        return {name: typed[name].isna() | (typed[name] == '') for name in self.required if name in typed}
+
+    def invalid_masks(self, df, identified_cols, typed):
+        """
+        Field name -> boolean Series of rows whose non-blank value could not be converted
+
+        Text fields accept anything. Placeholders such as 'N/A' or '-' count as blank.
+        """
+        masks = {}
+        for field in self.fields:
+            if field.kind == 'text' or field.name not in typed:
+                continue
+            raw = df[identified_cols[field.name]]
+            blank = raw.isna() | _strings(raw).str.lower().isin(BLANK_VALUES)
+            masks[field.name] = ~blank & typed[field.name].isna()
+        return masks
+
+    def coerce_records(self, records):
+        """
+        Typed rows from rows of unknown types, e.g. preview data posted back as JSON
+
+        Keys that are not fields are dropped.
+        """
+        df = pd.DataFrame.from_records(records)
+        typed = self.convert(df, {name: name for name in self.converters if name in df.columns})
+        return to_records(typed)
+
+
+def to_records(typed):
+    """List of row dicts with None for missing values"""
+    return typed.astype(object).where(typed.notna(), None).to_dict('records')
+
+
+STUDENT_SCHEMA = Schema([
+    Field('ticket_no', 'text', ['ticket', 'ticket no', 'ticket_no', 'ticket number', 'id', 'student id', 'student_id'],
+          required=True),
+    Field('pno', 'text', ['pno', 'personal number', 'personal_number', 'p number', 'emp id', 'emp_id'], required=True),
+    Field('name', 'text', ['name', 'student name', 'full name', 'student_name', 'studentname', 'sname'], required=True),
+    Field('medical_policy', 'text', ['medical policy', 'medical_policy', 'medical', 'health policy', 'insurance']),
+    Field('father_name', 'text', ['father name', 'father_name', 'fathername', 'father s name', 'fathers name',
+                                  'parent name']),
+    Field('dob', 'date', ['dob', 'date of birth', 'birth date', 'birth_date', 'date_of_birth', 'bday', 'birthday']),
+    Field('gender', 'text', ['gender', 'sex', 'male/female', 'gender_male_female']),
+    Field('mobile', 'text', ['mobile', 'mobile number', 'mobile_number', 'phone', 'phone number', 'contact',
+                             'contact number']),
+    Field('address', 'text', ['address', 'permanent address', 'current address', 'full address', 'home address']),
+    Field('qualification_trade', 'text', ['qualification', 'trade', 'qualification trade', 'qualification_trade',
+                                          'course', 'field', 'stream']),
+    Field('passing_year', 'int', ['passing year', 'passing_year', 'passingyear', 'year of passing',
+                                  'graduation year']),
+    Field('college_name', 'text', ['college', 'college name', 'college_name', 'school', 'institution', 'university']),
+    Field('ssc_percentage', 'percent', ['ssc', 'ssc percentage', 'ssc_percentage', '10th percentage', '10th %']),
+    Field('hsc_percentage', 'percent', ['hsc', 'hsc percentage', 'hsc_percentage', '12th percentage', '12th %']),
+    Field('aadhaar_no', 'text', ['aadhaar', 'aadhaar number', 'aadhaar_no', 'aadhar', 'aadhar number']),
+    Field('pan_no', 'text', ['pan', 'pan number', 'pan_no', 'pan card', 'pancard']),
+    Field('email_id', 'text', ['email', 'email id', 'email_id', 'email address', 'email_address']),
+    Field('blood_group', 'text', ['blood group', 'blood_group', 'blood', 'blood type', 'blood_type']),
+    Field('current_address_route', 'text', ['current address', 'route', 'bus stop', 'current_address_route',
+                                            'address route', 'location']),
+    Field('batch', 'text', ['batch', 'batch no', 'batch_no', 'batch number', 'class', 'class name', 'class_name',
+                            'section', 'division', 'year', 'year of admission', 'admission year'])
+])
+
+ATTENDANCE_SCHEMA = Schema([
+    Field('ticket_no', 'text', ['ticket', 'ticket no', 'ticket_no', 'ticket number', 'id', 'student id', 'student_id'],
+          required=True),
+    Field('month', 'text', ['month', 'attendance month', 'month_name', 'period', 'attendance period'], required=True),
+    Field('total_days', 'int', ['total days', 'total_days', 'total working days', 'working days', 'total_working_days',
+                                'days']),
+    Field('present_days', 'int', ['present days', 'present_days', 'present', 'days present', 'present count']),
+    Field('absent_days', 'int', ['absent days', 'absent_days', 'absent', 'days absent', 'absent count']),
+    Field('attendance_percentage', 'percent', ['attendance percentage', 'attendance_percentage', 'attendance %',
+                                               'attendance_percent', 'percentage', 'percent', '%'])
+], required_columns=['ticket_no', 'month', 'total_days', 'present_days', 'attendance_percentage'])
@@ -0,0 +1,172 @@
+"""
+Memory-mapped columnar snapshot of the attendance table
+
+After every data change the analytics warm-up writes the attendance rows to
+ATTENDANCE_SNAPSHOT_PATH as flat NumPy columns:
+
+    ticket      int32    index into the header's ticket list
+    period      int16    index into the header's period list (chronological)
+    total_days, present_days, absent_days    int16
+    percentage  float64  (float32 would shift averages at half-cent boundaries)
+
+Every worker process maps the file read-only, so the columns live once in the
+OS page cache however many workers serve /analysis, and arrays are views of
+the mapping rather than copies. A snapshot is only used while its database id
+and data version match the database's; otherwise analytics fall back to SQL
+until the warm-up has written a new one. Files are replaced atomically, so
+readers of the previous mapping are never disturbed.
+"""
+import json
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import numpy as np
+import pandas as pd
+from flask import current_app, has_app_context
+from sqlalchemy import select
+from app.models.models import Attendance, db
+from app.utils.data_version import get_data_identity
+from app.utils.periods import sort_periods
+
+MAGIC = b'ATTSNAP1'
+_PREFIX = struct.Struct('<8sQ')  # magic, header length
+ALIGNMENT = 64
+
+# Column name -> dtype, in file order
+COLUMNS = {
+    'ticket': np.int32,
+    'period': np.int16,
+    'total_days': np.int16,
+    'present_days': np.int16,
+    'absent_days': np.int16,
+    'percentage': np.float64
+}
+
+
+def _align(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+class AttendanceSnapshot:
+    """
+    Read-only view of a snapshot file
+
+    Each column in COLUMNS is an attribute holding a zero-copy array over the mapping.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as handle:
+            self._mmap = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, header_length = _PREFIX.unpack_from(self._mmap)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not an attendance snapshot")
+        header = json.loads(self._mmap[_PREFIX.size:_PREFIX.size + header_length])
+        self.database_id = header['database_id']
+        self.data_version = header['data_version']
+        self.tickets = header['tickets']
+        self.periods = header['periods']
+        self.rows = header['rows']
+        for name, offset in header['offsets'].items():
+            setattr(self, name, np.frombuffer(self._mmap, dtype=header['dtypes'][name], count=self.rows,
+                                              offset=offset))
+
+
+def write_snapshot(path=None):
+    """
+    Write the current attendance table as a snapshot file and return its path
+
+    The identity is read before the rows, so the file can only be labelled with
+    a version at or before the data it holds and is never used while stale.
+    """
+    path = path or current_app.config['ATTENDANCE_SNAPSHOT_PATH']
+    database_id, data_version = get_data_identity()
+    rows = db.session.execute(select(
+        Attendance.ticket_no, Attendance.month, Attendance.total_days, Attendance.present_days,
+        Attendance.absent_days, Attendance.attendance_percentage)).all()
+
+    n = len(rows)
+    tickets, months, total_days, present_days, absent_days, percentage = (
+        zip(*rows) if rows else ((), (), (), (), (), ()))
+    ticket_codes, ticket_labels = pd.factorize(np.asarray(tickets, dtype=object))
+    month_codes, month_labels = pd.factorize(np.asarray(months, dtype=object))
+    periods = sort_periods(list(month_labels))
+    # Recode periods so their codes follow chronological order
+    chronological = np.empty(len(month_labels), dtype=np.int16)
+    position = {period: i for i, period in enumerate(periods)}
+    for code, label in enumerate(month_labels):
+        chronological[code] = position[label]
+
+    arrays = {
+        'ticket': ticket_codes,
+        'period': chronological[month_codes],
+        'total_days': np.fromiter(total_days, dtype=COLUMNS['total_days'], count=n),
+        'present_days': np.fromiter(present_days, dtype=COLUMNS['present_days'], count=n),
+        'absent_days': np.fromiter(absent_days, dtype=COLUMNS['absent_days'], count=n),
+        'percentage': np.fromiter(percentage, dtype=COLUMNS['percentage'], count=n)
+    }
+    arrays = {name: np.ascontiguousarray(array, dtype=COLUMNS[name]) for name, array in arrays.items()}
+
+    # Column offsets depend on the header length, which includes them: size the header with
+    # placeholder offsets of the maximum width first
+    header = {'database_id': database_id, 'data_version': data_version, 'rows': n,
+              'tickets': [str(t) for t in ticket_labels], 'periods': periods,
+              'dtypes': {name: np.dtype(dtype).str for name, dtype in COLUMNS.items()},
+              'offsets': {name: 10 ** 15 for name in COLUMNS}}
+    data_start = _align(_PREFIX.size + len(json.dumps(header).encode('utf-8')))
+    offset = data_start
+    for name in COLUMNS:
+        header['offsets'][name] = offset
+        offset = _align(offset + arrays[name].nbytes)
+    encoded = json.dumps(header).encode('utf-8')
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.attendance-snapshot-')
+    try:
+        with os.fdopen(fd, 'wb') as handle:
+            handle.write(_PREFIX.pack(MAGIC, len(encoded)))
+            handle.write(encoded)
+            for name in COLUMNS:
+                handle.seek(header['offsets'][name])
+                handle.write(arrays[name].tobytes())
+            handle.truncate(offset)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return path
+
+
+_mapped = {'key': None, 'snapshot': None}
+_map_lock = threading.Lock()
+
+
+def _mapped_snapshot(path):
+    """The mapping of the file now at path, re-mapped only when the file was replaced"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    key = (path, stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    with _map_lock:
+        if _mapped['key'] != key:
+            try:
+                _mapped['snapshot'] = AttendanceSnapshot(path)
+            except (OSError, ValueError) as e:
+                print(f"Ignoring attendance snapshot {path}: {e}")
+                _mapped['snapshot'] = None
+            _mapped['key'] = key
+        return _mapped['snapshot']
+
+
+def current_snapshot():
+    """The snapshot if it matches the database's current data, else None (use SQL)"""
+    if not has_app_context() or not current_app.config.get('ATTENDANCE_SNAPSHOT_ENABLED'):
+        return None
+    snapshot = _mapped_snapshot(current_app.config['ATTENDANCE_SNAPSHOT_PATH'])
+    if snapshot is None or (snapshot.database_id, snapshot.data_version) != get_data_identity():
+        return None
+    return snapshot
@@ -0,0 +1,118 @@
+"""
+Aggregated validation report for uploaded files
+
+Every check is a boolean mask over the uploaded rows. The report keeps the
+matching row numbers and values of each (rule, column) group as arrays and
+summarizes the group as a count, compressed row ranges ("2-40, 52") and a few
+examples, so a systematic problem is one line however many rows it affects.
+The full per-row detail is only produced on demand, as a streamed CSV.
+"""
+import csv
+import io
+import numpy as np
+from flask import Response, stream_with_context
+
+# Examples and row ranges shown per group
+MAX_EXAMPLES = 5
+MAX_RANGES = 10
+
+# Issues per chunk of the streamed CSV
+CSV_CHUNK_ROWS = 1000
+
+# Spreadsheet row number of the first data row (row 1 holds the headers)
+FIRST_ROW = 2
+
+
+def compress_ranges(rows, max_ranges=MAX_RANGES):
+    """'2-40, 52, 60-61' for ascending row numbers, truncated after max_ranges ranges"""
+    if not len(rows):
+        return ''
+    breaks = np.flatnonzero(np.diff(rows) != 1) + 1
+    starts = rows[np.r_[0, breaks]]
+    ends = rows[np.r_[breaks - 1, len(rows) - 1]]
+    parts = [str(start) if start == end else f"{start}-{end}"
+             for start, end in zip(starts[:max_ranges], ends[:max_ranges])]
+    if len(starts) > max_ranges:
+        parts.append(f"and {len(starts) - max_ranges} more ranges")
+    return ', '.join(parts)
+
+
+def _display(value):
+    return '' if value is None or value != value else str(value)
+
+
+class ValidationReport:
+    """
+    Validation issues of one upload grouped by rule and column
+    """
+
+    def __init__(self):
+        self.groups = []
+
+    def add(self, rule, column, message, mask, values, skipped=True):
+        """
+        Record the rows where mask is True, with their values (aligned with mask)
+
+        Skipped rows are left out of the import; the others are imported with
+        the offending value emptied or as they are.
+        """
+        positions = np.flatnonzero(np.asarray(mask, dtype=bool))
+        if not len(positions):
+            return
+        self.groups.append({
+            'rule': rule,
+            'column': str(column),
+            'message': message,
+            'skipped': skipped,
+            'rows': positions + FIRST_ROW,
+            'values': np.asarray(values, dtype=object)[positions]
+        })
+
+    def __len__(self):
+        return sum(len(group['rows']) for group in self.groups)
+
+    @property
+    def skipped_rows(self):
+        """Number of distinct rows left out of the import"""
+        rows = [group['rows'] for group in self.groups if group['skipped']]
+        return len(np.unique(np.concatenate(rows))) if rows else 0
+
+    def summary(self):
+        """One dict per group: rule, column, message, skipped, count, row ranges and examples"""
+        return [{
+            'rule': group['rule'],
+            'column': group['column'],
+            'message': group['message'],
+            'skipped': group['skipped'],
+            'count': len(group['rows']),
+            'rows': compress_ranges(group['rows']),
+            'examples': [{'row': int(row), 'value': _display(value)}
+                         for row, value in zip(group['rows'][:MAX_EXAMPLES], group['values'][:MAX_EXAMPLES])]
+        } for group in self.groups]
+
+    def iter_csv(self):
+        """Every issue as CSV text, one line per row and rule, ordered by row, in chunks"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(['row', 'rule', 'column', 'value', 'message', 'action'])
+        if self.groups:
+            rows = np.concatenate([group['rows'] for group in self.groups])
+            group_ids = np.repeat(np.arange(len(self.groups)), [len(group['rows']) for group in self.groups])
+            offsets = np.concatenate([np.arange(len(group['rows'])) for group in self.groups])
+            order = np.argsort(rows, kind='stable')
+            for start in range(0, len(order), CSV_CHUNK_ROWS):
+                for i in order[start:start + CSV_CHUNK_ROWS]:
+                    group = self.groups[group_ids[i]]
+                    writer.writerow([rows[i], group['rule'], group['column'], _display(group['values'][offsets[i]]),
+                                     group['message'], 'skipped' if group['skipped'] else 'imported'])
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
+
+
+def csv_response(report, download_name):
+    """Stream the report's per-row detail as a CSV attachment"""
+    return Response(stream_with_context(report.iter_csv()), mimetype='text/csv',
+                    headers={'Content-Disposition': f'attachment; filename="{download_name}"'})
@@ -0,0 +1,93 @@
+"""
+Post-import analytics warm-up
+
+A commit that bumped the data version schedules a rewrite of the attendance
+snapshot and a recomputation of the analysis page's statistics on a background
+thread, so the first visitors after an upload find them in the analytics
+cache. Requests arriving while it runs wait for the in-flight computation (see
+analytics_cache) rather than starting their own.
+"""
+import threading
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.utils.analytics import (get_overall_stats, get_monthly_stats, get_defaulter_list, get_daily_stats,
+                                 get_distribution)
+from app.utils.data_version import DATA_CHANGED
+from app.utils.risk_engine import refresh_risk_scores
+from app.utils.snapshot import write_snapshot
+from app.utils.write_queue import write_queue
+
+
+def warm_analytics():
+    """Compute and cache everything the analysis page needs for the current data version"""
+    if current_app.config.get('ATTENDANCE_SNAPSHOT_ENABLED'):
+        # First, so the statistics below (and other workers' misses) are computed from it
+        write_snapshot()
+    get_overall_stats()
+    get_monthly_stats()
+    get_defaulter_list()
+    get_daily_stats()
+    get_distribution()
+    # Risk scores are stored in the database, so they are rebuilt by the writer
+    write_queue.run(refresh_risk_scores)
+
+
+class AnalyticsWarmer:
+    """
+    Background thread running warm_analytics() after data changes
+
+    A burst of commits (e.g. one per import batch) results in a single run once
+    no commit has arrived for ANALYTICS_WARMUP_DELAY seconds.
+    """
+
+    def __init__(self):
+        self.app = None
+        self._pending = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+
+    def schedule(self):
+        if self.app is None:
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='analytics-warmup', daemon=True)
+                self._thread.start()
+        self._pending.set()
+
+    def _run(self):
+        delay = self.app.config.get('ANALYTICS_WARMUP_DELAY', 0.5)
+        while True:
+            self._pending.wait()
+            self._pending.clear()
+            while self._pending.wait(delay):
+                self._pending.clear()
+            try:
+                with self.app.app_context():
+                    warm_analytics()
+            except Exception as e:
+                print(f"Analytics warm-up failed: {e}")
+
+
+warmer = AnalyticsWarmer()
+
+
+def _after_commit(session):
+    if session.info.pop(DATA_CHANGED, False):
+        warmer.schedule()
+
+
+def _after_rollback(session):
+    session.info.pop(DATA_CHANGED, None)
+
+
+def init_warmup(app):
+    """Warm the analytics cache after every commit that changed the data"""
+    warmer.init_app(app)
+    if not event.contains(Session, 'after_commit', _after_commit):
+        event.listen(Session, 'after_commit', _after_commit)
+        event.listen(Session, 'after_rollback', _after_rollback)
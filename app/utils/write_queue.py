@@ -0,0 +1,202 @@
+"""
+Serialized database writes for imports
+
+Every import commit runs on a single writer thread per process, one job at a
+time, and under an exclusive lock on WRITE_LOCK_FILE shared by all worker
+processes. Concurrent upload confirmations therefore queue up instead of
+failing with "database is locked". Rows are committed in transactions of at
+most WRITE_BATCH_SIZE rows, each retried with exponential backoff when the
+database is busy. SQLite runs in WAL mode so readers never wait for the writer.
+"""
+import queue
+import random
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+from app.models.models import db
+from app.utils.bulk_loader import bulk_upsert
+from app.utils.change_feed import count_changed, stamp_rows
+from app.utils.data_version import bump_data_version
+from app.utils.instrumentation import StageTimer, active_query_counters, counting_into
+from app.utils.profiles import refresh_profiles, tickets_by_last_batch
+from app.utils.row_counts import adjust_row_count, count_new_keys
+
+try:
+    import fcntl
+except ImportError:  # Windows: only the in-process queue applies
+    fcntl = None
+
+
+def _is_busy_error(error):
+    message = str(error).lower()
+    return 'database is locked' in message or 'database is busy' in message or 'deadlock' in message
+
+
+@contextmanager
+def _file_lock(path):
+    """Exclusive lock on path across processes (no-op without a path or fcntl)"""
+    if not path or fcntl is None:
+        yield
+        return
+    with open(path, 'a') as handle:
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+class WriteQueue:
+    """
+    In-process queue of write jobs executed one at a time on a writer thread
+
+    The thread starts on the first submitted job, so it is never created in a
+    parent process that forks workers afterwards.
+    """
+
+    def __init__(self):
+        self.app = None
+        self._jobs = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+
+    def _ensure_writer(self):
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._writer, name='db-writer', daemon=True)
+                self._thread.start()
+
+    def submit(self, fn, *args, **kwargs):
+        """Queue fn(*args, **kwargs) for the writer thread; returns a Future"""
+        future = Future()
+        self._ensure_writer()
+        self._jobs.put((future, fn, args, kwargs, active_query_counters()))
+        return future
+
+    def run(self, fn, *args, **kwargs):
+        """
+        Run fn on the writer thread and return its result
+
+        Runs inline when the queue is not bound to an app or when called from
+        the writer thread itself.
+        """
+        if self.app is None or threading.current_thread() is self._thread:
+            return fn(*args, **kwargs)
+        timeout = self.app.config.get('WRITE_QUEUE_TIMEOUT')
+        return self.submit(fn, *args, **kwargs).result(timeout=timeout)
+
+    def _writer(self):
+        while True:
+            future, fn, args, kwargs, counters = self._jobs.get()
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                with self.app.app_context(), counting_into(counters):
+                    with _file_lock(self.app.config.get('WRITE_LOCK_FILE')):
+                        result = fn(*args, **kwargs)
+                future.set_result(result)
+            except BaseException as e:
+                future.set_exception(e)
+
+
+write_queue = WriteQueue()
+
+
+def init_write_queue(app):
+    """Bind the writer to the app and tune SQLite connections for one writer, many readers"""
+    write_queue.init_app(app)
+    for engine in db.engines.values():
+        if engine.dialect.name == 'sqlite':
+            _configure_sqlite(engine, app.config)
+
+
+def _configure_sqlite(engine, config):
+    wal = config.get('SQLITE_WAL')
+    busy_timeout = int(config.get('SQLITE_BUSY_TIMEOUT_MS') or 0)
+
+    @event.listens_for(engine, 'connect')
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        if busy_timeout:
+            cursor.execute(f'PRAGMA busy_timeout = {busy_timeout}')
+        if wal:
+            cursor.execute('PRAGMA journal_mode = WAL')
+            cursor.execute('PRAGMA synchronous = NORMAL')
+        cursor.close()
+
+
+def run_with_retry(transaction, retries, backoff):
+    """
+    Run transaction() (which commits), retrying with exponential backoff while the database is busy
+    """
+    for attempt in range(retries):
+        try:
+            return transaction()
+        except OperationalError as e:
+            db.session.rollback()
+            if attempt == retries - 1 or not _is_busy_error(e):
+                raise
+            time.sleep(backoff * (2 ** attempt) * (1 + random.random()))
+
+
+def _write_batches(model, rows, key_columns, exclude_from_update, stats):
+    config = write_queue.app.config if write_queue.app else {}
+    batch_size = config.get('WRITE_BATCH_SIZE') or 1000
+    retries = config.get('WRITE_RETRIES') or 1
+    backoff = config.get('WRITE_RETRY_BACKOFF') or 0.1
+
+    timer = StageTimer()
+    counts = {'inserted': 0, 'updated': 0, 'unchanged': 0}
+    if stats is not None:
+        stats.update(counts=counts, timings=timer.timings)
+    profile_tickets = tickets_by_last_batch(model, rows, batch_size)
+    saved = 0
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        touched = profile_tickets[start // batch_size]
+
+        def transaction():
+            new_rows = count_new_keys(model, batch, key_columns)
+            # Rows whose values did not change keep their place in the change feed
+            stamped = stamp_rows(model, batch)
+            bulk_upsert(model, stamped, key_columns=key_columns,
+                        exclude_from_update=exclude_from_update, touch_columns=['change_seq'])
+            changed = count_changed(model, stamped) if stats is not None else len(batch)
+            adjust_row_count(model, new_rows)
+            timer.lap('write')
+            refresh_profiles(touched)
+            timer.lap('refresh')
+            bump_data_version()
+            db.session.commit()
+            timer.lap('write')
+            return new_rows, changed
+
+        try:
+            new_rows, changed = run_with_retry(transaction, retries, backoff)
+        except Exception as e:
+            db.session.rollback()
+            timer.lap('write')
+            return saved, str(e)
+        saved += len(batch)
+        counts['inserted'] += new_rows
+        counts['updated'] += changed - new_rows
+        counts['unchanged'] += len(batch) - changed
+    return saved, None
+
+
+def queued_bulk_upsert(model, rows, key_columns, exclude_from_update=(), stats=None):
+    """
+    Upsert rows through the writer thread in bounded, individually committed transactions
+
+    Returns (saved, error): the number of rows committed and None, or the rows
+    committed before the failing transaction and its error message. A stats
+    dict is filled with the committed 'counts' (inserted, updated, unchanged)
+    and the 'timings' of the write and refresh stages (see StageTimer).
+    """
+    return write_queue.run(_write_batches, model, rows, key_columns, exclude_from_update, stats)
@@ -0,0 +1,7 @@
+"""
+Benchmarks for the ingest and analytics paths
+
+    python -m benchmarks.datasets --students 5000 --months 12 --out benchmarks/data
+    python -m benchmarks.run --size medium
+    python -m benchmarks.compare benchmarks/results/<old>.json benchmarks/results/<new>.json
+"""
@@ -0,0 +1,61 @@
+"""
+Compare two benchmark result files and flag regressions
+
+Exits with status 1 when any benchmark's median time grew by more than the
+threshold, so it can gate a CI job.
+"""
+import argparse
+import json
+import sys
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(baseline, candidate, threshold):
+    """Return (rows, regressions) comparing median timings per benchmark"""
+    rows = []
+    regressions = []
+    for name in sorted(set(baseline['results']) | set(candidate['results'])):
+        old = baseline['results'].get(name)
+        new = candidate['results'].get(name)
+        if old is None or new is None:
+            rows.append((name, old and old['seconds_median'], new and new['seconds_median'], None, None))
+            continue
+        ratio = new['seconds_median'] / old['seconds_median'] if old['seconds_median'] else None
+        query_delta = new['queries'] - old['queries']
+        rows.append((name, old['seconds_median'], new['seconds_median'], ratio, query_delta))
+        if ratio is not None and ratio > 1 + threshold:
+            regressions.append(name)
+    return rows, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare two benchmark result files')
+    parser.add_argument('baseline')
+    parser.add_argument('candidate')
+    parser.add_argument('--threshold', type=float, default=0.10, help='Allowed slowdown ratio (default 10%%)')
+    args = parser.parse_args()
+
+    baseline = load(args.baseline)
+    candidate = load(args.candidate)
+    if baseline.get('params') != candidate.get('params'):
+        print(f"Warning: parameters differ ({baseline.get('params')} vs {candidate.get('params')})")
+
+    rows, regressions = compare(baseline, candidate, args.threshold)
+    print(f"{'benchmark':45} {baseline['commit']:>10} {candidate['commit']:>10} {'ratio':>8} {'queries':>8}")
+    for name, old, new, ratio, query_delta in rows:
+        old_text = f"{old:.4f}" if old is not None else '-'
+        new_text = f"{new:.4f}" if new is not None else '-'
+        ratio_text = f"{ratio:.2f}x" if ratio is not None else '-'
+        query_text = f"{query_delta:+d}" if query_delta is not None else '-'
+        flag = '  REGRESSION' if name in regressions else ''
+        print(f"{name:45} {old_text:>10} {new_text:>10} {ratio_text:>8} {query_text:>8}{flag}")
+
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,249 @@
+"""
+Synthetic dataset generator
+
+Writes realistic student master and attendance workbooks (monthly summary and
+daily-grid formats) using the same column headers officers upload, as .xlsx,
+.csv or .parquet files, plus a messy-data corpus of hand-maintained sheets.
+"""
+import argparse
+import os
+import random
+from datetime import date, timedelta
+import pandas as pd
+
+FORMATS = ('xlsx', 'csv', 'parquet')
+
+MONTHS = ['January', 'February', 'March', 'April', 'May', 'June',
+          'July', 'August', 'September', 'October', 'November', 'December']
+
+FIRST_NAMES = ['Aarav', 'Vivaan', 'Aditya', 'Vihaan', 'Arjun', 'Sai', 'Reyansh', 'Krishna', 'Ishaan', 'Rohan',
+               'Ananya', 'Diya', 'Saanvi', 'Aadhya', 'Pari', 'Kavya', 'Sneha', 'Pooja', 'Neha', 'Priya']
+LAST_NAMES = ['Patil', 'Sharma', 'Kulkarni', 'Deshmukh', 'Joshi', 'Pawar', 'Shinde', 'Jadhav', 'More', 'Gaikwad']
+TRADES = ['Fitter', 'Electrician', 'Machinist', 'Welder', 'Turner', 'COPA', 'Mechanic Diesel', 'Draughtsman Civil']
+COLLEGES = ['Govt ITI Pune', 'Govt ITI Aundh', 'Govt ITI Nashik', 'Pimpri ITI', 'Model College Mumbai']
+BATCHES = ['2023-A', '2023-B', '2024-A', '2024-B', '2025-A']
+BLOOD_GROUPS = ['A+', 'A-', 'B+', 'B-', 'O+', 'O-', 'AB+', 'AB-']
+ROUTES = ['Swargate / Route 12', 'Shivajinagar / Route 4', 'Hadapsar / Route 7', 'Kothrud / Route 2']
+
+
+def ticket_numbers(n_students):
+    """Ticket numbers used consistently across generated workbooks"""
+    return [f"T{100000 + i}" for i in range(n_students)]
+
+
+def generate_student_rows(n_students, seed=42):
+    """Build student master rows as a DataFrame with upload-style headers"""
+    rng = random.Random(seed)
+    rows = []
+    for i, ticket_no in enumerate(ticket_numbers(n_students)):
+        first = rng.choice(FIRST_NAMES)
+        last = rng.choice(LAST_NAMES)
+        dob = date(2000, 1, 1) + timedelta(days=rng.randint(0, 6 * 365))
+        rows.append({
+            'PNO': f"P{500000 + i}",
+            'Medical Policy': f"MP-{rng.randint(10000, 99999)}",
+            'Ticket No': ticket_no,
+            'Name': f"{first} {last}",
+            'Father Name': f"{rng.choice(FIRST_NAMES)} {last}",
+            'DOB': dob,
+            'Gender': rng.choice(['Male', 'Female']),
+            'Mobile Number': str(rng.randint(7000000000, 9999999999)),
+            'Address': f"{rng.randint(1, 999)}, {rng.choice(LAST_NAMES)} Nagar, Pune",
+            'Qualification Trade': rng.choice(TRADES),
+            'Passing Year': rng.randint(2018, 2024),
+            'College Name': rng.choice(COLLEGES),
+            'SSC Percentage': round(rng.uniform(45, 98), 2),
+            'HSC Percentage': round(rng.uniform(45, 98), 2),
+            'Aadhaar Number': str(rng.randint(100000000000, 999999999999)),
+            'PAN Number': f"ABCDE{rng.randint(1000, 9999)}F",
+            'Email ID': f"{first.lower()}.{last.lower()}{i}@example.com",
+            'Blood Group': rng.choice(BLOOD_GROUPS),
+            'Current Address (Bus Stop / Route)': rng.choice(ROUTES),
+            'Batch': rng.choice(BATCHES)
+        })
+    return pd.DataFrame(rows)
+
+
+def generate_attendance_rows(n_students, n_months, seed=42):
+    """Build monthly summary attendance rows (one per student per month)"""
+    rng = random.Random(seed + 1)
+    rows = []
+    tickets = ticket_numbers(n_students)
+    # Each student has a base attendance level so histories show realistic trends
+    base_levels = [rng.betavariate(8, 2) for _ in tickets]
+    for month_index in range(n_months):
+        month = MONTHS[month_index % 12]
+        total_days = rng.randint(22, 26)
+        for ticket_no, base in zip(tickets, base_levels):
+            drift = rng.uniform(-0.08, 0.08)
+            level = min(max(base + drift, 0.0), 1.0)
+            present = int(round(total_days * level))
+            rows.append({
+                'Ticket No': ticket_no,
+                'Student Name': f"Student {ticket_no}",
+                'Month': month,
+                'Total Working Days': total_days,
+                'Present Days': present,
+                'Absent Days': total_days - present,
+                'Attendance Percentage': round(present / total_days * 100, 2)
+            })
+    return pd.DataFrame(rows)
+
+
+def generate_daily_rows(n_students, n_days=24, start=date(2024, 7, 1), seed=42):
+    """Build a daily-grid attendance sheet whose columns are dates and cells P/A"""
+    rng = random.Random(seed + 2)
+    days = []
+    current = start
+    while len(days) < n_days:
+        if current.weekday() < 6:  # Monday to Saturday are working days
+            days.append(pd.Timestamp(current))
+        current += timedelta(days=1)
+    rows = []
+    for ticket_no in ticket_numbers(n_students):
+        level = rng.betavariate(8, 2)
+        row = {'Ticket No': ticket_no, 'Name': f"Student {ticket_no}"}
+        for day in days:
+            row[day] = 'P' if rng.random() < level else 'A'
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+
+def _messy_number(rng, value):
+    """A number as it arrives from hand-maintained sheets: int, float, text or text with decimals"""
+    return rng.choice([value, float(value), str(value), f"{value}.0", f" {value} "])
+
+
+def generate_messy_student_rows(n_students, seed=42):
+    """
+    Student rows with the inconsistencies seen in hand-maintained sheets
+
+    Dates mostly day-first with some ISO and unparseable values, padded text,
+    numbers stored as text, percentages with '%', blank required fields and
+    duplicate ticket numbers.
+    """
+    rng = random.Random(seed + 3)
+    df = generate_student_rows(n_students, seed).astype(object)
+    for i in range(len(df)):
+        dob = df.at[i, 'DOB']
+        roll = rng.random()
+        if roll < 0.85:
+            df.at[i, 'DOB'] = dob.strftime('%d/%m/%Y')
+        elif roll < 0.95:
+            df.at[i, 'DOB'] = dob.strftime('%Y-%m-%d')
+        else:
+            df.at[i, 'DOB'] = rng.choice(['', 'N/A', 'unknown'])
+        df.at[i, 'Name'] = f"  {df.at[i, 'Name']} "
+        df.at[i, 'Passing Year'] = _messy_number(rng, df.at[i, 'Passing Year'])
+        if rng.random() < 0.5:
+            df.at[i, 'SSC Percentage'] = f"{df.at[i, 'SSC Percentage']}%"
+        if rng.random() < 0.3:
+            df.at[i, 'HSC Percentage'] = rng.choice(['', 'NA', '-'])
+        if rng.random() < 0.2:
+            df.at[i, 'Mobile Number'] = float(df.at[i, 'Mobile Number'])
+        if rng.random() < 0.01:
+            df.at[i, 'PNO'] = ''
+        elif rng.random() < 0.01 and i > 0:
+            df.at[i, 'Ticket No'] = df.at[i - 1, 'Ticket No']
+    return df
+
+
+def generate_messy_attendance_rows(n_students, n_months, seed=42):
+    """Monthly attendance rows with numbers as text, '%' suffixes, blank derived columns and duplicates"""
+    rng = random.Random(seed + 4)
+    df = generate_attendance_rows(n_students, n_months, seed).astype(object)
+    for i in range(len(df)):
+        for column in ('Total Working Days', 'Present Days'):
+            df.at[i, column] = _messy_number(rng, df.at[i, column])
+        roll = rng.random()
+        if roll < 0.3:
+            df.at[i, 'Absent Days'] = ''
+        if roll < 0.2:
+            df.at[i, 'Attendance Percentage'] = ''
+        elif roll < 0.6:
+            df.at[i, 'Attendance Percentage'] = f"{df.at[i, 'Attendance Percentage']}%"
+        if rng.random() < 0.01:
+            df.at[i, 'Month'] = ''
+        elif rng.random() < 0.01 and i > 0:
+            df.at[i, 'Ticket No'] = df.at[i - 1, 'Ticket No']
+            df.at[i, 'Month'] = df.at[i - 1, 'Month']
+    return df
+
+
+def write_workbook(df, path):
+    """Write a DataFrame as an .xlsx workbook"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    df.to_excel(path, index=False)
+    return path
+
+
+def write_table(df, path):
+    """Write a DataFrame as .xlsx, .csv or .parquet depending on the path's extension"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.csv':
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        df.to_csv(path, index=False)
+    elif extension == '.parquet':
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        df.rename(columns=str).to_parquet(path, index=False)  # Parquet needs string headers
+    else:
+        write_workbook(df, path)
+    return path
+
+
+def dataset_files(out_dir, n_students, n_months, n_days=24, fmt='xlsx'):
+    """Paths of the three datasets in the given format"""
+    return {
+        'students': os.path.join(out_dir, f"students_{n_students}.{fmt}"),
+        'attendance': os.path.join(out_dir, f"attendance_{n_students}x{n_months}.{fmt}"),
+        'daily': os.path.join(out_dir, f"daily_{n_students}x{n_days}.{fmt}")
+    }
+
+
+def generate_all(out_dir, n_students, n_months, n_days=24, seed=42, fmt='xlsx'):
+    """Write all three datasets in the given format and return their paths"""
+    paths = dataset_files(out_dir, n_students, n_months, n_days, fmt)
+    return {
+        'students': write_table(generate_student_rows(n_students, seed), paths['students']),
+        'attendance': write_table(generate_attendance_rows(n_students, n_months, seed), paths['attendance']),
+        'daily': write_table(generate_daily_rows(n_students, n_days, seed=seed), paths['daily'])
+    }
+
+
+
+def messy_files(out_dir, n_students, n_months):
+    """Paths of the messy-data corpus (CSV, so text stays exactly as generated)"""
+    return {
+        'students_messy': os.path.join(out_dir, f"students_messy_{n_students}.csv"),
+        'attendance_messy': os.path.join(out_dir, f"attendance_messy_{n_students}x{n_months}.csv")
+    }
+
+
+def generate_messy(out_dir, n_students, n_months, seed=42):
+    """Write the messy-data corpus and return its paths"""
+    paths = messy_files(out_dir, n_students, n_months)
+    return {
+        'students_messy': write_table(generate_messy_student_rows(n_students, seed), paths['students_messy']),
+        'attendance_messy': write_table(generate_messy_attendance_rows(n_students, n_months, seed),
+                                        paths['attendance_messy'])
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate synthetic student and attendance datasets')
+    parser.add_argument('--students', type=int, default=1000)
+    parser.add_argument('--months', type=int, default=6)
+    parser.add_argument('--days', type=int, default=24)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--format', choices=FORMATS, default='xlsx')
+    parser.add_argument('--out', default=os.path.join(os.path.dirname(__file__), 'data'))
+    args = parser.parse_args()
+
+    paths = generate_all(args.out, args.students, args.months, args.days, args.seed, args.format)
+    for kind, path in paths.items():
+        print(f"{kind}: {path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""
+Minimal benchmark harness
+
+Benchmarks are registered with the @benchmark decorator. Each one receives a
+BenchContext and returns a Case: the callable to time, the number of rows it
+processes, and an optional untimed setup run before every repetition.
+"""
+import os
+import statistics
+import sys
+import time
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+BENCHMARKS = {}
+
+
+class Case:
+    """A single timed operation"""
+
+    def __init__(self, fn, rows, setup=None):
+        self.fn = fn
+        self.rows = rows
+        self.setup = setup
+
+
+class BenchContext:
+    """Shared state handed to every benchmark: dataset paths, sizes and the app"""
+
+    def __init__(self, paths, n_students, n_months, n_days, db_path):
+        self.paths = paths
+        self.n_students = n_students
+        self.n_months = n_months
+        self.n_days = n_days
+        self.db_path = db_path
+        self._app = None
+        # Config reads the environment when app.config is first imported, which
+        # benchmarks may do (via app.utils) before touching ctx.app
+        os.environ['DATABASE_URL'] = 'sqlite:///' + db_path.replace(os.sep, '/')
+        # Background recomputation after imports would skew the timings
+        os.environ['ANALYTICS_WARMUP_ENABLED'] = '0'
+        os.environ['ATTENDANCE_SNAPSHOT_PATH'] = db_path + '.snap'
+
+    @property
+    def app(self):
+        """Flask app bound to the benchmark SQLite database (created lazily)"""
+        if self._app is None:
+            from app.app import app
+            self._app = app
+        return self._app
+
+    def reset_db(self):
+        """Drop and recreate every table so each repetition starts from a fresh database"""
+        from app.models.models import db
+        from app.controllers.auth_controller import init_admin_user
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+            db.create_all()
+            init_admin_user()
+
+    def logged_in_client(self):
+        """Test client with an authenticated admin session"""
+        client = self.app.test_client()
+        client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+        return client
+
+
+def benchmark(name):
+    """Register a benchmark factory under the given name"""
+    def decorator(factory):
+        BENCHMARKS[name] = factory
+        return factory
+    return decorator
+
+
+def peak_rss_mb():
+    """Peak resident set size of the current process in MB"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and kilobytes on Linux
+    return round(peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024, 1)
+
+
+def run_case(case, repeat):
+    """Time a case and return its measurements"""
+    from app.utils.instrumentation import count_queries
+
+    durations = []
+    queries = 0
+    for _ in range(repeat):
+        if case.setup is not None:
+            case.setup()
+        with count_queries() as counter:
+            start = time.perf_counter()
+            case.fn()
+            durations.append(time.perf_counter() - start)
+        queries = counter.count
+
+    median = statistics.median(durations)
+    return {
+        'repeat': repeat,
+        'seconds_min': round(min(durations), 6),
+        'seconds_median': round(median, 6),
+        'seconds_mean': round(statistics.mean(durations), 6),
+        'rows': case.rows,
+        'rows_per_sec': round(case.rows / median, 1) if median > 0 else None,
+        'queries': queries,
+        'peak_rss_mb': peak_rss_mb()
+    }
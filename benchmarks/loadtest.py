@@ -0,0 +1,357 @@
+"""
+HTTP load-test harness
+
+Simulates concurrent officers against a running server: each virtual user logs
+in through /login and replays a weighted mix of dashboard views, searches,
+analytics and uploads. Reports p50/p95/p99 latency and throughput per endpoint,
+counting requests shed by admission control (503 with Retry-After) apart from
+errors.
+
+    # Start a seeded local server and drive it with 20 officers for 60 seconds
+    python -m benchmarks.loadtest --start-server --users 20 --duration 60
+
+    # Compare the development server with serve.py under gunicorn and waitress
+    python -m benchmarks.loadtest --start-server --server dev,gunicorn,waitress --users 20
+
+    # Drive an already running server
+    python -m benchmarks.loadtest --base-url http://127.0.0.1:5000 --users 10
+"""
+import argparse
+import http.cookiejar
+import io
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+
+# (name, weight) of each scenario in the replayed mix
+SCENARIOS = [
+    ('dashboard', 30),
+    ('search_form', 15),
+    ('search_api', 15),
+    ('analysis_page', 15),
+    ('stats_api', 10),
+    ('monthly_analysis', 5),
+    ('upload_attendance', 5),
+    ('confirm_attendance', 5)
+]
+
+
+class Recorder:
+    """Thread-safe collection of request latencies per endpoint"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = {}
+        self.errors = {}
+        self.rejected = {}
+
+    def record(self, name, seconds, ok, rejected=False):
+        with self._lock:
+            self.latencies.setdefault(name, []).append(seconds)
+            if rejected:
+                self.rejected[name] = self.rejected.get(name, 0) + 1
+            elif not ok:
+                self.errors[name] = self.errors.get(name, 0) + 1
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(int(round(pct / 100.0 * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def summarize(recorder, elapsed):
+    """Per-endpoint latency percentiles (ms) and throughput (req/s)"""
+    summary = {}
+    for name, values in sorted(recorder.latencies.items()):
+        values = sorted(values)
+        summary[name] = {
+            'requests': len(values),
+            'errors': recorder.errors.get(name, 0),
+            'rejected': recorder.rejected.get(name, 0),
+            'throughput_rps': round(len(values) / elapsed, 2),
+            'p50_ms': round(percentile(values, 50) * 1000, 2),
+            'p95_ms': round(percentile(values, 95) * 1000, 2),
+            'p99_ms': round(percentile(values, 99) * 1000, 2),
+            'max_ms': round(values[-1] * 1000, 2)
+        }
+    total = sum(len(v) for v in recorder.latencies.values())
+    summary['_total'] = {
+        'requests': total,
+        'errors': sum(recorder.errors.values()),
+        'rejected': sum(recorder.rejected.values()),
+        'throughput_rps': round(total / elapsed, 2)
+    }
+    return summary
+
+
+def encode_multipart(field_name, filename, content):
+    """Encode a single file upload as multipart/form-data"""
+    boundary = uuid.uuid4().hex
+    body = io.BytesIO()
+    body.write(f"--{boundary}\r\n".encode())
+    body.write(f'Content-Disposition: form-data; name="{field_name}"; filename="{filename}"\r\n'.encode())
+    body.write(b"Content-Type: application/vnd.openxmlformats-officedocument.spreadsheetml.sheet\r\n\r\n")
+    body.write(content)
+    body.write(f"\r\n--{boundary}--\r\n".encode())
+    return body.getvalue(), f"multipart/form-data; boundary={boundary}"
+
+
+class VirtualOfficer(threading.Thread):
+    """One logged-in user replaying the scenario mix until the deadline"""
+
+    def __init__(self, base_url, credentials, tickets, months, upload_file, recorder, deadline, think_time, seed):
+        super().__init__(daemon=True)
+        self.base_url = base_url.rstrip('/')
+        self.credentials = credentials
+        self.tickets = tickets
+        self.months = months
+        self.upload_file = upload_file
+        self.recorder = recorder
+        self.deadline = deadline
+        self.think_time = think_time
+        self.rng = random.Random(seed)
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+
+    def request(self, name, path, data=None, headers=None, method=None):
+        req = urllib.request.Request(self.base_url + path, data=data, headers=headers or {}, method=method)
+        start = time.perf_counter()
+        ok = True
+        rejected = False
+        try:
+            with self.opener.open(req, timeout=60) as response:
+                response.read()
+        except urllib.error.HTTPError as e:
+            e.read()
+            ok = e.code < 500 and e.code != 404
+            rejected = e.code == 503 and 'Retry-After' in e.headers
+        except (urllib.error.URLError, socket.timeout, ConnectionError):
+            ok = False
+        self.recorder.record(name, time.perf_counter() - start, ok, rejected)
+
+    def login(self):
+        data = urllib.parse.urlencode(self.credentials).encode()
+        self.request('login', '/login', data=data,
+                     headers={'Content-Type': 'application/x-www-form-urlencoded'})
+
+    def run_scenario(self, scenario):
+        ticket = self.rng.choice(self.tickets)
+        if scenario == 'dashboard':
+            self.request(scenario, '/')
+        elif scenario == 'search_form':
+            self.request(scenario, '/search/search', data=urllib.parse.urlencode({'ticket_no': ticket}).encode(),
+                         headers={'Content-Type': 'application/x-www-form-urlencoded'})
+        elif scenario == 'search_api':
+            self.request(scenario, f'/search/api/search/{ticket}')
+        elif scenario == 'analysis_page':
+            self.request(scenario, '/analysis/analysis')
+        elif scenario == 'stats_api':
+            self.request(scenario, '/analysis/api/analysis/stats')
+        elif scenario == 'monthly_analysis':
+            self.request(scenario, f'/analysis/analysis/month/{self.rng.choice(self.months)}')
+        elif scenario == 'upload_attendance':
+            body, content_type = encode_multipart('file', 'loadtest_attendance.xlsx', self.upload_file)
+            self.request(scenario, '/attendance/upload-attendance', data=body,
+                         headers={'Content-Type': content_type})
+        elif scenario == 'confirm_attendance':
+            records = []
+            for ticket_no in self.rng.sample(self.tickets, min(10, len(self.tickets))):
+                present = self.rng.randint(10, 24)
+                records.append({'ticket_no': ticket_no, 'month': self.rng.choice(self.months),
+                                'total_days': 24, 'present_days': present, 'absent_days': 24 - present,
+                                'attendance_percentage': round(present / 24 * 100, 2)})
+            self.request(scenario, '/attendance/confirm-attendance-upload', data=json.dumps(records).encode(),
+                         headers={'Content-Type': 'application/json'})
+
+    def run(self):
+        self.login()
+        names = [name for name, _ in SCENARIOS]
+        weights = [weight for _, weight in SCENARIOS]
+        while time.monotonic() < self.deadline:
+            self.run_scenario(self.rng.choices(names, weights)[0])
+            if self.think_time:
+                time.sleep(self.rng.uniform(0, 2 * self.think_time))
+
+
+def build_upload_file(n_students, n_months):
+    """Small attendance workbook used by the upload scenario"""
+    from benchmarks.datasets import generate_attendance_rows
+    buffer = io.BytesIO()
+    generate_attendance_rows(min(n_students, 200), min(n_months, 1)).to_excel(buffer, index=False)
+    return buffer.getvalue()
+
+
+def seed_database(db_path, n_students, n_months):
+    """Populate a fresh SQLite database with a generated dataset (runs in a child process)"""
+    code = (
+        "import os, sys, tempfile\n"
+        f"sys.path.insert(0, {ROOT_DIR!r})\n"
+        f"os.environ['DATABASE_URL'] = 'sqlite:///' + {db_path!r}\n"
+        "from benchmarks.run import dataset_paths\n"
+        "from app.app import app\n"
+        "from app.utils.excel_handler import (process_student_excel, save_students_to_db,\n"
+        "                                     process_attendance_excel, save_attendance_to_db)\n"
+        f"paths = dataset_paths({{'students': {n_students}, 'months': {n_months}, 'days': 24}},\n"
+        f"                      os.path.join({BENCH_DIR!r}, 'data'))\n"
+        "with app.app_context():\n"
+        "    save_students_to_db(process_student_excel(paths['students'])['data'])\n"
+        "    save_attendance_to_db(process_attendance_excel(paths['attendance'])['data'])\n"
+    )
+    subprocess.check_call([sys.executable, '-c', code], cwd=ROOT_DIR)
+
+
+def server_command(kind, host, port):
+    """Command line that starts the app under the requested server (dev, gunicorn or waitress)"""
+    if kind == 'dev':
+        code = (f"import sys; sys.path.insert(0, {ROOT_DIR!r})\n"
+                "from app.app import app\n"
+                f"app.run(host={host!r}, port={port}, debug=False, threaded=True)\n")
+        return [sys.executable, '-c', code]
+    if kind in ('gunicorn', 'waitress'):
+        return [sys.executable, os.path.join(ROOT_DIR, 'serve.py'), '--server', kind,
+                '--host', host, '--port', str(port)]
+    raise ValueError(f"Unknown server kind: {kind}")
+
+
+def start_server(kind, host, port, db_path, extra_env=None):
+    """Start a server process bound to db_path and wait until it accepts requests"""
+    env = dict(os.environ)
+    env['DATABASE_URL'] = 'sqlite:///' + db_path.replace(os.sep, '/')
+    env.update(extra_env or {})
+    process = subprocess.Popen(server_command(kind, host, port), cwd=ROOT_DIR, env=env)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with status {process.returncode}")
+        try:
+            with urllib.request.urlopen(f"http://{host}:{port}/login", timeout=2):
+                return process
+        except (urllib.error.URLError, ConnectionError, socket.timeout):
+            time.sleep(0.25)
+    process.terminate()
+    raise RuntimeError('Server did not become ready within 60 seconds')
+
+
+def run_load(base_url, users, duration, think_time, n_students, n_months, credentials):
+    """Run the virtual officers against base_url and return the summary"""
+    from benchmarks.datasets import ticket_numbers, MONTHS
+    tickets = ticket_numbers(n_students)
+    months = MONTHS[:n_months]
+    upload_file = build_upload_file(n_students, n_months)
+
+    recorder = Recorder()
+    start = time.monotonic()
+    deadline = start + duration
+    officers = [VirtualOfficer(base_url, credentials, tickets, months, upload_file, recorder,
+                               deadline, think_time, seed=i) for i in range(users)]
+    for officer in officers:
+        officer.start()
+    for officer in officers:
+        officer.join()
+    return summarize(recorder, time.monotonic() - start)
+
+
+def print_summary(summary):
+    print(f"{'endpoint':22} {'requests':>9} {'errors':>7} {'shed':>6} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} "
+          f"{'p99 ms':>9}")
+    for name, row in summary.items():
+        if name == '_total':
+            continue
+        print(f"{name:22} {row['requests']:>9} {row['errors']:>7} {row['rejected']:>6} {row['throughput_rps']:>8} "
+              f"{row['p50_ms']:>9} {row['p95_ms']:>9} {row['p99_ms']:>9}")
+    total = summary['_total']
+    print(f"{'TOTAL':22} {total['requests']:>9} {total['errors']:>7} {total['rejected']:>6} {total['throughput_rps']:>8}")
+
+
+def print_comparison(summaries):
+    """Total throughput and the slowest endpoint p95 of each server, relative to the first"""
+    print(f"{'server':10} {'req/s':>8} {'vs ' + next(iter(summaries)):>10} {'errors':>7} {'shed':>6} {'worst p95 ms':>13}")
+    baseline = None
+    for server, summary in summaries.items():
+        total = summary['_total']
+        baseline = baseline or total['throughput_rps']
+        worst = max(row['p95_ms'] for name, row in summary.items() if name != '_total')
+        print(f"{server:10} {total['throughput_rps']:>8} {total['throughput_rps'] / baseline:>9.2f}x "
+              f"{total['errors']:>7} {total['rejected']:>6} {worst:>13}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load-test the app with concurrent virtual officers')
+    parser.add_argument('--base-url', default='http://127.0.0.1:5000')
+    parser.add_argument('--start-server', action='store_true', help='Start a seeded local server first')
+    parser.add_argument('--server', default='dev',
+                        help='Server to start with --start-server (dev, gunicorn or waitress); '
+                             'several comma-separated ones are load-tested in turn and compared')
+    parser.add_argument('--port', type=int, default=5055, help='Port used with --start-server')
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--duration', type=float, default=30.0, help='Seconds to run')
+    parser.add_argument('--think-time', type=float, default=0.5, help='Mean pause between requests (seconds)')
+    parser.add_argument('--students', type=int, default=1000, help='Seeded students (also used for searches)')
+    parser.add_argument('--months', type=int, default=6)
+    parser.add_argument('--username', default='admin')
+    parser.add_argument('--password', default='admin123')
+    parser.add_argument('--output', help='Write the summary as JSON to this file')
+    args = parser.parse_args()
+
+    sys.path.insert(0, ROOT_DIR)
+    credentials = {'username': args.username, 'password': args.password}
+    servers = [kind.strip() for kind in args.server.split(',')] if args.start_server else [None]
+    summaries = {}
+    db_path = None
+    try:
+        if args.start_server:
+            fd, db_path = tempfile.mkstemp(suffix='.db', prefix='loadtest_')
+            os.close(fd)
+            print(f"Seeding {args.students} students x {args.months} months ...", flush=True)
+            seed_database(db_path, args.students, args.months)
+
+        for kind in servers:
+            process = None
+            base_url = args.base_url
+            try:
+                if kind is not None:
+                    process = start_server(kind, '127.0.0.1', args.port, db_path)
+                    base_url = f"http://127.0.0.1:{args.port}"
+                print(f"Driving {base_url}{f' ({kind})' if kind else ''} with {args.users} users "
+                      f"for {args.duration}s ...", flush=True)
+                summaries[kind or base_url] = run_load(base_url, args.users, args.duration, args.think_time,
+                                                       args.students, args.months, credentials)
+                print_summary(summaries[kind or base_url])
+            finally:
+                if process is not None:
+                    process.terminate()
+                    process.wait(timeout=30)
+
+        if len(summaries) > 1:
+            print_comparison(summaries)
+        if args.output:
+            with open(args.output, 'w') as f:
+                if args.start_server and len(servers) > 1:
+                    json.dump({'servers': servers, 'users': args.users, 'duration': args.duration,
+                               'results': summaries}, f, indent=2)
+                else:
+                    json.dump({'base_url': base_url, 'server': servers[0], 'users': args.users,
+                               'duration': args.duration, 'results': next(iter(summaries.values()))}, f, indent=2)
+    finally:
+        if db_path and os.path.exists(db_path):
+            os.remove(db_path)
+
+
+if __name__ == '__main__':
+    main()
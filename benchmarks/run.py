@@ -0,0 +1,129 @@
+"""
+Run the benchmark suites and save results as JSON
+
+Each benchmark runs in a fresh process against its own SQLite database, so peak
+RSS and query counts are attributable to that benchmark alone.
+"""
+import argparse
+import importlib
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+
+SIZES = {
+    'small': {'students': 500, 'months': 6, 'days': 24},
+    'medium': {'students': 5000, 'months': 12, 'days': 24},
+    'large': {'students': 40000, 'months': 12, 'days': 24}
+}
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def dataset_paths(params, data_dir):
+    """
+    Generate the datasets for these sizes in every format unless they already exist
+
+    Workbooks are keyed 'students', 'attendance' and 'daily'; the other formats
+    add the extension, e.g. 'students.csv'. The messy-data corpus is keyed
+    'students_messy' and 'attendance_messy'.
+    """
+    from benchmarks.datasets import FORMATS, dataset_files, generate_all, generate_messy, messy_files
+    paths = {}
+    for fmt in FORMATS:
+        files = dataset_files(data_dir, params['students'], params['months'], params['days'], fmt)
+        if not all(os.path.exists(p) for p in files.values()):
+            files = generate_all(data_dir, params['students'], params['months'], params['days'], fmt=fmt)
+        for kind, path in files.items():
+            paths[kind if fmt == 'xlsx' else f"{kind}.{fmt}"] = path
+    messy = messy_files(data_dir, params['students'], params['months'])
+    if not all(os.path.exists(p) for p in messy.values()):
+        messy = generate_messy(data_dir, params['students'], params['months'])
+    paths.update(messy)
+    return paths
+
+
+def run_benchmark(name, paths, params, repeat):
+    """Entry point of the child process: run one benchmark and return its result"""
+    sys.path.insert(0, ROOT_DIR)
+    from benchmarks.harness import BENCHMARKS, BenchContext, run_case
+    importlib.import_module('benchmarks.suites')  # Registers the benchmarks in BENCHMARKS
+
+    fd, db_path = tempfile.mkstemp(suffix='.db', prefix='bench_')
+    os.close(fd)
+    try:
+        ctx = BenchContext(paths, params['students'], params['months'], params['days'], db_path)
+        case = BENCHMARKS[name](ctx)
+        return run_case(case, repeat)
+    finally:
+        os.remove(db_path)
+        if os.path.exists(db_path + '.snap'):
+            os.remove(db_path + '.snap')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run ingest and analytics benchmarks')
+    parser.add_argument('--size', choices=sorted(SIZES), default='small')
+    parser.add_argument('--students', type=int, help='Override the number of students')
+    parser.add_argument('--months', type=int, help='Override the number of months')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--only', help='Run only benchmarks whose name contains this text')
+    parser.add_argument('--data-dir', default=os.path.join(BENCH_DIR, 'data'))
+    parser.add_argument('--output', help='Result file (default: benchmarks/results/<timestamp>-<commit>.json)')
+    args = parser.parse_args()
+
+    sys.path.insert(0, ROOT_DIR)
+    from benchmarks.harness import BENCHMARKS
+    importlib.import_module('benchmarks.suites')  # Registers the benchmarks in BENCHMARKS
+
+    params = dict(SIZES[args.size])
+    if args.students:
+        params['students'] = args.students
+    if args.months:
+        params['months'] = args.months
+
+    paths = dataset_paths(params, args.data_dir)
+    names = [name for name in BENCHMARKS if not args.only or args.only in name]
+
+    results = {}
+    context = multiprocessing.get_context('spawn')
+    for name in names:
+        print(f"Running {name} ...", flush=True)
+        with context.Pool(1) as pool:
+            result = pool.apply(run_benchmark, (name, paths, params, args.repeat))
+        results[name] = result
+        print(f"  median {result['seconds_median']:.4f}s  {result['rows_per_sec']} rows/s  "
+              f"{result['queries']} queries  peak RSS {result['peak_rss_mb']} MB", flush=True)
+
+    commit = git_commit()
+    report = {
+        'commit': commit,
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'params': params,
+        'results': results
+    }
+    output = args.output or os.path.join(
+        BENCH_DIR, 'results', f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved to {output}")
+
+
+if __name__ == '__main__':
+    main()
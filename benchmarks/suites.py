@@ -0,0 +1,205 @@
+"""
+Benchmark suites for ingest and analytics
+"""
+from benchmarks.harness import Case, benchmark
+
+
+@benchmark('ingest.process_student_excel')
+def bench_process_student_excel(ctx):
+    from app.utils.excel_handler import process_student_excel
+    path = ctx.paths['students']
+    return Case(lambda: process_student_excel(path), rows=ctx.n_students)
+
+
+@benchmark('ingest.process_attendance_excel.summary')
+def bench_process_attendance_summary(ctx):
+    from app.utils.excel_handler import process_attendance_excel
+    path = ctx.paths['attendance']
+    return Case(lambda: process_attendance_excel(path), rows=ctx.n_students * ctx.n_months)
+
+
+@benchmark('ingest.process_attendance_excel.daily')
+def bench_process_attendance_daily(ctx):
+    from app.utils.excel_handler import process_attendance_excel
+    path = ctx.paths['daily']
+    return Case(lambda: process_attendance_excel(path), rows=ctx.n_students)
+
+
+def _process(process_name, path):
+    from app.utils import excel_handler
+    process = getattr(excel_handler, process_name)
+    return lambda: process(path)
+
+
+def _parse_case(ctx, process_name, kind, fmt, rows):
+    path = ctx.paths[kind if fmt == 'xlsx' else f"{kind}.{fmt}"]
+    return Case(_process(process_name, path), rows=rows)
+
+
+# The same datasets parsed from each upload format
+for _fmt in ('xlsx', 'csv', 'parquet'):
+    benchmark(f'ingest.parse.students.{_fmt}')(
+        lambda ctx, fmt=_fmt: _parse_case(ctx, 'process_student_excel', 'students', fmt, ctx.n_students))
+    benchmark(f'ingest.parse.attendance.{_fmt}')(
+        lambda ctx, fmt=_fmt: _parse_case(ctx, 'process_attendance_excel', 'attendance', fmt,
+                                          ctx.n_students * ctx.n_months))
+
+
+@benchmark('ingest.save_students_to_db')
+def bench_save_students(ctx):
+    from app.utils.excel_handler import process_student_excel, save_students_to_db
+    data = process_student_excel(ctx.paths['students'])['data']
+
+    def run():
+        with ctx.app.app_context():
+            success, message = save_students_to_db(data)
+            assert success, message
+
+    return Case(run, rows=len(data), setup=ctx.reset_db)
+
+
+@benchmark('ingest.save_attendance_to_db')
+def bench_save_attendance(ctx):
+    from app.utils.excel_handler import (process_student_excel, save_students_to_db,
+                                         process_attendance_excel, save_attendance_to_db)
+    students = process_student_excel(ctx.paths['students'])['data']
+    data = process_attendance_excel(ctx.paths['attendance'])['data']
+
+    def setup():
+        ctx.reset_db()
+        with ctx.app.app_context():
+            save_students_to_db(students)
+
+    def run():
+        with ctx.app.app_context():
+            success, message = save_attendance_to_db(data)
+            assert success, message
+
+    return Case(run, rows=len(data), setup=setup)
+
+
+# Attendance parse plus the orphan check; a tenth of the students are missing and known tickets load cold
+@benchmark('ingest.validate.attendance_references')
+def bench_validate_attendance_references(ctx):
+    from app.utils.excel_handler import process_student_excel, save_students_to_db, process_attendance_excel
+    students = process_student_excel(ctx.paths['students'])['data']
+    path = ctx.paths['attendance.csv']
+
+    def setup():
+        ctx.reset_db()
+        with ctx.app.app_context():
+            save_students_to_db(students[:len(students) * 9 // 10])
+        _clear_analytics_cache()
+
+    def run():
+        with ctx.app.app_context():
+            result = process_attendance_excel(path)
+            assert result['success'], result['message']
+
+    return Case(run, rows=ctx.n_students * ctx.n_months, setup=setup)
+
+
+def _seed_full_dataset(ctx):
+    from app.utils.excel_handler import (process_student_excel, save_students_to_db,
+                                         process_attendance_excel, save_attendance_to_db)
+    ctx.reset_db()
+    with ctx.app.app_context():
+        save_students_to_db(process_student_excel(ctx.paths['students'])['data'])
+        save_attendance_to_db(process_attendance_excel(ctx.paths['attendance'])['data'])
+
+
+def _clear_analytics_cache():
+    from app.utils.analytics_cache import analytics_cache
+    analytics_cache.clear()
+
+
+def _get(client, url):
+    response = client.get(url)
+    assert response.status_code == 200, f"{url} returned {response.status_code}"
+    return response
+
+
+@benchmark('analytics.analysis_page')
+def bench_analysis_page(ctx):
+    _seed_full_dataset(ctx)
+    client = ctx.logged_in_client()
+    return Case(lambda: _get(client, '/analysis/analysis'), rows=ctx.n_students * ctx.n_months,
+                setup=_clear_analytics_cache)
+
+
+@benchmark('analytics.analysis_page.cached')
+def bench_analysis_page_cached(ctx):
+    _seed_full_dataset(ctx)
+    client = ctx.logged_in_client()
+    _get(client, '/analysis/analysis')
+    return Case(lambda: _get(client, '/analysis/analysis'), rows=ctx.n_students * ctx.n_months)
+
+
+@benchmark('analytics.analysis_page.snapshot')
+def bench_analysis_page_snapshot(ctx):
+    from app.utils.snapshot import write_snapshot
+    _seed_full_dataset(ctx)
+    with ctx.app.app_context():
+        write_snapshot()
+    client = ctx.logged_in_client()
+    return Case(lambda: _get(client, '/analysis/analysis'), rows=ctx.n_students * ctx.n_months,
+                setup=_clear_analytics_cache)
+
+
+@benchmark('analytics.stats_api')
+def bench_stats_api(ctx):
+    _seed_full_dataset(ctx)
+    client = ctx.logged_in_client()
+    return Case(lambda: _get(client, '/analysis/api/analysis/stats'), rows=ctx.n_students * ctx.n_months,
+                setup=_clear_analytics_cache)
+
+
+@benchmark('analytics.risk_scores')
+def bench_risk_scores(ctx):
+    from app.utils.risk_engine import refresh_risk_scores
+    _seed_full_dataset(ctx)
+
+    def refresh():
+        with ctx.app.app_context():
+            assert refresh_risk_scores(force=True)
+    return Case(refresh, rows=ctx.n_students)
+
+
+@benchmark('admin.replace_period')
+def bench_replace_period(ctx):
+    from app.utils.attendance_edit import replace_attendance
+    from app.utils.excel_handler import process_attendance_excel
+    _seed_full_dataset(ctx)
+    rows = process_attendance_excel(ctx.paths['attendance'])['data']
+    period = rows[0]['month']
+    rows = [row for row in rows if row['month'] == period]
+
+    def replace():
+        with ctx.app.app_context():
+            success, message, _ = replace_attendance(rows, period=period)
+        assert success, message
+    # Replacing a period with the same records leaves the database as it was for the next repetition
+    return Case(replace, rows=len(rows))
+
+
+@benchmark('search.student_lookup')
+def bench_student_lookup(ctx):
+    from app.models.models import Student
+    _seed_full_dataset(ctx)
+    client = ctx.logged_in_client()
+    with ctx.app.app_context():
+        tickets = [s.ticket_no for s in Student.query.limit(100)]
+
+    def lookups():
+        for ticket_no in tickets:
+            _get(client, f'/search/api/search/{ticket_no}')
+            _get(client, f'/search/view-student/{ticket_no}')
+    return Case(lookups, rows=2 * len(tickets))
+
+
+# Hand-maintained sheets: mixed date formats, numbers as text, '%' suffixes, blanks
+benchmark('ingest.parse.students.messy')(
+    lambda ctx: Case(_process('process_student_excel', ctx.paths['students_messy']), rows=ctx.n_students))
+benchmark('ingest.parse.attendance.messy')(
+    lambda ctx: Case(_process('process_attendance_excel', ctx.paths['attendance_messy']),
+                     rows=ctx.n_students * ctx.n_months))
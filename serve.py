@@ -0,0 +1,152 @@
+"""
+Production entry point: serves the app under a multi-process WSGI server
+
+    python serve.py                         # gunicorn where available, else waitress
+    python serve.py --port 8000 --workers 4 --threads 16
+    python serve.py --server waitress       # e.g. on Windows
+
+gunicorn runs --workers processes of --threads threads each (gthread). With
+preloading (the default) the app is imported once in the master process and
+forked, so the workers share its code and startup work copy-on-write; database
+connections opened before the fork are discarded in each worker. waitress
+serves from a single process with --threads threads. run.py remains the
+auto-reloading development server.
+"""
+import argparse
+import os
+import sys
+
+# Threads per worker left for cheap pages (login, dashboard, search) beyond the admission pools
+LIGHT_THREADS = 4
+
+# Upper bound of the automatic worker count
+MAX_AUTO_WORKERS = 8
+
+
+def auto_workers():
+    """
+    One worker per CPU, up to MAX_AUTO_WORKERS
+
+    Requests are CPU-bound Python, so threads cover the waiting and processes
+    the cores. Every worker recomputes its own analytics caches after an
+    import, so more workers than CPUs (gunicorn's usual 2 x CPUs + 1) only
+    multiplies that work.
+    """
+    return min(os.cpu_count() or 1, MAX_AUTO_WORKERS)
+
+
+def auto_threads():
+    """Enough threads per worker to fill every admission pool and queue and still serve cheap pages"""
+    from app.config import Config
+    if not Config.ADMISSION_CONTROL_ENABLED:
+        return 2 * LIGHT_THREADS
+    return sum(limit + queue_size for limit, queue_size in Config.ADMISSION_POOLS.values()) + LIGHT_THREADS
+
+
+def load_app(args):
+    """Import the app and apply the static file settings"""
+    from app.app import app
+    if args.static_max_age:
+        app.config['SEND_FILE_MAX_AGE_DEFAULT'] = args.static_max_age  # Browsers reuse /static files
+    if args.x_sendfile:
+        app.config['USE_X_SENDFILE'] = True  # The front web server sends the files
+    return app
+
+
+def _post_fork(server, worker):
+    # Pooled connections inherited from the preloading master must not be shared across processes
+    if 'app.app' in sys.modules:
+        from app.models.models import db
+        with sys.modules['app.app'].app.app_context():
+            for engine in db.engines.values():
+                engine.dispose(close=False)
+
+
+def serve_gunicorn(args):
+    from gunicorn.app.base import BaseApplication
+
+    class Server(BaseApplication):
+        def load_config(self):
+            options = {
+                'bind': f"{args.host}:{args.port}",
+                'workers': args.workers,
+                'worker_class': 'gthread',
+                'threads': args.threads,
+                'preload_app': args.preload,
+                'keepalive': args.keepalive,
+                'timeout': args.timeout,
+                'graceful_timeout': args.timeout,
+                'accesslog': '-' if args.access_log else None,
+                'post_fork': _post_fork
+            }
+            for name, value in options.items():
+                self.cfg.set(name, value)
+
+        def load(self):
+            return load_app(args)
+
+    Server().run()
+
+
+def serve_waitress(args):
+    import waitress
+    # waitress closes connections after channel_timeout seconds without activity
+    waitress.serve(load_app(args), host=args.host, port=args.port, threads=args.threads,
+                   channel_timeout=max(args.keepalive, 30), ident='attendance')
+
+
+def available_server():
+    """gunicorn where it is installed (not on Windows), else waitress, else None"""
+    for name in ('gunicorn', 'waitress'):
+        if name == 'gunicorn' and sys.platform == 'win32':
+            continue
+        try:
+            __import__(name)
+            return name
+        except ImportError:
+            pass
+    return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve the app under a production WSGI server')
+    parser.add_argument('--server', choices=['auto', 'gunicorn', 'waitress'],
+                        default=os.environ.get('SERVE_SERVER') or 'auto')
+    parser.add_argument('--host', default=os.environ.get('SERVE_HOST') or '0.0.0.0')
+    parser.add_argument('--port', type=int, default=int(os.environ.get('PORT') or 5000))
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('SERVE_WORKERS') or 0),
+                        help='Worker processes (gunicorn; default: one per CPU, at most 8)')
+    parser.add_argument('--threads', type=int, default=int(os.environ.get('SERVE_THREADS') or 0),
+                        help='Threads per worker (default: admission pools and queues + 4)')
+    parser.add_argument('--no-preload', dest='preload', action='store_false',
+                        help='Import the app in every worker instead of once before forking')
+    parser.add_argument('--keepalive', type=int, default=int(os.environ.get('SERVE_KEEPALIVE') or 5),
+                        help='Seconds an idle keep-alive connection stays open')
+    parser.add_argument('--timeout', type=int, default=int(os.environ.get('SERVE_TIMEOUT') or 120),
+                        help='Seconds before an unresponsive worker is restarted')
+    parser.add_argument('--static-max-age', type=int, default=int(os.environ.get('STATIC_MAX_AGE') or 3600),
+                        help='Seconds browsers may cache /static files (0: revalidate every time)')
+    parser.add_argument('--x-sendfile', action='store_true', default=os.environ.get('SERVE_X_SENDFILE') == '1',
+                        help='Answer file requests with an X-Sendfile header for the front web server '
+                             '(Apache mod_xsendfile, lighttpd) to send')
+    parser.add_argument('--access-log', action='store_true', help='Log every request to stdout')
+    args = parser.parse_args(argv)
+
+    server = available_server() if args.server == 'auto' else args.server
+    if server is None:
+        print("No production WSGI server installed: pip install gunicorn (Linux/macOS) or waitress")
+        raise SystemExit(1)
+    args.workers = args.workers or auto_workers()
+    args.threads = args.threads or auto_threads()
+
+    if server == 'gunicorn':
+        print(f"Serving on {args.host}:{args.port} with gunicorn: {args.workers} workers x {args.threads} threads"
+              f"{', preloaded' if args.preload else ''}", flush=True)
+        serve_gunicorn(args)
+    else:
+        print(f"Serving on {args.host}:{args.port} with waitress: {args.threads} threads", flush=True)
+        serve_waitress(args)
+
+
+if __name__ == '__main__':
+    main()
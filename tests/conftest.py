@@ -0,0 +1,67 @@
+"""
+Shared fixtures
+
+Every test gets an app bound to its own file-backed SQLite database (with the
+write lock and attendance snapshot next to it), so tests never touch the
+instance database and never see each other's rows.
+"""
+import os
+import sys
+import tempfile
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+# Config reads the environment when first imported, and importing app.app creates the default app
+_session_dir = tempfile.mkdtemp(prefix='attendance_tests_')
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(_session_dir, 'default.db').replace(os.sep, '/')
+os.environ['ATTENDANCE_SNAPSHOT_PATH'] = os.path.join(_session_dir, 'attendance.snap')
+os.environ['WRITE_LOCK_FILE'] = os.path.join(_session_dir, 'write.lock')
+# Background recomputation after imports would race the assertions
+os.environ['ANALYTICS_WARMUP_ENABLED'] = '0'
+
+from app.app import create_app  # noqa: E402
+from app.config import Config  # noqa: E402
+from app.controllers.auth_controller import user_cache  # noqa: E402
+from app.models.models import db  # noqa: E402
+
+
+def _sqlite_url(path):
+    return 'sqlite:///' + str(path).replace(os.sep, '/')
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """App on a fresh SQLite database in tmp_path"""
+    monkeypatch.setattr(Config, 'SQLALCHEMY_DATABASE_URI', _sqlite_url(tmp_path / 'test.db'))
+    monkeypatch.setattr(Config, 'ATTENDANCE_SNAPSHOT_PATH', str(tmp_path / 'attendance.snap'))
+    monkeypatch.setattr(Config, 'WRITE_LOCK_FILE', str(tmp_path / 'write.lock'))
+    # Users are cached by id, which repeats across databases
+    user_cache.clear()
+
+    test_app = create_app()
+    test_app.config['TESTING'] = True
+    test_app.upload_folder = str(tmp_path / 'uploads')
+    os.makedirs(test_app.upload_folder, exist_ok=True)
+    yield test_app
+
+    with test_app.app_context():
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    """Anonymous test client"""
+    return app.test_client()
+
+
+@pytest.fixture
+def admin_client(app):
+    """Test client logged in as the default admin"""
+    test_client = app.test_client()
+    response = test_client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+    assert response.status_code == 302
+    return test_client
@@ -0,0 +1,52 @@
+import threading
+from app.models.models import Attendance, AttendanceArchive, Student, db
+from app.utils import archive
+from app.utils.archive import (UNASSIGNED_BATCH, archive_term, get_archived_period_stats, list_archived_terms,
+                               restore_term)
+
+
+def _seed(n_students, n_without_batch):
+    for i in range(n_students):
+        db.session.add(Student(ticket_no=f'T{i:03d}', pno=f'P{i}', name=f'Student {i}',
+                               batch=None if i < n_without_batch else 'B1'))
+        db.session.add(Attendance(ticket_no=f'T{i:03d}', month='January', total_days=20, present_days=18,
+                                  absent_days=2, attendance_percentage=90.0))
+    db.session.commit()
+
+
+def test_students_without_batch_do_not_duplicate_the_overall_summary(app):
+    with app.app_context():
+        _seed(100, 10)
+
+        success, message = archive_term('2024-T1', ['January'])
+        assert success, message
+
+        overall = get_archived_period_stats()
+        assert [(row['period'], row['batch'], row['total_records']) for row in overall] == [('January', None, 100)]
+        assert [row['total_records'] for row in get_archived_period_stats(UNASSIGNED_BATCH)] == [10]
+        assert [row['total_records'] for row in get_archived_period_stats('B1')] == [90]
+
+        terms = list_archived_terms()
+        assert [(term['term'], term['periods'], term['total_records']) for term in terms] == \
+            [('2024-T1', ['January'], 100)]
+
+
+def test_archive_and_restore_run_on_the_writer_thread(app, monkeypatch):
+    threads = []
+    for name in ('_archive_term', '_restore_term'):
+        original = getattr(archive, name)
+
+        def recording(*args, original=original):
+            threads.append(threading.current_thread().name)
+            return original(*args)
+        monkeypatch.setattr(archive, name, recording)
+
+    with app.app_context():
+        _seed(5, 0)
+        assert archive_term('2024-T1', ['January'])[0]
+        assert Attendance.query.count() == 0
+        assert restore_term('2024-T1')[0]
+        assert Attendance.query.count() == 5
+        assert AttendanceArchive.query.count() == 0
+
+    assert threads == ['db-writer', 'db-writer']
@@ -0,0 +1,78 @@
+from contextlib import contextmanager
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.controllers.auth_controller import get_cached_user, user_cache
+from app.models.models import User, db
+from app.utils.instrumentation import count_queries
+
+
+@contextmanager
+def user_queries():
+    """Collect the SQL statements that read the users table inside the block"""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if 'FROM users' in statement:
+            statements.append(statement)
+
+    event.listen(Engine, 'before_cursor_execute', record)
+    try:
+        yield statements
+    finally:
+        event.remove(Engine, 'before_cursor_execute', record)
+
+
+def _admin_id():
+    return User.query.filter_by(username='admin').one().id
+
+
+def test_second_authenticated_request_does_not_query_users(admin_client):
+    # Start cold, as in a worker process that did not handle the login
+    user_cache.clear()
+    with user_queries() as statements:
+        assert admin_client.get('/').status_code == 200
+    assert len(statements) == 1
+    with user_queries() as statements:
+        assert admin_client.get('/').status_code == 200
+    assert statements == []
+
+
+def test_cached_user_is_served_without_queries(app):
+    with app.test_request_context():
+        user_id = _admin_id()
+        get_cached_user(user_id)
+        with count_queries() as counter:
+            assert get_cached_user(user_id)['username'] == 'admin'
+        assert counter.count == 0
+
+
+def test_updating_a_user_invalidates_the_cache(app):
+    with app.test_request_context():
+        user_id = _admin_id()
+        get_cached_user(user_id)
+
+        db.session.get(User, user_id).role = 'officer'
+        db.session.commit()
+
+        with count_queries() as counter:
+            assert get_cached_user(user_id)['role'] == 'officer'
+        assert counter.count == 1
+        with count_queries() as counter:
+            get_cached_user(user_id)
+        assert counter.count == 0
+
+
+def test_deleting_a_user_invalidates_the_cache_and_ends_the_session(admin_client, app):
+    assert admin_client.get('/').status_code == 200
+    with app.app_context():
+        user_id = _admin_id()
+        db.session.delete(db.session.get(User, user_id))
+        db.session.commit()
+
+        with count_queries() as counter:
+            assert get_cached_user(user_id) is None
+        assert counter.count == 1
+
+    response = admin_client.get('/')
+    assert response.status_code == 302
+    assert '/login' in response.headers['Location']
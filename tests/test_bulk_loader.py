@@ -0,0 +1,91 @@
+import csv
+import os
+from datetime import date
+import pytest
+from app.config import Config
+from app.models.models import Attendance, Student, db
+from app.utils.bulk_loader import COPY_NULL, _copy_data, bulk_upsert
+
+POSTGRES_URL = os.environ.get('TEST_POSTGRES_URL')
+
+
+def _students():
+    return [
+        {'ticket_no': 'T1', 'pno': 'P1', 'name': 'Asha', 'father_name': None, 'address': '', 'dob': date(2001, 5, 4)},
+        {'ticket_no': 'T2', 'pno': 'P2', 'name': 'Ravi "R"', 'father_name': r'\N', 'address': None, 'dob': None},
+    ]
+
+
+def _attendance(percentage, change_seq):
+    return [{'ticket_no': 'T1', 'month': 'January', 'total_days': 20, 'present_days': 18, 'absent_days': 2,
+             'attendance_percentage': percentage, 'change_seq': change_seq}]
+
+
+def _stored_students():
+    return {s.ticket_no: (s.name, s.father_name, s.address, s.dob) for s in Student.query.order_by(Student.ticket_no)}
+
+
+def _check_upserts():
+    """Insert, update and touch_columns behaviour, the same on every dialect"""
+    bulk_upsert(Student, _students(), key_columns=['ticket_no'])
+    db.session.commit()
+    assert _stored_students() == {'T1': ('Asha', None, '', date(2001, 5, 4)),
+                                  'T2': ('Ravi "R"', r'\N', None, None)}
+
+    bulk_upsert(Student, [dict(_students()[0], name='Asha K', address=None)], key_columns=['ticket_no'])
+    db.session.commit()
+    assert _stored_students()['T1'] == ('Asha K', None, None, date(2001, 5, 4))
+    assert Student.query.count() == 2
+
+    bulk_upsert(Attendance, _attendance(90.0, 1), key_columns=['ticket_no', 'month'], touch_columns=['change_seq'])
+    # Same values: the stored row keeps its change sequence
+    bulk_upsert(Attendance, _attendance(90.0, 2), key_columns=['ticket_no', 'month'], touch_columns=['change_seq'])
+    db.session.commit()
+    assert db.session.query(Attendance.attendance_percentage, Attendance.change_seq).one() == (90.0, 1)
+
+    bulk_upsert(Attendance, _attendance(80.0, 3), key_columns=['ticket_no', 'month'], touch_columns=['change_seq'])
+    db.session.commit()
+    assert db.session.query(Attendance.attendance_percentage, Attendance.change_seq).one() == (80.0, 3)
+    assert Attendance.query.count() == 1
+
+
+def test_copy_data_tells_null_from_empty_text():
+    lines = _copy_data(_students(), ['ticket_no', 'father_name', 'address', 'dob']).read().splitlines()
+
+    assert lines == ['"T1",%s,"","2001-05-04"' % COPY_NULL, '"T2","\\N",%s,%s' % (COPY_NULL, COPY_NULL)]
+    # Quotes inside values are doubled, as CSV requires
+    assert list(csv.reader(_copy_data(_students()[1:], ['name']))) == [['Ravi "R"']]
+
+
+def test_sqlite_on_conflict_upserts(app):
+    with app.app_context():
+        assert db.engine.dialect.name == 'sqlite'
+        _check_upserts()
+
+
+@pytest.fixture
+def postgres_app(monkeypatch, tmp_path):
+    if not POSTGRES_URL:
+        pytest.skip('TEST_POSTGRES_URL is not set')
+    from app.app import create_app
+    monkeypatch.setattr(Config, 'SQLALCHEMY_DATABASE_URI', POSTGRES_URL)
+    monkeypatch.setattr(Config, 'ATTENDANCE_SNAPSHOT_PATH', str(tmp_path / 'attendance.snap'))
+    monkeypatch.setattr(Config, 'WRITE_LOCK_FILE', str(tmp_path / 'write.lock'))
+    test_app = create_app()
+    test_app.config['TESTING'] = True
+    yield test_app
+
+    with test_app.app_context():
+        db.session.remove()
+        db.drop_all()
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+def test_postgres_copy_upserts(postgres_app):
+    with postgres_app.app_context():
+        assert db.engine.dialect.name == 'postgresql'
+        Attendance.query.delete()
+        Student.query.delete()
+        db.session.commit()
+        _check_upserts()
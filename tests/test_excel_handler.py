@@ -0,0 +1,51 @@
+import pandas as pd
+import pytest
+from app.utils.excel_handler import process_attendance_excel, process_student_excel
+
+# Optional cells left blank, and one cell holding only spaces
+STUDENTS = pd.DataFrame({
+    'Ticket No': ['T1', 'T2', 'T3'],
+    'PNO': ['P1', 'P2', 'P3'],
+    'Name': ['Asha Rao', 'Ravi Kumar', 'Meena Iyer'],
+    'Father Name': ['Suresh Rao', None, '   '],
+    'Mobile': ['9876543210', None, '9123456780'],
+    'Batch': ['B1', None, None],
+    'DOB': ['2001-04-12', None, '2000-11-30']
+})
+
+ATTENDANCE = pd.DataFrame({
+    'Ticket No': ['T1', 'T2'],
+    'Month': ['January', 'January'],
+    'Total Days': [20, 20],
+    'Present Days': [18, None],
+    'Absent Days': [2, None],
+    'Attendance %': [90.0, 75.0]
+})
+
+
+def _write(df, path):
+    if path.suffix == '.csv':
+        df.to_csv(path, index=False)
+    else:
+        df.to_excel(path, index=False)
+    return str(path)
+
+
+@pytest.mark.parametrize('frame, process', [(STUDENTS, process_student_excel),
+                                            (ATTENDANCE, process_attendance_excel)])
+def test_csv_and_xlsx_blanks_import_identically(tmp_path, frame, process):
+    xlsx = process(_write(frame, tmp_path / 'upload.xlsx'))
+    csv = process(_write(frame, tmp_path / 'upload.csv'))
+
+    assert xlsx['success'] and csv['success']
+    assert csv['data'] == xlsx['data']
+
+
+def test_blank_text_cells_are_none(tmp_path):
+    result = process_student_excel(_write(STUDENTS, tmp_path / 'upload.csv'))
+
+    rows = {row['ticket_no']: row for row in result['data']}
+    assert rows['T2']['batch'] is None
+    assert rows['T2']['father_name'] is None
+    assert rows['T3']['father_name'] is None
+    assert rows['T1']['batch'] == 'B1'
@@ -0,0 +1,22 @@
+from flask import render_template_string
+from app.models.models import db
+from app.utils.data_version import bump_data_version, get_data_version
+from app.utils.fragment_cache import fragment_cache
+
+TEMPLATE = "{% call cache_fragment('table', 1) %}rows{% endcall %}"
+
+
+def test_fragment_is_keyed_on_the_version_at_request_start(app):
+    app.config['FRAGMENT_CACHE_ENABLED'] = True
+    fragment_cache.clear()
+    with app.test_request_context('/'):
+        app.preprocess_request()
+        start_version = get_data_version()
+
+        # A write committed while the view was loading its data
+        bump_data_version()
+        db.session.commit()
+
+        assert render_template_string(TEMPLATE) == 'rows'
+        assert fragment_cache.get(('table', start_version, 1)) == 'rows'
+        assert fragment_cache.get(('table', get_data_version(), 1)) is None
@@ -0,0 +1,83 @@
+import time
+import numpy as np
+import pandas as pd
+from app.models.models import Attendance, Student, StudentRiskScore, db
+from app.utils.bulk_loader import bulk_insert_frame
+from app.utils.data_version import bump_data_version
+from app.utils.risk_engine import compute_risk_frame, compute_risk_scores, refresh_risk_scores
+from app.utils.snapshot import write_snapshot
+
+MONTHS = ['January', 'February', 'March', 'April', 'May', 'June']
+
+
+def _seed(percentages):
+    """One student per row of a students x MONTHS array; NaN cells get no record"""
+    tickets = np.array([f'T{i:06d}' for i in range(len(percentages))], dtype=object)
+    bulk_insert_frame(Student, pd.DataFrame({'ticket_no': tickets, 'pno': tickets, 'name': tickets}))
+    student, period = np.nonzero(~np.isnan(percentages))
+    bulk_insert_frame(Attendance, pd.DataFrame({
+        'ticket_no': tickets[student],
+        'month': np.array(MONTHS, dtype=object)[period],
+        'total_days': 20,
+        'present_days': 15,
+        'absent_days': 5,
+        'attendance_percentage': percentages[student, period]
+    }))
+    bump_data_version()
+    db.session.commit()
+
+
+def test_scores_of_a_small_class(app):
+    with app.app_context():
+        _seed(np.array([
+            [90.0, 85.0, 80.0, np.nan, np.nan, np.nan],
+            [70.0, 72.0, np.nan, 60.0, np.nan, np.nan],
+        ]))
+        rows = {row['ticket_no']: row for row in compute_risk_scores()}
+
+        steady = rows['T000000']
+        assert steady['periods_observed'] == 3
+        assert steady['latest_period'] == 'March'
+        assert steady['latest_percentage'] == 80.0
+        assert steady['overall_avg'] == 85.0
+        assert steady['trend_slope'] == -5.0
+        assert steady['consecutive_below'] == 0
+
+        falling = rows['T000001']
+        assert falling['latest_period'] == 'April'
+        assert falling['consecutive_below'] == 3
+        assert falling['risk_level'] == 'High'
+        assert isinstance(falling['periods_observed'], int)
+
+        assert refresh_risk_scores(force=True)
+        stored = db.session.get(StudentRiskScore, 'T000001')
+        assert (stored.latest_period, stored.rolling_avg, stored.risk_level) == ('April', 67.33, 'High')
+
+
+def test_no_attendance_gives_no_scores(app):
+    with app.app_context():
+        assert compute_risk_scores() == []
+        assert refresh_risk_scores(force=True)
+        assert StudentRiskScore.query.count() == 0
+
+
+def test_scores_100k_students_well_under_a_second(app):
+    rng = np.random.default_rng(1)
+    percentages = rng.uniform(40, 100, size=(100000, len(MONTHS))).round(2)
+    percentages[rng.random(percentages.shape) < 0.1] = np.nan
+    with app.app_context():
+        _seed(percentages)
+        # The post-import warm-up writes the snapshot just before it rebuilds the scores
+        write_snapshot()
+
+        start = time.perf_counter()
+        scores = compute_risk_frame()
+        elapsed = time.perf_counter() - start
+        assert len(scores) == 100000
+        assert elapsed < 0.5, f"scoring 100k students took {elapsed:.2f}s"
+
+        start = time.perf_counter()
+        assert refresh_risk_scores(force=True)
+        elapsed = time.perf_counter() - start
+        assert StudentRiskScore.query.count() == 100000
+        assert elapsed < 1.5, f"refreshing the scores of 100k students took {elapsed:.2f}s"
@@ -0,0 +1,37 @@
+import pandas as pd
+from app.utils.excel_handler import process_student_excel
+from app.utils.schema import STUDENT_SCHEMA
+
+
+def test_non_finite_numbers_are_reported_as_invalid_cells(tmp_path):
+    path = tmp_path / 'students.csv'
+    pd.DataFrame({
+        'Ticket No': ['T1', 'T2', 'T3', 'T4', 'T5'],
+        'PNO': ['P1', 'P2', 'P3', 'P4', 'P5'],
+        'Name': ['Asha', 'Ravi', 'Meena', 'Kiran', 'Vijay'],
+        'Passing Year': ['2019', 'inf', '1e400', '-inf', '1e300'],
+        'SSC Percentage': ['88.5', '72', 'inf', '65%', '70']
+    }).to_csv(path, index=False)
+
+    result = process_student_excel(str(path))
+
+    assert result['success']
+    rows = {row['ticket_no']: row for row in result['data']}
+    assert len(rows) == 5  # Invalid values are ignored, not the rows holding them
+    assert rows['T1']['passing_year'] == 2019
+    # 1e300 is finite but has no int64 value
+    assert [rows[t]['passing_year'] for t in ('T2', 'T3', 'T4', 'T5')] == [None, None, None, None]
+    assert rows['T3']['ssc_percentage'] is None
+    invalid = [(int(row), group['column']) for group in result['report'].groups if group['rule'] == 'invalid_value'
+               for row in group['rows']]
+    assert sorted(invalid) == [(3, 'Passing Year'), (4, 'Passing Year'), (4, 'SSC Percentage'), (5, 'Passing Year'),
+                               (6, 'Passing Year')]
+
+
+def test_coerce_records_survives_non_finite_numbers():
+    records = STUDENT_SCHEMA.coerce_records([{'ticket_no': 'T1', 'passing_year': float('inf')},
+                                             {'ticket_no': 'T2', 'passing_year': -1e19},
+                                             {'ticket_no': 'T3', 'passing_year': 2020.0}])
+
+    assert records == [{'ticket_no': 'T1', 'passing_year': None}, {'ticket_no': 'T2', 'passing_year': None},
+                       {'ticket_no': 'T3', 'passing_year': 2020}]
@@ -0,0 +1,29 @@
+import pandas as pd
+import pytest
+
+
+@pytest.fixture
+def uploaded_file(app):
+    # One good row and one missing its name, so the issues report has a row
+    path = f"{app.upload_folder}/students.csv"
+    pd.DataFrame({'Ticket No': ['T1', 'T2'], 'PNO': ['P1', 'P2'], 'Name': ['Asha', None],
+                  'Mobile': ['9876543210', '9123456780']}).to_csv(path, index=False)
+    return 'students.csv'
+
+
+@pytest.mark.parametrize('url', ['/student/upload-student-master/{}/issues.csv',
+                                 '/attendance/upload-attendance/{}/issues.csv'])
+def test_issues_csv_requires_login(client, uploaded_file, url):
+    response = client.get(url.format(uploaded_file))
+
+    assert response.status_code == 302
+    assert '/login' in response.headers['Location']
+    assert b'9876543210' not in response.data
+
+
+def test_issues_csv_for_logged_in_user(admin_client, uploaded_file):
+    response = admin_client.get(f'/student/upload-student-master/{uploaded_file}/issues.csv')
+
+    assert response.status_code == 200
+    assert response.mimetype == 'text/csv'
+    assert b'Required value is missing' in response.data
@@ -0,0 +1,74 @@
+import threading
+from app.models.models import Attendance, Student
+from app.utils import write_queue
+
+N_UPLOADS = 8
+ROWS_PER_UPLOAD = 50
+MONTHS = ['January', 'February', 'March', 'April', 'May', 'June', 'July', 'August']
+
+
+def _post_concurrently(clients, url, payloads):
+    """POST each payload from its own thread at the same moment; returns the JSON responses"""
+    start = threading.Barrier(len(payloads))
+    responses = [None] * len(payloads)
+    errors = []
+
+    def post(i):
+        try:
+            start.wait()
+            response = clients[i].post(url, json=payloads[i])
+            responses[i] = (response.status_code, response.get_json())
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=post, args=(i,)) for i in range(len(payloads))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    return responses
+
+
+def _logged_in_clients(app, n):
+    clients = []
+    for _ in range(n):
+        test_client = app.test_client()
+        assert test_client.post('/login', data={'username': 'admin', 'password': 'admin123'}).status_code == 302
+        clients.append(test_client)
+    return clients
+
+
+def _assert_all_saved(responses):
+    for status, body in responses:
+        assert status == 200
+        assert body['success'], body['message']
+        assert 'locked' not in body['message']
+
+
+def test_parallel_confirm_uploads_all_land(app, monkeypatch):
+    clients = _logged_in_clients(app, N_UPLOADS)
+    writer_threads = []
+    write_batches = write_queue._write_batches
+
+    def recording(*args):
+        writer_threads.append(threading.current_thread().name)
+        return write_batches(*args)
+    monkeypatch.setattr(write_queue, '_write_batches', recording)
+
+    students = [[{'ticket_no': f'T{u}-{i:03d}', 'pno': f'P{u}-{i}', 'name': f'Student {u}-{i}',
+                  'mobile': '9876543210'} for i in range(ROWS_PER_UPLOAD)] for u in range(N_UPLOADS)]
+    _assert_all_saved(_post_concurrently(clients, '/student/confirm-student-upload', students))
+
+    # Every upload covers all students for a month of its own
+    attendance = [[{'ticket_no': student['ticket_no'], 'month': MONTHS[u], 'total_days': 20,
+                    'present_days': 15, 'absent_days': 5, 'attendance_percentage': 75.0}
+                   for upload in students for student in upload] for u in range(N_UPLOADS)]
+    _assert_all_saved(_post_concurrently(clients, '/attendance/confirm-attendance-upload', attendance))
+
+    with app.app_context():
+        assert Student.query.count() == N_UPLOADS * ROWS_PER_UPLOAD
+        assert Attendance.query.count() == N_UPLOADS * N_UPLOADS * ROWS_PER_UPLOAD
+        assert {month for (month,) in Attendance.query.with_entities(Attendance.month).distinct()} == set(MONTHS)
+    # One writer at a time, so SQLite never had to arbitrate between them
+    assert writer_threads == ['db-writer'] * (2 * N_UPLOADS)